@@ -0,0 +1,370 @@
+import csv
+import hashlib
+import json
+import os
+import re
+import time
+from datetime import datetime, timezone
+
+from common import bulk_writer
+from common.logger import get_logger
+
+# Location spellings of the feeds mapped to the one used by organizations
+LOCATION_ALIASES = {
+    "US": "United States", "USA": "United States", "U.S.": "United States", "U.S.A.": "United States",
+    "UNITED STATES OF AMERICA": "United States",
+    "UK": "United Kingdom", "U.K.": "United Kingdom", "GB": "United Kingdom", "GREAT BRITAIN": "United Kingdom",
+    "UAE": "United Arab Emirates",
+}
+
+FIRST_YEAR = 1990
+
+# Fields of a feed record holding the time it last changed, compared with the feed's watermark
+UPDATED_FIELDS = ("updated_at", "last_modified", "modified_at")
+
+_SCALE = {"K": 1e3, "M": 1e6, "B": 1e9, "T": 1e12}
+_NUMBER_RE = re.compile(r"^\$?\s*(-?[\d.]+)\s*([KMBT])?$", re.I)
+_RANGE_RE = re.compile(r"^([\d.]+\s*[KMBT]?)\s*(?:-|–|to)\s*([\d.]+\s*[KMBT]?)$", re.I)
+_TRUE = {"true", "t", "yes", "y", "1", "paid"}
+_FALSE = {"false", "f", "no", "n", "0", "unpaid", "not paid"}
+
+
+class FeedError(Exception):
+    """
+    FeedError is raised when a feed file cannot be read as a whole (missing,
+    not UTF-8, or not valid CSV / JSON); the underlying error is chained as its cause.
+    """
+
+
+def _text(value):
+    value = " ".join(str(value).split()) if value is not None else ""
+    return value or None
+
+
+def parse_number(value):
+    """
+    parse_number reads an amount as written by the feeds.
+
+    Example:
+        parse_number("$1,200,000") -> 1200000.0; parse_number("4.5B") -> 4500000000.0
+    """
+    if value is None or isinstance(value, (int, float)):
+        return value
+    text = str(value).replace(",", "").strip()
+    if not text:
+        return None
+    match = _NUMBER_RE.match(text)
+    if not match:
+        raise ValueError(f"not a number: {value!r}")
+    return float(match.group(1)) * _SCALE.get((match.group(2) or "").upper(), 1)
+
+
+def parse_bool(value):
+    if value is None or isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if not text:
+        return None
+    if text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    raise ValueError(f"not a yes/no value: {value!r}")
+
+
+def employees_range(value):
+    """
+    employees_range derives (employees_range_min, employees_range_max) from the
+    reported number of employees.
+
+    Example:
+        employees_range("1,001-5,000") -> (1001, 5000); employees_range("10k+") -> (10000, None)
+    """
+    text = (_text(value) or "").replace(",", "")
+    try:
+        if text.endswith("+"):
+            return int(parse_number(text[:-1])), None
+        match = _RANGE_RE.match(text)
+        if match:
+            low, high = int(parse_number(match.group(1))), int(parse_number(match.group(2)))
+            return min(low, high), max(low, high)
+        employees = parse_number(text)
+        return (int(employees), int(employees)) if employees is not None else (None, None)
+    except ValueError:
+        # The reported figure is kept as is; an unreadable one just has no range
+        return None, None
+
+
+def _year(value):
+    try:
+        year = int(str(value).strip())
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid year: {value!r}") from None
+    if not FIRST_YEAR <= year <= datetime.utcnow().year + 1:
+        raise ValueError(f"year out of range: {year}")
+    return year
+
+
+def _category(value):
+    category = (_text(value) or "").upper()
+    if not category:
+        raise ValueError("missing category")
+    return category
+
+
+def _key(*parts):
+    # Same as md5(concat_ws('|', ...)) of the _text-normalized columns in migrations/010_attack_data_loader.sql:
+    # NULL parts are skipped
+    return hashlib.md5("|".join(part for part in parts if part is not None).encode("utf-8")).hexdigest()
+
+
+def _lower(value):
+    return value.lower() if value is not None else None
+
+
+class Vocabulary:
+    """
+    The industry and location spellings of the organizations, so that attacks
+    compare equal to the organizations they are matched with.
+    """
+
+    def __init__(self, industries=(), locations=()):
+        self.industries = {value.lower(): value for value in industries if value}
+        self.locations = {value.lower(): value for value in locations if value}
+
+    def industry(self, value):
+        value = _text(value)
+        return self.industries.get(value.lower(), value) if value else None
+
+    def location(self, value):
+        value = _text(value)
+        if not value:
+            return None
+        value = LOCATION_ALIASES.get(value.upper(), value)
+        return self.locations.get(value.lower(), value)
+
+
+def load_vocabulary(cursor):
+    cursor.execute('SELECT DISTINCT industry, region FROM public."Organization"')
+    records = cursor.fetchall()
+    return Vocabulary({record[0] for record in records}, {record[1] for record in records})
+
+
+def normalize_attack(record, vocabulary):
+    """
+    normalize_attack validates a common_attack_data feed record and returns its
+    row (DATASETS["common_attack_data"]["columns"], without row_hash and loaded_on).
+
+    :raises ValueError: when the record is unusable
+    """
+    target = _text(record.get("target"))
+    if not target:
+        raise ValueError("missing target")
+    category = _category(record.get("category"))
+    source_url = _text(record.get("source_article_url") or record.get("source_url"))
+    number_employees = _text(record.get("number_employees"))
+    employees_min, employees_max = employees_range(number_employees)
+
+    return [
+        _key(category, _lower(target), _lower(source_url)),
+        category,
+        _year(record.get("year")),
+        target,
+        vocabulary.industry(record.get("industry")),
+        number_employees,
+        employees_min,
+        employees_max,
+        parse_number(record.get("market_cap")),
+        parse_number(record.get("revenue")),
+        vocabulary.location(record.get("location")),
+        parse_number(record.get("ransom_cost")),
+        parse_bool(record.get("ransom_paid")),
+        source_url,
+    ]
+
+
+def normalize_incident(record, vocabulary):
+    """
+    normalize_incident validates a security_incident feed record and returns its row.
+
+    :raises ValueError: when the record is unusable
+    """
+    title = _text(record.get("title"))
+    if not title:
+        raise ValueError("missing title")
+    category = _category(record.get("category"))
+
+    return [
+        _key(category, _lower(title)),
+        category,
+        _year(record.get("year")),
+        title,
+        record.get("description"),
+        _text(record.get("attack_vector")),
+        record.get("impact"),
+        record.get("mitigation_strategies"),
+    ]
+
+
+DATASETS = {
+    "common_attack_data": {
+        "columns": ["record_key", "category", "year", "target", "industry", "number_employees",
+                    "employees_range_min", "employees_range_max", "market_cap", "revenue", "location",
+                    "ransom_cost", "ransom_paid", "source_article_url"],
+        "normalize": normalize_attack,
+    },
+    "security_incident": {
+        "columns": ["record_key", "category", "year", "title", "description", "attack_vector", "impact",
+                    "mitigation_strategies"],
+        "normalize": normalize_incident,
+    },
+}
+
+
+def read_feed(path):
+    """
+    read_feed streams the records of a feed file: CSV with a header row, a JSON
+    list, or one JSON object per line (.jsonl / .ndjson). A line that is not JSON
+    is yielded as its ValueError, so that the caller counts it and reads on.
+
+    :raises FeedError: when the file cannot be read
+    """
+    try:
+        with open(path, encoding="utf-8-sig", newline="") as handle:
+            if path.endswith(".csv"):
+                yield from csv.DictReader(handle)
+            elif path.endswith(".json"):
+                records = json.load(handle)
+                if not isinstance(records, list):
+                    raise ValueError("a JSON feed is a list of records")
+                yield from records
+            else:
+                for number, line in enumerate(handle, 1):
+                    if line.strip():
+                        try:
+                            yield json.loads(line)
+                        except ValueError as e:
+                            yield ValueError(f"line {number} is not JSON: {e.msg}")
+    except (OSError, ValueError, csv.Error) as e:
+        raise FeedError(f"Feed file {os.path.basename(path)} could not be read: {e}") from e
+
+
+def _updated_at(record):
+    for field in UPDATED_FIELDS:
+        value = record.get(field)
+        if value:
+            try:
+                updated = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+            except ValueError:
+                continue
+            return updated.astimezone(timezone.utc).replace(tzinfo=None) if updated.tzinfo else updated
+    return None
+
+
+def _row_hash(row):
+    return hashlib.md5(json.dumps(row, default=str).encode("utf-8")).hexdigest()
+
+
+def dependent_views(cursor, tables):
+    """
+    dependent_views lists the materialized views built on the given tables, which
+    are stale once new records are loaded.
+    """
+    cursor.execute("""
+        SELECT DISTINCT v.oid::regclass::text
+        FROM pg_depend d
+        JOIN pg_rewrite r ON r.oid = d.objid
+        JOIN pg_class v ON v.oid = r.ev_class AND v.relkind = 'm'
+        WHERE d.classid = 'pg_rewrite'::regclass AND d.refobjid = ANY(%s::regclass[])
+    """, (["public." + table for table in tables],))
+    return [record[0] for record in cursor.fetchall()]
+
+
+def load(conn, dataset, paths, feed=None, full=False):
+    """
+    load upserts the records of feed files into a dataset (common_attack_data or
+    security_incident) through bulk_writer's COPY staging table. Records whose
+    updated_at field is older than the feed's watermark are skipped, and a record
+    whose values did not change is not rewritten. Records without a timestamp are
+    always read and do not move the watermark (a file's modification time is
+    that of its download, not of its records). Unparsable and invalid records are
+    counted and skipped. The watermark advances once every record is loaded; the
+    tables are then analyzed and the materialized views built on them refreshed.
+
+    :param paths: Feed files, in the order they were produced
+    :param feed: Name of the feed (default: the dataset), which keeps its own watermark
+    :param full: Ignore the watermark and read every record
+    :return: A summary dict
+    :raises FeedError: when a file cannot be read; the records of the chunks already written stay loaded
+    """
+    spec = DATASETS[dataset]
+    feed = f"{dataset}:{feed or dataset}"
+    started = time.perf_counter()
+    summary = {"dataset": dataset, "feed": feed, "read": 0, "unchanged_since_watermark": 0, "invalid": 0}
+    errors = {}
+
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT watermark FROM public.load_watermark WHERE feed = %s", (feed,))
+        record = cursor.fetchone()
+        vocabulary = load_vocabulary(cursor)
+    conn.rollback()
+    watermark = None if full or record is None else record[0]
+    latest = watermark
+    loaded_on = datetime.utcnow()
+
+    def rows():
+        nonlocal latest
+        for path in paths:
+            for record in read_feed(path):
+                summary["read"] += 1
+                try:
+                    if isinstance(record, ValueError):
+                        raise record
+                    if not isinstance(record, dict):
+                        raise ValueError("record is not an object")
+                    updated = _updated_at(record)
+                    if watermark is not None and updated is not None and updated < watermark:
+                        summary["unchanged_since_watermark"] += 1
+                        continue
+                    row = spec["normalize"](record, vocabulary)
+                except (TypeError, ValueError) as e:
+                    summary["invalid"] += 1
+                    errors[str(e)] = errors.get(str(e), 0) + 1
+                    continue
+                if updated is not None:
+                    latest = updated if latest is None else max(latest, updated)
+                yield row + [_row_hash(row), loaded_on]
+
+    written = bulk_writer.upsert(
+        conn, f"public.{dataset}", spec["columns"] + ["row_hash", "loaded_on"], ["record_key", "year"], rows(),
+        changed_column="row_hash",
+    )
+    summary.update(written=written["rows"], changed=written["changed"])
+
+    with conn.cursor() as cursor:
+        if latest is not None and latest != watermark:
+            cursor.execute("""
+                INSERT INTO public.load_watermark (feed, watermark, rows_changed, loaded_on) VALUES (%s, %s, %s, now())
+                ON CONFLICT (feed) DO UPDATE SET
+                    watermark = GREATEST(load_watermark.watermark, EXCLUDED.watermark),
+                    rows_changed = EXCLUDED.rows_changed,
+                    loaded_on = EXCLUDED.loaded_on
+            """, (feed, latest, written["changed"]))
+        views = dependent_views(cursor, [dataset]) if written["changed"] else []
+    conn.commit()
+
+    # Fresh planner statistics after a bulk load, and no stale view; the handlers' in-container caches
+    # (attack_similarity, financial_risk) expire on their own TTL
+    if written["changed"]:
+        with conn.cursor() as cursor:
+            cursor.execute(f"ANALYZE public.{dataset}")
+            for view in views:
+                cursor.execute(f"REFRESH MATERIALIZED VIEW {view}")
+        conn.commit()
+    summary["refreshed_views"] = views
+
+    summary["watermark"] = latest.isoformat() if latest else None
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    summary["errors"] = errors
+    get_logger().info("attack_data_loader", extra={"fields": summary})
+    return summary
@@ -0,0 +1,111 @@
+import math
+import os
+import time
+
+import numpy as np
+
+# How long a category's feature matrix is reused by the container before it is reloaded
+ATTACK_MATRIX_TTL_S = int(os.environ.get("ATTACK_MATRIX_TTL_S", "3600"))
+
+# Squared distance added when the victim's industry / location differs from the org's
+INDUSTRY_WEIGHT = 4.0
+LOCATION_WEIGHT = 1.0
+
+# category -> (expires_at, AttackMatrix)
+_cache = {}
+
+
+class AttackMatrix:
+    """
+    AttackMatrix holds the attacks of one category with their features: z-scored
+    log revenue and log employee range midpoint (missing values imputed at the
+    mean, i.e. 0), plus the lower-cased industry and location of each victim.
+    """
+
+    def __init__(self, records):
+        self.records = records
+
+        revenue = [_log(record[9]) for record in records]
+        employees = [_log(_employee_midpoint(record)) for record in records]
+        numeric = np.array([revenue, employees], dtype=float).T.reshape(len(records), 2)
+
+        # Missing figures are imputed at the mean, i.e. 0 once standardized
+        present = ~np.isnan(numeric)
+        counts = present.sum(axis=0)
+        self.mean = np.divide(np.where(present, numeric, 0).sum(axis=0), counts,
+                              out=np.zeros(2), where=counts > 0)
+        variance = np.divide(np.where(present, (numeric - self.mean) ** 2, 0).sum(axis=0), counts,
+                             out=np.zeros(2), where=counts > 0)
+        self.std = np.where(variance > 0, np.sqrt(variance), 1.0)
+        self.features = np.nan_to_num((numeric - self.mean) / self.std)
+
+        self.industries = np.array([(record[2] or "").lower() for record in records])
+        self.locations = np.array([(record[5] or "").lower() for record in records])
+        years = [record[0] for record in records if record[0] is not None]
+        self.period = (min(years), max(years)) if years else (None, None)
+
+    def nearest(self, k, revenue=None, employees=None, industry=None, location=None):
+        """
+        nearest ranks the victims by their distance to the org's profile and
+        returns the k closest, closest first. Profile fields left as None do not
+        contribute to the distance.
+
+        :return: A list of (record, distance)
+        """
+        n = len(self.records)
+        if n == 0 or k <= 0:
+            return []
+
+        distance = np.zeros(n)
+        for column, value in enumerate((revenue, employees)):
+            log_value = _log(value)
+            if not math.isnan(log_value):
+                distance += (self.features[:, column] - (log_value - self.mean[column]) / self.std[column]) ** 2
+        if industry:
+            distance += INDUSTRY_WEIGHT * (self.industries != industry.lower())
+        if location:
+            distance += LOCATION_WEIGHT * (self.locations != location.lower())
+
+        # Top-k selection in linear time; only the k selected rows are sorted
+        k = min(k, n)
+        closest = np.argpartition(distance, k - 1)[:k]
+        closest = closest[np.argsort(distance[closest], kind="stable")]
+        return [(self.records[i], float(distance[i])) for i in closest]
+
+
+def _log(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return math.nan
+    return math.log1p(value) if value >= 0 else math.nan
+
+
+def _employee_midpoint(record):
+    # employees_range_min / employees_range_max, else the reported number_employees
+    if record[10] is not None and record[11] is not None:
+        return (float(record[10]) + float(record[11])) / 2
+    return record[3]
+
+
+def load(conn, category):
+    """
+    load returns the category's AttackMatrix, reading common_attack_data only when
+    this container has no matrix for the category younger than ATTACK_MATRIX_TTL_S.
+    """
+    entry = _cache.get(category)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT year,target,industry,number_employees,market_cap,
+                   location,ransom_cost,ransom_paid,source_article_url,
+                   revenue,employees_range_min,employees_range_max
+            FROM common_attack_data
+            WHERE category = %s
+        """, (category,))
+        matrix = AttackMatrix(cursor.fetchall())
+
+    _cache[category] = (time.monotonic() + ATTACK_MATRIX_TTL_S, matrix)
+    return matrix
@@ -0,0 +1,88 @@
+import os
+
+# Upper bound of a single batch request
+MAX_BATCH_CATEGORIES = int(os.environ.get("MAX_BATCH_CATEGORIES", "50"))
+
+
+def split_list(value, upper=False):
+    """
+    split_list parses a comma separated query parameter, dropping blanks and duplicates.
+
+    Example:
+        split_list("ransomware, phishing,,RANSOMWARE", upper=True) -> ["RANSOMWARE", "PHISHING"]
+    """
+    items = []
+    for item in (value or "").split(","):
+        item = item.strip()
+        if upper:
+            item = item.upper()
+        if item and item not in items:
+            items.append(item)
+    return items
+
+
+def parse_org_ids(values):
+    """
+    parse_org_ids converts organization identifiers to ints, dropping duplicates
+    ("01" and "1" are the same organization).
+
+    :raises ValueError: when an identifier is not an integer
+    """
+    try:
+        return list(dict.fromkeys(int(value) for value in values))
+    except (TypeError, ValueError):
+        raise ValueError("Organization IDs must be integers")
+
+
+def batch_request(event):
+    """
+    batch_request reads the batch form of a per-org, per-category request:
+    categories=A,B,C for the organization of the path.
+
+    Other organizations cannot be listed (orgIds) until they are authorized
+    against the caller's identity (the authorizer claims of
+    event["requestContext"]); anything else would read another tenant's scores.
+
+    :return: (org_ids, categories), or None when the request is not a batch request
+    :raises ValueError: when orgIds is given, the path orgId is not an integer, or categories is empty or over its limit
+    """
+    parameters = event.get("queryStringParameters") or {}
+    if "orgIds" in parameters:
+        raise ValueError("orgIds is not supported; request each organization under its own path")
+    if "categories" not in parameters:
+        return None
+
+    org_ids = parse_org_ids([(event.get("pathParameters") or {}).get("orgId")])
+    categories = split_list(parameters["categories"], upper=True)
+
+    if not categories:
+        raise ValueError("At least one category is required")
+    if len(categories) > MAX_BATCH_CATEGORIES:
+        raise ValueError(f"At most {MAX_BATCH_CATEGORIES} categories per request")
+
+    return org_ids, categories
+
+
+def group_by_org(records, org_ids, categories, build):
+    """
+    group_by_org turns (org_id, category, ...) rows into {org_id: {category: value}},
+    with every requested category present (build(None) when there is no row).
+    org_ids are the ints of batch_request, compared with the ids of the rows as ints.
+
+    :param records: Rows of the batch query; organizations without scores appear with a NULL category
+    :param build: Maps a row (or None) to the value returned for the category
+    :return: (scores, missing_org_ids)
+    """
+    found = {}
+    for record in records:
+        org = found.setdefault(int(record[0]), {})
+        if record[1] is not None:
+            org[record[1]] = build(record)
+
+    scores = {
+        org_id: {category: found[org_id].get(category, build(None)) for category in categories}
+        for org_id in org_ids
+        if org_id in found
+    }
+    missing = [org_id for org_id in org_ids if org_id not in found]
+    return scores, missing
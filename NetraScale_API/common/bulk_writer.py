@@ -0,0 +1,141 @@
+import hashlib
+import io
+import os
+import time
+
+from common.logger import get_logger
+
+# Rows per COPY + merge transaction; bounds the staging table, the WAL of a single commit and the work lost on failure
+BULK_CHUNK_ROWS = int(os.environ.get("BULK_CHUNK_ROWS", "100000"))
+
+_TEXT_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _array_item(item):
+    if item is None:
+        return "NULL"
+    if isinstance(item, str):
+        return '"' + item.replace("\\", "\\\\").replace('"', '\\"') + '"'
+    return str(item)
+
+
+def _encode(value):
+    # COPY text format: tab separated, \N for NULL, backslash escapes for the separators
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (list, tuple)):
+        # One dimensional array literal, e.g. {1.5,2.0,NULL} or {"a b","c"}
+        return ("{" + ",".join(_array_item(item) for item in value) + "}").translate(_TEXT_ESCAPES)
+    return str(value).translate(_TEXT_ESCAPES)
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _copy_buffer(chunk):
+    return io.StringIO("".join("\t".join(_encode(value) for value in row) + "\n" for row in chunk))
+
+
+def upsert(conn, table, columns, key_columns, rows, update_columns=None, chunk_rows=None, changed_column=None,
+           returning=None):
+    """
+    upsert writes rows into table with COPY FROM STDIN into a temporary staging
+    table followed by a single INSERT ... ON CONFLICT DO UPDATE per chunk. Each
+    chunk is committed on its own, so a failure only rolls back the current chunk.
+
+    The conflict target (key_columns) must be covered by a unique index on table.
+    When a chunk holds several rows for the same key, one of them is kept.
+
+    :param conn: A database connection (common.db.connect()); must not have a transaction in progress
+    :param table: The target table, e.g. "public.historical_risk_score"
+    :param columns: The columns provided by each row, in order
+    :param key_columns: The columns of the conflict target
+    :param rows: An iterable of tuples (consumed lazily, chunk by chunk)
+    :param update_columns: The columns overwritten on conflict (default: every non-key column)
+    :param chunk_rows: Rows per transaction (default BULK_CHUNK_ROWS)
+    :param changed_column: A column (e.g. a content hash) whose equality means the stored row is unchanged;
+        such rows are not rewritten
+    :param returning: Columns to return of the rows actually inserted or updated, as summary["returned"]
+    :return: A summary dict with the rows written, the rows actually inserted or updated ("changed"),
+        chunks, seconds and rows per second (and "returned", a list of tuples, when returning is given)
+
+    Example:
+        upsert(conn, "public.match_score", ["organization_id", "year", "month", "category", "match_score"],
+               ["organization_id", "year", "month", "category"], rows)
+    """
+    chunk_rows = chunk_rows or BULK_CHUNK_ROWS
+    if update_columns is None:
+        update_columns = [column for column in columns if column not in key_columns]
+
+    column_list = ", ".join(columns)
+    # One staging table per table and column list, since it is kept for the session with the columns it was created with
+    staging = "bulk_stage_{}_{}".format(
+        table.rsplit(".", 1)[-1].strip('"').lower()[:40], hashlib.md5(column_list.encode("utf-8")).hexdigest()[:8]
+    )
+    key_list = ", ".join(key_columns)
+    if update_columns:
+        conflict_action = "DO UPDATE SET " + ", ".join(f"{column} = EXCLUDED.{column}" for column in update_columns)
+        if changed_column:
+            conflict_action += f" WHERE target.{changed_column} IS DISTINCT FROM EXCLUDED.{changed_column}"
+    else:
+        conflict_action = "DO NOTHING"
+
+    merge = f"""
+        INSERT INTO {table} AS target ({column_list})
+        SELECT DISTINCT ON ({key_list}) {column_list} FROM {staging}
+        ON CONFLICT ({key_list}) {conflict_action}
+    """
+    if returning:
+        merge += "RETURNING " + ", ".join(f"target.{column}" for column in returning)
+
+    written = 0
+    changed = 0
+    returned = []
+    chunks = 0
+    started = time.perf_counter()
+
+    with conn.cursor() as cursor:
+        # Session-local; emptied by every commit, so each chunk starts from an empty staging table
+        cursor.execute(f"""
+            CREATE TEMPORARY TABLE IF NOT EXISTS {staging} ON COMMIT DELETE ROWS
+            AS SELECT {column_list} FROM {table} WITH NO DATA
+        """)
+        conn.commit()
+
+        for chunk in _chunks(rows, chunk_rows):
+            try:
+                cursor.copy_expert(f"COPY {staging} ({column_list}) FROM STDIN", _copy_buffer(chunk))
+                cursor.execute(merge)
+                changed += max(cursor.rowcount, 0)
+                if returning:
+                    returned.extend(cursor.fetchall())
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            written += len(chunk)
+            chunks += 1
+
+    seconds = time.perf_counter() - started
+    summary = {
+        "table": table,
+        "rows": written,
+        "changed": changed,
+        "chunks": chunks,
+        "seconds": round(seconds, 3),
+        "rows_per_s": round(written / seconds) if seconds > 0 else None,
+    }
+    get_logger().info("bulk_upsert", extra={"fields": summary})
+    if returning:
+        summary["returned"] = returned
+    return summary
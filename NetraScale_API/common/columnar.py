@@ -0,0 +1,68 @@
+import json
+
+# Column types (by PostgreSQL type oid) kept as such in Arrow; anything else is written as text
+ARROW_TYPES = {
+    16: "bool", 20: "int64", 21: "int64", 23: "int64", 700: "float64", 701: "float64", 1700: "float64",
+    1082: "date32", 1114: "timestamp", 1184: "timestamptz",
+}
+
+
+def _arrow_column(pa, type_code, values):
+    kind = ARROW_TYPES.get(type_code)
+    if kind == "timestamp":
+        return pa.array(values, type=pa.timestamp("us"))
+    if kind == "timestamptz":
+        return pa.array(values, type=pa.timestamp("us", tz="UTC"))
+    if kind == "date32":
+        return pa.array(values, type=pa.date32())
+    if kind == "bool":
+        return pa.array(values, type=pa.bool_())
+    if kind:
+        convert = int if kind == "int64" else float
+        return pa.array([None if v is None else convert(v) for v in values], type=getattr(pa, kind)())
+    return pa.array(
+        [None if v is None else json.dumps(v, default=str) if isinstance(v, (list, dict)) else str(v) for v in values],
+        type=pa.string(),
+    )
+
+
+def record_batch(pa, description, rows):
+    """
+    record_batch converts fetched rows to an Arrow table whose schema comes from
+    the cursor's column types, so it does not depend on the values of the batch.
+    """
+    columns = [_arrow_column(pa, column.type_code, [row[index] for row in rows]) for index, column in enumerate(description)]
+    return pa.Table.from_arrays(columns, names=[column.name for column in description])
+
+
+def write_parquet(cursor, sink, batch_rows):
+    """
+    write_parquet streams the result of an executed (server-side) cursor into
+    Parquet, one row group per batch_rows rows, so memory stays bounded by a
+    single batch. An empty result still produces a file with its schema.
+
+    :param sink: A path or a binary file object
+    :return: The number of rows written
+    """
+    # pyarrow is only needed by the jobs and endpoints writing Parquet
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    rows_written = 0
+    rows = cursor.fetchmany(batch_rows)
+    try:
+        while True:
+            batch = record_batch(pa, cursor.description, rows)
+            if writer is None:
+                writer = pq.ParquetWriter(sink, batch.schema, compression="zstd")
+            writer.write_table(batch)
+            rows_written += len(rows)
+
+            rows = cursor.fetchmany(batch_rows)
+            if not rows:
+                break
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows_written
@@ -0,0 +1,74 @@
+import contextvars
+import time
+
+# The request currently being served by this container (None outside a handler)
+_current = contextvars.ContextVar("netrascale_request", default=None)
+
+
+class RequestContext:
+    """
+    RequestContext holds the per-invocation details that the common helpers
+    report on: route, organization, timing, row count and response status.
+    """
+
+    def __init__(self, route, event, context, cold):
+        self.route = route
+        self.request_id = getattr(context, "aws_request_id", None)
+        self.cold = cold
+
+        path_parameters = (event or {}).get("pathParameters") or {}
+        self.org_id = path_parameters.get("orgId")
+
+        self.started = time.perf_counter()
+        self.latency_ms = None
+        self.rows = None
+        self.status = None
+
+        # Accumulated milliseconds per instrumented phase (connect, query, map_rows, ...)
+        self.phases = {}
+
+        # Database usage counted by common.db: statements executed and client/server round trips
+        self.queries = 0
+        self.round_trips = 0
+
+    def add_phase(self, name, elapsed_ms):
+        self.phases[name] = self.phases.get(name, 0.0) + elapsed_ms
+
+    def count_statements(self, statements, round_trips):
+        self.queries += statements
+        self.round_trips += round_trips
+
+    def finish(self, status):
+        self.status = status
+        self.latency_ms = round((time.perf_counter() - self.started) * 1000, 2)
+
+
+def activate(ctx):
+    """
+    activate makes ctx the current request and returns a token for deactivate().
+    """
+    return _current.set(ctx)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+def current():
+    """
+    current returns the RequestContext of the invocation in progress, or None
+    when called outside a decorated handler (e.g. from a script).
+    """
+    return _current.get()
+
+
+def record_rows(count):
+    """
+    record_rows stores the number of rows the handler returned so that it is
+    included in the per-request log line.
+
+    :param count: The number of rows returned to the client
+    """
+    ctx = _current.get()
+    if ctx is not None:
+        ctx.rows = count
@@ -0,0 +1,150 @@
+import json
+import os
+import time
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2.extras import RealDictCursor
+
+from common import slow_queries, sql_comments
+from common.context import current
+from common.logger import get_logger
+from common.metrics import phase, record_phase
+
+# Upper bound for the EXPLAIN run on the side connection so it cannot stall the request
+EXPLAIN_TIMEOUT_MS = int(os.environ.get("EXPLAIN_TIMEOUT_MS", "5000"))
+
+
+class _InstrumentedCursorMixin:
+    """
+    Tags every statement with the request's route/request id comment, times it
+    as the "query" phase of the current request and hands statements slower than
+    SLOW_QUERY_MS to the slow query capture.
+    """
+
+    def execute(self, query, vars=None):
+        query = sql_comments.tag(query, vars is not None)
+        _count(1, 1)
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            self._statement_done(query, vars, started)
+
+    def executemany(self, query, vars_list):
+        # psycopg2 sends one statement (and waits for one reply) per parameter set
+        vars_list = list(vars_list)
+        query = sql_comments.tag(query, True)
+        _count(len(vars_list), len(vars_list))
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            self._statement_done(query, None, started)
+
+    def copy_expert(self, sql, file, size=8192):
+        # The COPY data is streamed within the statement's single exchange
+        sql = sql_comments.tag(sql, False)
+        _count(1, 1)
+        started = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            self._statement_done(sql, None, started)
+
+    def _statement_done(self, query, vars, started):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        record_phase("query", elapsed_ms)
+
+        if elapsed_ms >= slow_queries.SLOW_QUERY_MS:
+            slow_queries.capture(query, vars, elapsed_ms, self.rowcount, explain=explain)
+
+
+class InstrumentedCursor(_InstrumentedCursorMixin, psycopg2.extensions.cursor):
+    pass
+
+
+class InstrumentedRealDictCursor(_InstrumentedCursorMixin, RealDictCursor):
+    pass
+
+
+class InstrumentedConnection(psycopg2.extensions.connection):
+    """
+    Counts COMMIT and ROLLBACK as round trips of the current request.
+    """
+
+    def commit(self):
+        _count(0, 1)
+        return super().commit()
+
+    def rollback(self):
+        _count(0, 1)
+        return super().rollback()
+
+
+def _count(statements, round_trips):
+    ctx = current()
+    if ctx is not None:
+        ctx.count_statements(statements, round_trips)
+
+
+def _open(cursor_factory=None, connection_factory=None):
+    return psycopg2.connect(
+        host=os.environ['DB_HOST'],
+        database=os.environ['DB_NAME'],
+        user=os.environ['DB_USER'],
+        password=os.environ['DB_PASSWORD'],
+        port=os.environ.get('DB_PORT', 5432),
+        connection_factory=connection_factory,
+        cursor_factory=cursor_factory
+    )
+
+
+def connect(dict_rows=False):
+    """
+    connect opens a connection to the NetraScale database using the DB_*
+    environment variables. Connecting and every statement executed on its
+    cursors are timed as phases of the current request, and counted towards
+    its queries and round trips.
+
+    :param dict_rows: Return rows as dictionaries (RealDictCursor) instead of tuples
+    :return: A psycopg2 connection
+    """
+    # Connection start-up (authentication, parameter exchange) counts as one round trip
+    _count(0, 1)
+    with phase("connect"):
+        return _open(
+            cursor_factory=InstrumentedRealDictCursor if dict_rows else InstrumentedCursor,
+            connection_factory=InstrumentedConnection
+        )
+
+
+def explain(query, vars, analyze=False):
+    """
+    explain captures the plan of a statement on a separate, uninstrumented
+    connection. The transaction is always rolled back.
+
+    :param query: The statement to explain
+    :param vars: The statement parameters
+    :param analyze: Run EXPLAIN (ANALYZE, BUFFERS) - only for read-only statements
+    :return: The parsed EXPLAIN (FORMAT JSON) output, or None if it could not be captured
+    """
+    if not isinstance(query, str):
+        return None
+
+    options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+    conn = None
+    try:
+        conn = _open()
+        with conn.cursor() as cursor:
+            cursor.execute("SET LOCAL statement_timeout = %s", (EXPLAIN_TIMEOUT_MS,))
+            cursor.execute(f"EXPLAIN ({options}) {query}", vars)
+            plan = cursor.fetchone()[0]
+        return json.loads(plan) if isinstance(plan, str) else plan
+    except psycopg2.Error as e:
+        get_logger().warning("Unable to capture plan: %s", e)
+        return None
+    finally:
+        if conn:
+            conn.rollback()
+            conn.close()
@@ -0,0 +1,304 @@
+import csv
+import io
+import json
+import os
+import time
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+from common import columnar
+from common.logger import get_logger
+
+# Exports are uploaded to this bucket and handed out as presigned links
+EXPORT_BUCKET = os.environ.get("EXPORT_BUCKET")
+EXPORT_PREFIX = os.environ.get("EXPORT_PREFIX", "exports")
+
+# Local directory standing in for the bucket (development with scripts/local_harness.py)
+EXPORT_DIR = os.environ.get("EXPORT_DIR")
+
+# Seconds a download link stays valid
+EXPORT_URL_TTL_S = int(os.environ.get("EXPORT_URL_TTL_S", "3600"))
+
+# Exports of more rows than this run in an asynchronous invocation of the function, since API Gateway ends
+# a request after 29 s; the response is a 202 with the link the file will appear at
+EXPORT_SYNC_ROWS = int(os.environ.get("EXPORT_SYNC_ROWS", "500000"))
+
+# Rows per fetch from the server-side cursor, and bytes per multipart upload part (S3 minimum: 5 MB)
+EXPORT_BATCH_ROWS = int(os.environ.get("EXPORT_BATCH_ROWS", "10000"))
+EXPORT_PART_BYTES = max(int(os.environ.get("EXPORT_PART_BYTES", str(8 * 1024 * 1024))), 5 * 1024 * 1024)
+
+# Exportable tables, in the order of their (organization_id, ...) keys so the cursor walks an index
+DATASETS = {
+    "historical_risk_score": "SELECT * FROM public.historical_risk_score WHERE organization_id = %s ORDER BY year, month, category",
+    "match_score": "SELECT * FROM public.match_score WHERE organization_id = %s ORDER BY year, month, category",
+    "evidence_collection": "SELECT * FROM public.evidence_collection WHERE organization_id = %s ORDER BY year, evidence_id",
+}
+
+# Rows of a dataset for the organization o, read with the organization check
+ROW_COUNT = "(SELECT COUNT(*) FROM public.{dataset} WHERE organization_id = o.id)"
+
+FORMATS = {
+    "csv": ("csv", "text/csv"),
+    "ndjson": ("ndjson", "application/x-ndjson"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+
+class ExportError(Exception):
+    """
+    ExportError is raised when the export cannot be written to or linked from S3;
+    the botocore error is chained as its cause.
+    """
+
+
+class MultipartUpload:
+    """
+    A write-only binary file object uploading to S3 in EXPORT_PART_BYTES parts,
+    so at most one part is held in memory whatever the size of the object.
+    """
+
+    def __init__(self, client, bucket, key, content_type, part_bytes=EXPORT_PART_BYTES):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.part_bytes = part_bytes
+        self.upload_id = client.create_multipart_upload(Bucket=bucket, Key=key, ContentType=content_type)["UploadId"]
+        self.buffer = bytearray()
+        self.parts = []
+        self.size = 0
+        self.closed = False
+
+    def write(self, data):
+        self.buffer += data
+        self.size += len(data)
+        while len(self.buffer) >= self.part_bytes:
+            self._upload_part(bytes(self.buffer[:self.part_bytes]))
+            del self.buffer[:self.part_bytes]
+        return len(data)
+
+    def tell(self):
+        return self.size
+
+    def flush(self):
+        pass
+
+    def writable(self):
+        return True
+
+    def _upload_part(self, body):
+        number = len(self.parts) + 1
+        response = self.client.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id, PartNumber=number, Body=body
+        )
+        self.parts.append({"PartNumber": number, "ETag": response["ETag"]})
+
+    def close(self):
+        # The last part may be smaller than the minimum (or empty, for an empty object)
+        if self.closed:
+            return
+        if self.buffer or not self.parts:
+            self._upload_part(bytes(self.buffer))
+            self.buffer = bytearray()
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id, MultipartUpload={"Parts": self.parts}
+        )
+        self.closed = True
+
+    def abort(self):
+        if not self.closed:
+            self.closed = True
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def write_csv(cursor, sink, batch_rows):
+    # A server-side cursor only describes its columns after the first fetch
+    rows = cursor.fetchmany(batch_rows)
+    text = io.StringIO()
+    writer = csv.writer(text)
+    writer.writerow([column.name for column in cursor.description])
+
+    rows_written = 0
+    while True:
+        writer.writerows(rows)
+        sink.write(text.getvalue().encode("utf-8"))
+        text.seek(0)
+        text.truncate()
+        rows_written += len(rows)
+
+        rows = cursor.fetchmany(batch_rows)
+        if not rows:
+            return rows_written
+
+
+def write_ndjson(cursor, sink, batch_rows):
+    rows = cursor.fetchmany(batch_rows)
+    columns = [column.name for column in cursor.description]
+
+    rows_written = 0
+    while rows:
+        lines = "".join(json.dumps(dict(zip(columns, row)), default=_json_default) + "\n" for row in rows)
+        sink.write(lines.encode("utf-8"))
+        rows_written += len(rows)
+        rows = cursor.fetchmany(batch_rows)
+    return rows_written
+
+
+WRITERS = {"csv": write_csv, "ndjson": write_ndjson, "parquet": columnar.write_parquet}
+
+
+def export_name(dataset, export_format):
+    """
+    export_name returns a new, unique file name for an export.
+    """
+    extension = FORMATS[export_format][0]
+    return f"{dataset}-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}.{extension}"
+
+
+def _presign(client, key, name=None):
+    params = {"Bucket": EXPORT_BUCKET, "Key": key}
+    if name:
+        params["ResponseContentDisposition"] = f'attachment; filename="{name}"'
+    return client.generate_presigned_url("get_object", Params=params, ExpiresIn=EXPORT_URL_TTL_S)
+
+
+def _status_key(org_id, name):
+    return f"{EXPORT_PREFIX}/{org_id}/{name}.status.json"
+
+
+def start(function_name, org_id, dataset, export_format):
+    """
+    start hands an export over to an asynchronous invocation of function_name,
+    which calls export() with the same name, and returns the link the file will
+    be downloadable from once written (the link answers 404 until then) and the
+    link of its status object, written by write_status when the export ends.
+
+    :return: A summary dict with "status": "pending", the "url", the "status_url" and their "expires_in" seconds
+    :raises ExportError: when the invocation or the links cannot be made
+    """
+    import boto3
+    from botocore.exceptions import BotoCoreError, ClientError
+
+    name = export_name(dataset, export_format)
+    try:
+        boto3.client("lambda").invoke(
+            FunctionName=function_name,
+            InvocationType="Event",
+            Payload=json.dumps({"export": {
+                "orgId": org_id, "dataset": dataset, "format": export_format, "name": name,
+            }}).encode("utf-8"),
+        )
+        client = boto3.client("s3")
+        url = _presign(client, f"{EXPORT_PREFIX}/{org_id}/{name}", name)
+        status_url = _presign(client, _status_key(org_id, name))
+    except (BotoCoreError, ClientError) as e:
+        raise ExportError(f"Export could not be started: {e}") from e
+
+    get_logger().info("export_started", extra={"fields": {
+        "organization_id": org_id, "dataset": dataset, "format": export_format, "name": name,
+    }})
+    return {
+        "dataset": dataset, "format": export_format, "status": "pending",
+        "url": url, "status_url": status_url, "expires_in": EXPORT_URL_TTL_S,
+    }
+
+
+def write_status(org_id, name, status):
+    """
+    write_status stores the outcome of an asynchronous export as the JSON object
+    behind the status_url of start(), so a client holding the links learns that
+    an export failed instead of waiting for a file that never appears.
+
+    :param status: A dict with "status": "complete" (and the export summary) or "failed" (and the "error")
+    """
+    import boto3
+    from botocore.exceptions import BotoCoreError, ClientError
+
+    try:
+        boto3.client("s3").put_object(
+            Bucket=EXPORT_BUCKET, Key=_status_key(org_id, name),
+            Body=json.dumps(status).encode("utf-8"), ContentType="application/json",
+        )
+    except (BotoCoreError, ClientError):
+        # The outcome is still logged by the caller; only the status link keeps answering 404
+        get_logger().warning("export_status_failed", extra={"fields": {"organization_id": org_id, "name": name}})
+
+
+def export(conn, org_id, dataset, export_format, name=None):
+    """
+    export streams an organization's rows of a dataset through a server-side cursor,
+    EXPORT_BATCH_ROWS at a time, encodes each batch as it arrives and uploads the
+    result to EXPORT_BUCKET with a multipart upload (or writes it under EXPORT_DIR).
+    Memory stays bounded by one batch and one upload part, whatever the row count.
+
+    :param dataset: A DATASETS key
+    :param export_format: A FORMATS key
+    :param name: The file name (default: a new export_name)
+    :return: A summary dict with the download "url" (a presigned link) and its "expires_in" seconds
+    :raises ExportError: when S3 rejects the upload; a started multipart upload is aborted
+    """
+    content_type = FORMATS[export_format][1]
+    name = name or export_name(dataset, export_format)
+    key = f"{EXPORT_PREFIX}/{org_id}/{name}"
+    started = time.perf_counter()
+
+    with conn.cursor(name=f"export_{uuid.uuid4().hex}") as cursor:
+        cursor.itersize = EXPORT_BATCH_ROWS
+        cursor.execute(DATASETS[dataset], (org_id,))
+
+        if EXPORT_DIR:
+            path = os.path.join(EXPORT_DIR, key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as sink:
+                rows = WRITERS[export_format](cursor, sink, EXPORT_BATCH_ROWS)
+                size = sink.tell()
+            url, expires_in = f"file://{os.path.abspath(path)}", None
+        else:
+            # boto3 is only imported when an export is actually requested
+            import boto3
+            from botocore.exceptions import BotoCoreError, ClientError
+
+            client = boto3.client("s3")
+            sink = None
+            try:
+                sink = MultipartUpload(client, EXPORT_BUCKET, key, content_type)
+                rows = WRITERS[export_format](cursor, sink, EXPORT_BATCH_ROWS)
+                sink.close()
+                url = _presign(client, key, name)
+            except (BotoCoreError, ClientError) as e:
+                _abort(sink)
+                raise ExportError(f"Export upload failed: {e}") from e
+            except Exception:
+                _abort(sink)
+                raise
+            size = sink.size
+            expires_in = EXPORT_URL_TTL_S
+    conn.rollback()
+
+    summary = {
+        "dataset": dataset,
+        "format": export_format,
+        "rows": rows,
+        "bytes": size,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    get_logger().info("export", extra={"fields": dict(summary, organization_id=org_id)})
+    return dict(summary, url=url, expires_in=expires_in)
+
+
+def _abort(sink):
+    # The original error is the one reported; a failed abort only leaves the uploaded parts behind
+    if sink is None:
+        return
+    try:
+        sink.abort()
+    except Exception:
+        get_logger().warning("export_abort_failed", extra={"fields": {"key": sink.key}})
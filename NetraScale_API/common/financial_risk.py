@@ -0,0 +1,286 @@
+import hashlib
+import os
+import time
+
+import numpy as np
+
+from common.mitigation import MITIGATION_FACTORS, RECOMMENDED_MITIGATION
+
+# Simulated years per assessment; requests may ask for fewer or more, up to FINANCIAL_RISK_MAX_SAMPLES
+FINANCIAL_RISK_SAMPLES = int(os.environ.get("FINANCIAL_RISK_SAMPLES", "100000"))
+FINANCIAL_RISK_MAX_SAMPLES = int(os.environ.get("FINANCIAL_RISK_MAX_SAMPLES", "1000000"))
+
+# Incidents simulated one by one per assessment at most; profiles expecting more draw each year's total loss
+# from its compound distribution instead (see simulate)
+FINANCIAL_RISK_MAX_EVENTS = int(os.environ.get("FINANCIAL_RISK_MAX_EVENTS", "1000000"))
+
+# How long an org's assessment is served from the container cache
+FINANCIAL_RISK_CACHE_TTL_S = int(os.environ.get("FINANCIAL_RISK_CACHE_TTL_S", "3600"))
+FINANCIAL_RISK_CACHE_SIZE = int(os.environ.get("FINANCIAL_RISK_CACHE_SIZE", "1000"))
+
+# Expected incidents per year for each probability_of_occurrence
+# (undetermined, low, medium, high, critical)
+ARO_BY_PROBABILITY = np.array([0.25, 0.1, 0.3, 0.6, 1.0])
+
+# Attack records needed before an industry's (or a category's) loss distribution is trusted
+MIN_LOSS_RECORDS = 3
+
+# Used when neither the org nor the attack data provide any loss figure
+DEFAULT_LOSS_MEDIAN = 10000.0
+DEFAULT_LOSS_SIGMA = 1.0
+
+PERCENTILES = [50, 90, 95, 99]
+
+# Lower bounds of the Medium, High and Critical impact ratings, applied to the annualized loss expectancy
+IMPACT_RATING_BOUNDS = [50000, 250000, 1000000]
+IMPACT_RATINGS = ["Low", "Medium", "High", "Critical"]
+
+# (org_id, samples) -> (expires_at, assessment)
+_cache = {}
+
+# (expires_at, load_loss_statistics result), shared by every org the container serves
+_loss_statistics = None
+
+
+def load_profile(conn, org_id):
+    """
+    load_profile reads the org's industry and its threat summaries in one statement.
+
+    :return: (industry, [(category, probability, breach_cost, risk_status), ...]) or None if the org does not exist
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT o.industry, UPPER(t.common_threat), COALESCE(t.probability_of_occurrence, 0),
+                   COALESCE(t.breach_cost, 0), COALESCE(t.risk_status, 0)
+            FROM public."Organization" o
+            LEFT JOIN public.organization_common_threat_summary t ON t.organization_id = o.id
+            WHERE o.id = %s
+        """, (org_id,))
+        records = cursor.fetchall()
+
+    if not records:
+        return None
+
+    threats = [(record[1], record[2], float(record[3]), record[4]) for record in records if record[1] is not None]
+    return records[0][0], threats
+
+
+def load_loss_statistics(conn):
+    """
+    load_loss_statistics aggregates the log ransom costs in common_attack_data by
+    category and industry. The aggregate does not depend on the org, so it is read
+    once per container and reused for FINANCIAL_RISK_CACHE_TTL_S.
+
+    :return: {category: {industry: (count, sum of ln cost, sum of squared ln cost)}}
+    """
+    global _loss_statistics
+
+    if _loss_statistics and _loss_statistics[0] > time.monotonic():
+        return _loss_statistics[1]
+
+    statistics = {}
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT UPPER(category), industry, COUNT(*), SUM(LN(ransom_cost)), SUM(LN(ransom_cost) ^ 2)
+            FROM public.common_attack_data
+            WHERE ransom_cost > 0
+            GROUP BY UPPER(category), industry
+        """)
+        for category, industry, count, total, squares in cursor.fetchall():
+            statistics.setdefault(category, {})[industry] = (int(count), float(total), float(squares))
+
+    _loss_statistics = (time.monotonic() + FINANCIAL_RISK_CACHE_TTL_S, statistics)
+    return statistics
+
+
+def _fit(count, total, squares):
+    # Mean and sample standard deviation of ln cost, None where undefined (as AVG and STDDEV_SAMP)
+    if not count:
+        return None, None
+    mu = total / count
+    sigma = float(np.sqrt(max(squares - total * mu, 0.0) / (count - 1))) if count > 1 else None
+    return mu, sigma
+
+
+def loss_parameters(statistics, industry):
+    """
+    loss_parameters fits a log-normal loss per category from the aggregate of
+    load_loss_statistics, both for the org's industry and across all industries.
+
+    :return: {category: (industry_count, industry_mu, industry_sigma, count, mu, sigma)}
+    """
+    parameters = {}
+    for category, by_industry in statistics.items():
+        industry_count, industry_total, industry_squares = by_industry.get(industry, (0, 0.0, 0.0))
+        count, total, squares = (sum(values) for values in zip(*by_industry.values()))
+        parameters[category] = (
+            industry_count, *_fit(industry_count, industry_total, industry_squares), count, *_fit(count, total, squares)
+        )
+    return parameters
+
+
+def _loss_distribution(breach_cost, parameters):
+    # Org estimate first, then the industry's attacks, then all attacks of the category
+    industry_count, industry_mu, industry_sigma, count, mu, sigma = parameters or (0, None, None, 0, None, None)
+
+    if industry_count >= MIN_LOSS_RECORDS:
+        fitted_mu, fitted_sigma = industry_mu, industry_sigma
+    elif count >= MIN_LOSS_RECORDS:
+        fitted_mu, fitted_sigma = mu, sigma
+    else:
+        fitted_mu, fitted_sigma = np.log(DEFAULT_LOSS_MEDIAN), DEFAULT_LOSS_SIGMA
+
+    if breach_cost > 0:
+        fitted_mu = np.log(breach_cost)
+
+    return fitted_mu, fitted_sigma or DEFAULT_LOSS_SIGMA
+
+
+def _compound_annual(rng, rates, mu, sigma, samples):
+    """
+    _compound_annual draws every year's total loss directly: the year's incidents
+    N ~ Poisson(sum of rates), a single incident from the category mixture, and
+    the sum of N >= 2 incidents from the log-normal with the same mean and variance
+    (Fenton-Wilkinson), so the cost no longer grows with the number of incidents.
+    """
+    total_rate = float(rates.sum())
+    weights = rates / total_rate
+    event_mean = float(weights @ np.exp(mu + sigma ** 2 / 2))
+    event_variance = float(weights @ np.exp(2 * mu + 2 * sigma ** 2)) - event_mean ** 2
+
+    counts = rng.poisson(total_rate, samples)
+    annual = np.zeros(samples)
+
+    single = np.flatnonzero(counts == 1)
+    category = rng.choice(len(rates), size=single.size, p=weights)
+    annual[single] = np.exp(rng.standard_normal(single.size) * sigma[category] + mu[category])
+
+    several = np.flatnonzero(counts > 1)
+    n = counts[several]
+    log_variance = np.log1p(event_variance / (n * event_mean ** 2))
+    annual[several] = np.exp(
+        np.log(n * event_mean) - log_variance / 2 + np.sqrt(log_variance) * rng.standard_normal(several.size)
+    )
+    return annual
+
+
+def simulate(rates, mu, sigma, residual, samples, seed):
+    """
+    simulate runs a compound Poisson Monte Carlo over samples years: incidents per
+    category follow Poisson(rate) and each incident's loss is log-normal(mu, sigma).
+    A category's incidents over all years are drawn as one Poisson(rate * samples)
+    total and spread uniformly over the years, which gives the same per-year counts
+    as a draw per year and category without materializing the (samples x categories)
+    matrix. The cost of inaction is the loss the org would avoid by moving from its
+    current mitigation approach to the recommended one; both scenarios scale the
+    same draws, so the difference is free of sampling noise.
+
+    When the expected incidents exceed FINANCIAL_RISK_MAX_EVENTS, every year's total
+    is drawn from its compound distribution instead (_compound_annual): all samples
+    years still run within the request's time budget, the SLE and the cost of
+    inaction's share of the ALE come from the fitted distributions, and the result
+    is flagged "approximated".
+
+    :param rates: Expected incidents per year, per category
+    :param mu: Log-normal location of a single loss, per category
+    :param sigma: Log-normal scale of a single loss, per category
+    :param residual: Share of each loss remaining under the org's current mitigation approach, per category
+    :param samples: Simulated years
+    :param seed: Seed for a reproducible simulation
+    :return: A dict of the loss statistics
+    """
+    rng = np.random.default_rng(seed)
+
+    # Categories already mitigated at least as well as recommended contribute nothing
+    avoidable = np.clip(residual - MITIGATION_FACTORS[RECOMMENDED_MITIGATION], 0, None)
+
+    if float(rates.sum()) * samples > FINANCIAL_RISK_MAX_EVENTS:
+        annual = _compound_annual(rng, rates, mu, sigma, samples)
+        expected = rates * np.exp(mu + sigma ** 2 / 2)
+        ale = float(annual.mean())
+        return {
+            "ale": ale,
+            "sle": float(expected.sum() / rates.sum()),
+            "aro": float(rates.sum()),
+            "percentiles": dict(zip(PERCENTILES, np.percentile(annual, PERCENTILES).tolist())),
+            "cost_of_inaction": ale * float(expected @ avoidable / expected.sum()),
+            "samples": samples,
+            "approximated": True,
+        }
+
+    per_category = rng.poisson(rates * samples)
+    losses = np.exp(
+        rng.standard_normal(int(per_category.sum())) * np.repeat(sigma, per_category) + np.repeat(mu, per_category)
+    )
+    annual = np.bincount(rng.integers(0, samples, losses.size), weights=losses, minlength=samples)
+
+    return {
+        "ale": float(losses.sum()) / samples,
+        "sle": float(losses.mean()) if losses.size else 0.0,
+        "aro": float(rates.sum()),
+        "percentiles": dict(zip(PERCENTILES, np.percentile(annual, PERCENTILES).tolist())),
+        "cost_of_inaction": float(losses @ np.repeat(avoidable, per_category)) / samples,
+        "samples": samples,
+        "approximated": False,
+    }
+
+
+def impact_rating(ale):
+    return IMPACT_RATINGS[int(np.searchsorted(IMPACT_RATING_BOUNDS, ale, side="right"))]
+
+
+def cached(org_id, samples):
+    """
+    cached returns the org's assessment computed by this container within
+    FINANCIAL_RISK_CACHE_TTL_S, or None.
+    """
+    entry = _cache.get((org_id, samples))
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+    return None
+
+
+def assess(conn, org_id, samples=None):
+    """
+    assess simulates the org's annual losses from its threat summaries and the
+    attack data of its industry, and caches the result per org and sample count.
+
+    :param conn: A database connection (common.db.connect())
+    :param org_id: The organization identifier
+    :param samples: Simulated years (default FINANCIAL_RISK_SAMPLES)
+    :return: The assessment dict, or None if the org does not exist
+    """
+    samples = samples or FINANCIAL_RISK_SAMPLES
+
+    profile = load_profile(conn, org_id)
+    if profile is None:
+        return None
+    industry, threats = profile
+
+    if threats:
+        parameters = loss_parameters(load_loss_statistics(conn), industry)
+        distributions = [_loss_distribution(cost, parameters.get(category)) for category, _, cost, _ in threats]
+        rates = ARO_BY_PROBABILITY[np.clip([threat[1] for threat in threats], 0, len(ARO_BY_PROBABILITY) - 1)]
+        residual = MITIGATION_FACTORS[np.clip([threat[3] for threat in threats], 0, len(MITIGATION_FACTORS) - 1)]
+
+        # Seeded by org so repeated requests (and other containers) report the same figures
+        seed = int.from_bytes(hashlib.sha1(str(org_id).encode()).digest()[:8], "big")
+        result = simulate(
+            rates,
+            np.array([distribution[0] for distribution in distributions], dtype=float),
+            np.array([distribution[1] for distribution in distributions], dtype=float),
+            residual,
+            samples,
+            seed,
+        )
+    else:
+        result = {"ale": 0.0, "sle": 0.0, "aro": 0.0, "percentiles": dict.fromkeys(PERCENTILES, 0.0),
+                  "cost_of_inaction": 0.0, "samples": samples, "approximated": False}
+
+    result["impact_rating"] = impact_rating(result["ale"])
+
+    # Oldest entry first out, so a container serving many orgs keeps a bounded cache
+    if len(_cache) >= FINANCIAL_RISK_CACHE_SIZE:
+        _cache.pop(next(iter(_cache)))
+    _cache[(org_id, samples)] = (time.monotonic() + FINANCIAL_RISK_CACHE_TTL_S, result)
+    return result
@@ -0,0 +1,247 @@
+import os
+import time
+from datetime import datetime
+
+from common import bulk_writer
+from common.logger import get_logger
+
+# Months forecast per series; requests may ask for up to this many
+FORECAST_HORIZON = int(os.environ.get("FORECAST_HORIZON", "12"))
+
+# Months of history the models are fitted on, and the observations a series needs to be forecast
+FORECAST_HISTORY_MONTHS = int(os.environ.get("FORECAST_HISTORY_MONTHS", "36"))
+FORECAST_MIN_POINTS = 3
+
+# Smoothing constants tried for every series (the lowest one-step-ahead error wins); trend smoothing is fixed
+LEVEL_SMOOTHING_GRID = [0.2, 0.4, 0.6, 0.8]
+TREND_SMOOTHING = 0.1
+
+# z value of the confidence band (80% two-sided)
+BAND_Z = 1.2816
+
+# Category under which the overall_risk_score series is forecast
+OVERALL = "OVERALL"
+
+FORECAST_QUERY = """
+    SELECT year, month, forecast, lower_bound, upper_bound
+    FROM public.risk_score_forecast
+    WHERE organization_id = %s AND category = %s
+    ORDER BY year, month
+    LIMIT %s
+"""
+
+
+def read_forecast(cursor, org_id, category, months):
+    """
+    read_forecast returns the cached projections of one series; nothing is fitted
+    at request time.
+
+    :param cursor: A cursor of the request's connection
+    :param org_id: The organization identifier
+    :param category: The score category, or OVERALL
+    :param months: Months ahead to return (1 - FORECAST_HORIZON)
+    :return: A list of {"year", "month", "score", "lower", "upper"}
+    """
+    cursor.execute(FORECAST_QUERY, (org_id, category, months))
+    return [
+        {
+            "year": record[0],
+            "month": record[1],
+            "score": round(record[2], 1),
+            "lower": round(record[3], 1),
+            "upper": round(record[4], 1),
+        }
+        for record in cursor.fetchall()
+    ]
+
+
+def parse_months(value):
+    """
+    parse_months validates a forecast=N query parameter.
+
+    :return: N, or None when absent
+    :raises ValueError: when N is not between 1 and FORECAST_HORIZON
+    """
+    if value in (None, ""):
+        return None
+    months = int(value)
+    if not 1 <= months <= FORECAST_HORIZON:
+        raise ValueError(f"forecast must be between 1 and {FORECAST_HORIZON}")
+    return months
+
+
+def holt(series, alpha, beta=TREND_SMOOTHING):
+    """
+    holt runs Holt's linear trend exponential smoothing over every series at once
+    (one row per series, one column per month; NaN for months without a score).
+    Missing months are skipped by carrying the level forward along the trend.
+
+    :return: (level, trend, one-step-ahead squared errors summed, errors counted) per series
+    """
+    import numpy as np
+
+    observed = ~np.isnan(series)
+    first = np.argmax(observed, axis=1)
+    rows = np.arange(series.shape[0])
+
+    level = series[rows, first]
+    trend = np.zeros(series.shape[0])
+    sse = np.zeros(series.shape[0])
+    count = np.zeros(series.shape[0])
+
+    for t in range(series.shape[1]):
+        active = t > first
+        predicted = level + trend
+        value = series[:, t]
+        update = active & observed[:, t]
+
+        error = np.where(update, value - predicted, 0.0)
+        sse += error ** 2
+        count += update
+
+        new_level = np.where(update, alpha * np.nan_to_num(value) + (1 - alpha) * predicted, predicted)
+        new_trend = np.where(update, beta * (new_level - level) + (1 - beta) * trend, trend)
+        level = np.where(active, new_level, level)
+        trend = np.where(active, new_trend, trend)
+
+    return level, trend, sse, count
+
+
+def forecast_series(series, horizon=FORECAST_HORIZON, gaps=None):
+    """
+    forecast_series fits Holt's method to every series with each level smoothing
+    constant of LEVEL_SMOOTHING_GRID, keeps the best per series and projects it
+    over the horizon months after the last column. The band of a series whose
+    last observation is gaps months before the last column is that of gaps + 1
+    to gaps + horizon months ahead, since the months in between were not observed.
+
+    :param series: Scores, one row per series and one column per month (NaN when missing)
+    :param gaps: Months between each series' last observation and the last column (default 0)
+    :return: (forecast, lower, upper), each of shape (series, horizon), clipped to 0 - 100
+    """
+    import numpy as np
+
+    best = None
+    for alpha in LEVEL_SMOOTHING_GRID:
+        level, trend, sse, count = holt(series, alpha)
+        mse = np.divide(sse, count, out=np.full_like(sse, np.inf), where=count > 0)
+        if best is None:
+            best = [level, trend, mse, np.full_like(mse, alpha)]
+            continue
+        better = mse < best[2]
+        for i, value in enumerate((level, trend, mse, np.full_like(mse, alpha))):
+            best[i] = np.where(better, value, best[i])
+
+    level, trend, mse, alpha = best
+    steps = np.arange(1, horizon + 1)
+    forecast = level[:, None] + steps[None, :] * trend[:, None]
+
+    # Forecast variance of Holt's method h months ahead: sigma^2 * (1 + sum_{0<j<h} (alpha * (1 + j * beta))^2)
+    gaps = np.zeros(series.shape[0], dtype=np.int64) if gaps is None else np.asarray(gaps, dtype=np.int64)
+    j = np.arange(int(gaps.max(initial=0)) + horizon)
+    growth = np.where(j[None, :] > 0, (alpha[:, None] * (1 + j[None, :] * TREND_SMOOTHING)) ** 2, 0.0)
+    ahead = gaps[:, None] + steps[None, :] - 1
+    sigma = np.sqrt(np.where(np.isfinite(mse), mse, 0.0))
+    spread = BAND_Z * sigma[:, None] * np.sqrt(1 + np.take_along_axis(np.cumsum(growth, axis=1), ahead, axis=1))
+
+    return (np.clip(forecast, 0, 100), np.clip(forecast - spread, 0, 100), np.clip(forecast + spread, 0, 100))
+
+
+def load_series(conn, first_month):
+    """
+    load_series reads the category scores and the overall scores since first_month.
+
+    :param first_month: Month number (year * 12 + month - 1) of the first column
+    :return: [(org_id, category, month_number, score), ...]
+    """
+    with conn.cursor(name="forecast_series") as cursor:
+        cursor.itersize = 50000
+        cursor.execute("""
+            SELECT organization_id, category, year * 12 + month - 1, score
+            FROM public.historical_risk_score
+            WHERE year * 12 + month - 1 >= %s AND score IS NOT NULL
+            UNION ALL
+            SELECT organization_id, %s,
+                   EXTRACT(YEAR FROM date_of_last_assessment)::int * 12
+                       + EXTRACT(MONTH FROM date_of_last_assessment)::int - 1,
+                   overall_risk_score
+            FROM public.overall_risk_score
+            WHERE EXTRACT(YEAR FROM date_of_last_assessment)::int * 12
+                      + EXTRACT(MONTH FROM date_of_last_assessment)::int - 1 >= %s
+                AND overall_risk_score IS NOT NULL
+        """, (first_month, OVERALL, first_month))
+        return list(cursor)
+
+
+def run(conn, today=None):
+    """
+    run forecasts every org/category series (and every org's overall score) for
+    FORECAST_HORIZON months after the current month, replacing the
+    previous forecasts. horizon is stored as months ahead of the series' last
+    observed month, and series not observed within the last FORECAST_HORIZON
+    months are not forecast: their band would describe an extrapolation of years.
+
+    :return: A summary dict
+    """
+    import numpy as np
+
+    today = today or datetime.utcnow()
+    generated_on = datetime.utcnow()
+    started = time.perf_counter()
+
+    last_month = today.year * 12 + today.month - 1
+    first_month = last_month - FORECAST_HISTORY_MONTHS + 1
+    rows = load_series(conn, first_month)
+    conn.rollback()
+
+    index = {}
+    codes = np.fromiter((index.setdefault((row[0], row[1]), len(index)) for row in rows), dtype=np.int64, count=len(rows))
+    keys = list(index)
+    columns = np.array([row[2] for row in rows], dtype=np.int64) - first_month
+    scores = np.array([row[3] for row in rows], dtype=float)
+
+    series = np.full((len(keys), FORECAST_HISTORY_MONTHS), np.nan)
+    in_range = (columns >= 0) & (columns < FORECAST_HISTORY_MONTHS)
+    series[codes[in_range], columns[in_range]] = scores[in_range]
+
+    observed = ~np.isnan(series)
+    enough = np.sum(observed, axis=1) >= FORECAST_MIN_POINTS
+    gaps = np.argmax(observed[:, ::-1], axis=1)
+    selected = np.flatnonzero(enough & (gaps < FORECAST_HORIZON))
+    forecast, lower, upper = forecast_series(series[selected], gaps=gaps[selected])
+    fitted = time.perf_counter()
+
+    def forecast_rows():
+        for position, key_index in enumerate(selected.tolist()):
+            org_id, category = keys[key_index]
+            gap = int(gaps[key_index])
+            for step in range(FORECAST_HORIZON):
+                month_number = last_month + step + 1
+                yield (org_id, category, month_number // 12, month_number % 12 + 1, gap + step + 1,
+                       float(forecast[position, step]), float(lower[position, step]), float(upper[position, step]),
+                       generated_on)
+
+    written = bulk_writer.upsert(
+        conn, "public.risk_score_forecast",
+        ["organization_id", "category", "year", "month", "horizon", "forecast", "lower_bound", "upper_bound",
+         "generated_on"],
+        ["organization_id", "category", "year", "month"],
+        forecast_rows(),
+    )
+
+    # Forecasts of months that are now past, or of series that no longer qualify, are dropped
+    with conn.cursor() as cursor:
+        cursor.execute("DELETE FROM public.risk_score_forecast WHERE generated_on < %s", (generated_on,))
+    conn.commit()
+
+    summary = {
+        "series": len(keys),
+        "forecast_series": int(selected.size),
+        "stale_series": int(np.count_nonzero(enough & (gaps >= FORECAST_HORIZON))),
+        "horizon": FORECAST_HORIZON,
+        "fit_s": round(fitted - started, 3),
+        "write_s": round(time.perf_counter() - fitted, 3),
+        "rows_per_s": written["rows_per_s"],
+    }
+    get_logger().info("forecasting", extra={"fields": summary})
+    return summary
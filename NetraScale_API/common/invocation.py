@@ -0,0 +1,51 @@
+import functools
+
+from common import logger as request_logger
+from common import metrics
+from common.context import RequestContext, activate, deactivate, current, record_rows
+
+# Flipped after the first invocation handled by this container
+_cold_start = True
+
+
+def invocation(route):
+    """
+    invocation wraps a lambda_handler so that every call is given a
+    RequestContext, produces one compact request log line and emits the
+    per-phase timings as CloudWatch Embedded Metric Format.
+
+    :param route: The name of the Lambda function being served
+
+    Example:
+        @invocation("get_risk_score")
+        def lambda_handler(event, context):
+            ...
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            global _cold_start
+
+            ctx = RequestContext(route, event, context, _cold_start)
+            _cold_start = False
+
+            token = activate(ctx)
+            status = 500
+            response = None
+            try:
+                response = handler(event, context)
+                if isinstance(response, dict):
+                    status = response.get("statusCode")
+                return response
+            finally:
+                ctx.finish(status)
+                request_logger.log_request(ctx)
+                metrics.emit(ctx)
+                if request_logger.payload_sampled():
+                    request_logger.log_payload("event", event)
+                    request_logger.log_payload("response", response)
+                deactivate(token)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,98 @@
+import json
+import logging
+import os
+import random
+import sys
+
+# Log level for the function, e.g. DEBUG, INFO, WARNING (set per function in its environment)
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+
+# Fraction of requests (0.0 - 1.0) whose full event and response are logged at INFO
+LOG_PAYLOAD_SAMPLE_RATE = float(os.environ.get("LOG_PAYLOAD_SAMPLE_RATE", "0"))
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    JsonFormatter renders each record as a single compact JSON line so that
+    CloudWatch Logs Insights can query the fields directly.
+    """
+
+    def format(self, record):
+        entry = {
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, separators=(",", ":"), default=str)
+
+
+def get_logger(name="netrascale"):
+    """
+    get_logger returns a logger that writes compact JSON lines to stdout at the
+    level configured by the LOG_LEVEL environment variable.
+
+    :param name: The logger name (defaults to the shared "netrascale" logger)
+    :return: A configured logging.Logger
+    """
+    logger = logging.getLogger(name)
+
+    if not getattr(logger, "_netrascale_configured", False):
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(JsonFormatter())
+        logger.addHandler(handler)
+        logger.setLevel(LOG_LEVEL)
+
+        # The Lambda runtime installs its own (plain text) handler on the root logger
+        logger.propagate = False
+        logger._netrascale_configured = True
+
+    return logger
+
+
+def payload_sampled():
+    """
+    payload_sampled decides whether full payloads should be logged for the
+    current request: always at DEBUG, otherwise for a sampled fraction.
+    """
+    if get_logger().isEnabledFor(logging.DEBUG):
+        return True
+
+    return LOG_PAYLOAD_SAMPLE_RATE > 0 and random.random() < LOG_PAYLOAD_SAMPLE_RATE
+
+
+def log_payload(label, payload):
+    """
+    log_payload writes a full payload (event, body, response) as one compact line.
+    Callers should check payload_sampled() first so the serialization is skipped
+    on unsampled requests.
+
+    :param label: What the payload is, e.g. "event" or "response"
+    :param payload: Any JSON serializable value
+    """
+    get_logger().info("payload", extra={"fields": {"label": label, "payload": payload}})
+
+
+def log_request(ctx):
+    """
+    log_request writes the single summary line emitted for every request.
+
+    :param ctx: The RequestContext of the finished invocation
+    """
+    get_logger().info("request", extra={"fields": {
+        "route": ctx.route,
+        "org": ctx.org_id,
+        "request_id": ctx.request_id,
+        "cold": ctx.cold,
+        "latency_ms": ctx.latency_ms,
+        "rows": ctx.rows,
+        "queries": ctx.queries,
+        "status": ctx.status,
+    }})
@@ -0,0 +1,129 @@
+import contextlib
+import functools
+import json
+import os
+import sys
+import time
+
+from common.context import current
+
+# CloudWatch namespace the Embedded Metric Format documents are published under
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "NetraScale/API")
+
+# Set METRICS_ENABLED=false to stop emitting metric documents for a function
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() != "false"
+
+
+def _stdout_sink(document):
+    # EMF documents must be written as raw JSON lines (no log prefix) to be extracted
+    sys.stdout.write(json.dumps(document, separators=(",", ":")) + "\n")
+
+
+_sink = _stdout_sink
+
+
+def set_sink(sink):
+    """
+    set_sink replaces the destination of the metric documents. The local harness
+    uses this to collect the same numbers that are published from Lambda.
+
+    :param sink: A callable receiving each EMF document (dict); None restores stdout
+    """
+    global _sink
+    _sink = sink or _stdout_sink
+
+
+@contextlib.contextmanager
+def phase(name):
+    """
+    phase times the enclosed block and adds it to the current request under name.
+    Repeated phases with the same name are summed. Outside a request it is a no-op.
+
+    :param name: The phase name, e.g. "connect", "query", "map_rows", "serialize"
+
+    Example:
+        with phase("map_rows"):
+            response = [to_json(record) for record in records]
+    """
+    ctx = current()
+    if ctx is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        ctx.add_phase(name, (time.perf_counter() - started) * 1000)
+
+
+def record_phase(name, elapsed_ms):
+    """
+    record_phase adds an already measured duration to the current request.
+
+    :param name: The phase name
+    :param elapsed_ms: The measured duration in milliseconds
+    """
+    ctx = current()
+    if ctx is not None:
+        ctx.add_phase(name, elapsed_ms)
+
+
+def timed(name):
+    """
+    timed is the decorator form of phase() for helper functions.
+
+    :param name: The phase name to record the function's duration under
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def build_document(ctx):
+    """
+    build_document renders the request's timings as a CloudWatch Embedded Metric
+    Format document with Route and Start (cold/warm) dimensions.
+
+    :param ctx: The finished RequestContext
+    :return: The EMF document (dict)
+    """
+    values = {name: round(elapsed, 3) for name, elapsed in ctx.phases.items()}
+    values["latency"] = ctx.latency_ms
+    units = {name: "Milliseconds" for name in values}
+
+    values["queries"] = ctx.queries
+    values["round_trips"] = ctx.round_trips
+    units["queries"] = units["round_trips"] = "Count"
+
+    return {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": METRICS_NAMESPACE,
+                "Dimensions": [["Route", "Start"]],
+                "Metrics": [{"Name": name, "Unit": unit} for name, unit in units.items()],
+            }],
+        },
+        "Route": ctx.route,
+        "Start": "cold" if ctx.cold else "warm",
+        "RequestId": ctx.request_id,
+        "StatusCode": ctx.status,
+        **values,
+    }
+
+
+def emit(ctx):
+    """
+    emit publishes the metric document for a finished request.
+
+    :param ctx: The finished RequestContext
+    """
+    if METRICS_ENABLED:
+        _sink(build_document(ctx))
@@ -0,0 +1,8 @@
+import numpy as np
+
+# Residual risk per organization_common_threat_summary.risk_status (mitigation approach):
+# undetermined, avoidance, reduction, transfer, acceptance, exploitation
+MITIGATION_FACTORS = np.array([1.0, 0.4, 0.7, 0.8, 1.0, 1.0])
+
+# The approach leaving the least residual risk, the baseline the cost of inaction is measured against
+RECOMMENDED_MITIGATION = int(MITIGATION_FACTORS.argmin())
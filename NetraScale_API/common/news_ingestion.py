@@ -0,0 +1,306 @@
+import hashlib
+import os
+import re
+import time
+from datetime import datetime, timezone
+
+from common import bulk_writer, news_ranking
+from common.logger import get_logger
+
+# Days of stories whose fingerprints new articles are compared with
+NEWS_DEDUP_DAYS = int(os.environ.get("NEWS_DEDUP_DAYS", "30"))
+
+# Articles normalized, fingerprinted and written per batch
+NEWS_INGEST_BATCH = int(os.environ.get("NEWS_INGEST_BATCH", "10000"))
+
+# Summaries whose 64 bit SimHash fingerprints differ in at most this many bits are the same story
+SIMHASH_MAX_DISTANCE = 3
+
+# Advisory lock serializing ingestions (concurrent SQS batches), so each one deduplicates against the stories
+# written by the others
+INGEST_LOCK = "news_ingestion"
+
+# The values get_news_feed matches on: an organization's upper-case region / industry, or these wildcards
+GLOBAL_LOCATION = "GLOBAL"
+GENERAL_SECTOR = "GENERAL"
+LOCATION_ALIASES = {"", "ALL", "ANY", "WORLD", "WORLDWIDE", "INTERNATIONAL", "GLOBAL"}
+SECTOR_ALIASES = {"", "ALL", "ANY", "ALL SECTORS", "CROSS-SECTOR", "GENERAL"}
+
+COLUMNS = [
+    "title", "author", "published_at", "tags", "url", "summary", "source",
+    "related_location", "related_sector", "related_risk", "url_hash", "simhash",
+]
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_UINT64 = (1 << 64) - 1
+
+
+def url_hash(url):
+    """
+    url_hash identifies a story by its URL: md5 of the URL trimmed, lower-cased and
+    stripped of fragment and trailing slash (migrations/009_news_ingestion.sql
+    computes the same for existing rows).
+    """
+    normalized = url.strip().lower().split("#", 1)[0].rstrip("/")
+    return hashlib.md5(normalized.encode("utf-8")).hexdigest()
+
+
+def normalize_segment(value, wildcard, aliases):
+    value = " ".join((value or "").split()).upper()
+    return wildcard if value in aliases else value
+
+
+def _published_at(value):
+    if isinstance(value, datetime):
+        return value
+    if value:
+        try:
+            published = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+            return published.astimezone(timezone.utc).replace(tzinfo=None) if published.tzinfo else published
+        except ValueError:
+            pass
+    # Undated stories are filed at ingestion time rather than in the DEFAULT partition
+    return datetime.utcnow()
+
+
+def _text(value):
+    # Feeds are loosely typed: numbers are kept as their text, while a list or an object is not a text field
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        return str(value)
+    raise ValueError(f"expected text, got {type(value).__name__}")
+
+
+def normalize(article):
+    """
+    normalize maps an incoming article to a news_feed row (COLUMNS, without the
+    simhash), with the location and sector in the upper-case form get_news_feed
+    expects and GLOBAL / GENERAL for articles that are not specific. Numeric
+    fields are taken as text; tags and related_risk may also be lists.
+
+    :return: The row, or None for an article without url or title, or with a field of the wrong type
+    """
+    try:
+        url = (_text(article.get("url")) or "").strip()
+        title = " ".join((_text(article.get("title")) or "").split())
+        if not url or not title:
+            return None
+
+        tags = article.get("tags")
+        if isinstance(tags, (list, tuple)):
+            tags = [tag.strip() for tag in map(_text, tags) if tag and tag.strip()]
+        else:
+            tags = _text(tags)
+
+        risks = article.get("related_risk")
+        if isinstance(risks, (list, tuple)):
+            risks = ",".join(risk.strip() for risk in map(_text, risks) if risk and risk.strip())
+
+        return [
+            title,
+            _text(article.get("author")),
+            _published_at(article.get("published_at")),
+            tags,
+            url,
+            _text(article.get("summary")),
+            _text(article.get("source")),
+            normalize_segment(_text(article.get("related_location")), GLOBAL_LOCATION, LOCATION_ALIASES),
+            normalize_segment(_text(article.get("related_sector")), GENERAL_SECTOR, SECTOR_ALIASES),
+            (_text(risks) or "").strip().upper() or None,
+            url_hash(url),
+        ]
+    except ValueError:
+        return None
+
+
+def _token_hash(token):
+    # Stable across processes (unlike hash()), since fingerprints are stored
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def simhashes(texts):
+    """
+    simhashes computes the 64 bit SimHash of every text at once: each bit is set
+    when more than half of the text's word hashes have it set. Every distinct
+    word is hashed once, and the bits are counted with one row per bit position
+    so that the per-text sums run over contiguous memory.
+
+    :return: One unsigned fingerprint per text (None for a text without words)
+    """
+    import numpy as np
+
+    token_lists = [_TOKEN_RE.findall((text or "").lower()) for text in texts]
+    counts = np.fromiter(map(len, token_lists), dtype=np.int64, count=len(token_lists))
+    total = int(counts.sum())
+    if not total:
+        return [None] * len(texts)
+
+    vocabulary = {}
+    ids = np.fromiter(
+        (vocabulary.setdefault(token, len(vocabulary)) for tokens in token_lists for token in tokens),
+        dtype=np.int64, count=total,
+    )
+    hashes = np.fromiter(map(_token_hash, vocabulary), dtype=np.uint64, count=len(vocabulary))[ids]
+
+    # 64 x words bit matrix, summed per text
+    bits = np.unpackbits(np.ascontiguousarray(hashes.view(np.uint8).reshape(-1, 8).T), axis=0)
+    has_words = counts > 0
+    starts = (np.cumsum(counts) - counts)[has_words]
+    ones = np.add.reduceat(bits, starts, axis=1, dtype=np.int32)
+    majority = (ones * 2 > counts[has_words]).astype(np.uint8)
+    fingerprints = iter(np.ascontiguousarray(np.packbits(majority, axis=0).T).view(np.uint64).ravel().tolist())
+
+    return [next(fingerprints) if words else None for words in has_words.tolist()]
+
+
+class FingerprintIndex:
+    """
+    An index of SimHash fingerprints answering "is there one within
+    SIMHASH_MAX_DISTANCE bits?". Fingerprints are split into max_distance + 1
+    bands: two fingerprints that close agree on at least one whole band, so only
+    the fingerprints sharing a band with the query are compared.
+    """
+
+    def __init__(self, max_distance=SIMHASH_MAX_DISTANCE):
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self.width = 64 // self.bands
+        self.tables = [{} for _ in range(self.bands)]
+        self.size = 0
+
+    def _keys(self, fingerprint):
+        # The last band takes the bits left over when 64 is not a multiple of the band width
+        mask = (1 << self.width) - 1
+        for band in range(self.bands):
+            key = fingerprint >> (band * self.width)
+            yield band, key if band == self.bands - 1 else key & mask
+
+    def near(self, fingerprint):
+        for band, key in self._keys(fingerprint):
+            for other in self.tables[band].get(key, ()):
+                if bin(fingerprint ^ other).count("1") <= self.max_distance:
+                    return True
+        return False
+
+    def add(self, fingerprint):
+        for band, key in self._keys(fingerprint):
+            self.tables[band].setdefault(key, []).append(fingerprint)
+        self.size += 1
+
+
+def load_index(cursor, days=NEWS_DEDUP_DAYS):
+    """
+    load_index reads the fingerprints of the last days of news_feed (only the
+    recent partitions are scanned).
+    """
+    cursor.execute("""
+        SELECT simhash FROM public.news_feed
+        WHERE published_at >= now() - make_interval(days => %s) AND simhash IS NOT NULL
+    """, (days,))
+    index = FingerprintIndex()
+    for (fingerprint,) in cursor:
+        index.add(fingerprint & _UINT64)
+    return index
+
+
+def _batches(articles, size):
+    batch = []
+    for article in articles:
+        batch.append(article)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def ingest(conn, articles, refresh=True):
+    """
+    ingest loads articles into news_feed, NEWS_INGEST_BATCH at a time: each batch
+    is normalized, stripped of URLs seen earlier in the run and of near duplicates
+    (SimHash of the summary within SIMHASH_MAX_DISTANCE bits of a story of the last
+    NEWS_DEDUP_DAYS days or of the run), and written with COPY + upsert. A URL
+    already in news_feed updates its row. The run holds the INGEST_LOCK advisory
+    lock, so concurrent runs load one after the other. The feed's top stories of
+    the segments the written stories appear in are refreshed at the end.
+
+    :param conn: A database connection without a transaction in progress
+    :param articles: An iterable of article dicts (title, url, summary, published_at, related_location, ...)
+    :param refresh: Refresh news_ranking's top stories after loading
+    :return: A summary dict
+    """
+    started = time.perf_counter()
+    summary = {"received": 0, "invalid": 0, "duplicate_urls": 0, "near_duplicates": 0, "updated": 0, "written": 0}
+
+    # Held by the session across the commits of the writes; the fingerprints are only read once it is taken
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_lock(hashtext(%s))", (INGEST_LOCK,))
+        index = load_index(cursor)
+    conn.rollback()
+    try:
+        segments = _load(conn, articles, index, summary)
+    finally:
+        # A failed statement leaves the transaction aborted, so the unlock runs in a new one
+        conn.rollback()
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(hashtext(%s))", (INGEST_LOCK,))
+        conn.rollback()
+
+    loaded = time.perf_counter()
+    if refresh and summary["written"]:
+        summary["top_stories"] = news_ranking.refresh(conn, sorted(segments))
+
+    summary["load_s"] = round(loaded - started, 3)
+    summary["articles_per_s"] = round(summary["received"] / (loaded - started), 1) if loaded > started else None
+    get_logger().info("news_ingestion", extra={"fields": summary})
+    return summary
+
+
+def _load(conn, articles, index, summary):
+    # The batches of ingest(); returns the (related_location, related_sector) of the stories written
+    seen_urls = set()
+    segments = set()
+
+    for batch in _batches(articles, NEWS_INGEST_BATCH):
+        summary["received"] += len(batch)
+        rows = []
+        for article in batch:
+            row = normalize(article)
+            if row is None:
+                summary["invalid"] += 1
+            elif row[-1] in seen_urls:
+                summary["duplicate_urls"] += 1
+            else:
+                seen_urls.add(row[-1])
+                rows.append(row)
+
+        # Stories already stored keep their published_at, so the upsert updates them in place
+        with conn.cursor() as cursor:
+            cursor.execute(
+                "SELECT url_hash, published_at FROM public.news_feed WHERE url_hash = ANY(%s)",
+                ([row[-1] for row in rows],)
+            )
+            stored = dict(cursor.fetchall())
+        conn.rollback()
+
+        fingerprints = simhashes([row[5] or row[0] for row in rows])
+        accepted = []
+        for row, fingerprint in zip(rows, fingerprints):
+            if row[-1] in stored:
+                row[2] = stored[row[-1]]
+                summary["updated"] += 1
+            elif fingerprint is not None:
+                if index.near(fingerprint):
+                    summary["near_duplicates"] += 1
+                    continue
+                index.add(fingerprint)
+            # bigint is signed
+            row.append(None if fingerprint is None else fingerprint - (1 << 64) if fingerprint >> 63 else fingerprint)
+            accepted.append(row)
+            segments.add((row[7], row[8]))
+
+        written = bulk_writer.upsert(conn, "public.news_feed", COLUMNS, ["url_hash", "published_at"], accepted)
+        summary["written"] += written["rows"]
+
+    return segments
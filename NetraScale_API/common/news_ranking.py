@@ -0,0 +1,190 @@
+import os
+
+from common.logger import get_logger
+
+# Stories kept per (country, sector), re-ranked per organization at request time
+NEWS_TOP_N = int(os.environ.get("NEWS_TOP_N", "50"))
+
+# Days of news considered by the ranking (search covers the whole history)
+NEWS_WINDOW_DAYS = int(os.environ.get("NEWS_WINDOW_DAYS", "90"))
+
+# Days after which the recency of a story counts half
+NEWS_HALF_LIFE_DAYS = float(os.environ.get("NEWS_HALF_LIFE_DAYS", "7"))
+
+# Weights of the score: recency (1 for a story published now), exact location and sector match (over GLOBAL
+# and GENERAL), overlap with the organization's threat categories and, for q= searches, text relevance
+RECENCY_WEIGHT = 1.0
+LOCATION_WEIGHT = 0.5
+SECTOR_WEIGHT = 0.5
+THREAT_WEIGHT = 0.75
+SEARCH_WEIGHT = 2.0
+
+# The segment of an organization; organizations without region or industry only see GLOBAL / GENERAL stories
+SEGMENT = "COALESCE(UPPER(o.region), '')", "COALESCE(UPPER(o.industry), '')"
+
+RECENCY = f"COALESCE(power(0.5, EXTRACT(EPOCH FROM now() - {{n}}.published_at) / 86400.0 / {NEWS_HALF_LIFE_DAYS}), 0)"
+
+# related_risk and tags (a list or a comma separated string) as an upper-case array
+RISKS = r"""regexp_split_to_array(UPPER(COALESCE(n.related_risk, '') || ',' || COALESCE(n.tags::text, '')), '\s*[,;{}"]+\s*')"""
+
+# The organization's threat categories, read once per request
+THREATS_JOIN = """CROSS JOIN LATERAL (
+        SELECT ARRAY(
+            SELECT UPPER(c.common_threat) FROM public.organization_common_threat_summary c
+            WHERE c.organization_id = o.id
+        ) AS categories
+    ) threats"""
+
+
+def _segment_score(country, sector):
+    return (f"({LOCATION_WEIGHT} * (n.related_location = {country})::int"
+            f" + {SECTOR_WEIGHT} * (n.related_sector = {sector})::int)")
+
+
+# Advisory lock serializing refreshes, which would otherwise collide on news_feed_top_segment_rank_key
+REFRESH_LOCK = "news_ranking"
+
+# The (country, sector) of every organization
+ALL_SEGMENTS = f"SELECT DISTINCT {SEGMENT[0]} AS country, {SEGMENT[1]} AS sector FROM public.\"Organization\" o"
+
+# The segments that show a story of one of the %(locations)s / %(sectors)s pairs
+TOUCHED_SEGMENTS = f"""
+    SELECT s.country, s.sector FROM ({ALL_SEGMENTS}) s
+    WHERE EXISTS (
+        SELECT 1 FROM unnest(%(locations)s::text[], %(sectors)s::text[]) AS touched(location, sector)
+        WHERE touched.location IN ('GLOBAL', s.country) AND touched.sector IN ('GENERAL', s.sector)
+    )
+"""
+
+
+def _refresh_query(segments):
+    return f"""
+    INSERT INTO public.news_feed_top
+        (country, sector, rank, title, author, published_at, tags, url, summary, source, risks, segment_score, refreshed_on)
+    SELECT country, sector, rank, title, author, published_at, tags, url, summary, source, risks, segment_score, now()
+    FROM (
+        SELECT s.country, s.sector, n.title, n.author, n.published_at, n.tags, n.url, n.summary, n.source,
+               {RISKS} AS risks,
+               {_segment_score("s.country", "s.sector")} AS segment_score,
+               ROW_NUMBER() OVER (
+                   PARTITION BY s.country, s.sector
+                   ORDER BY {_segment_score("s.country", "s.sector")} + {RECENCY_WEIGHT} * {RECENCY.format(n="n")} DESC,
+                            n.url
+               ) AS rank
+        FROM ({segments}) s
+        JOIN public.news_feed n
+            ON n.related_location IN ('GLOBAL', s.country) AND n.related_sector IN ('GENERAL', s.sector)
+        WHERE n.published_at >= now() - make_interval(days => %(window)s)
+    ) ranked
+    WHERE rank <= %(top_n)s
+"""
+
+
+def _segments_query(segments):
+    # Each refreshed segment with the number of stories kept for it (possibly none)
+    return f"""
+    INSERT INTO public.news_feed_top_segment (country, sector, stories, refreshed_on)
+    SELECT s.country, s.sector, COUNT(t.rank), now()
+    FROM ({segments}) s
+    LEFT JOIN public.news_feed_top t ON t.country = s.country AND t.sector = s.sector
+    GROUP BY s.country, s.sector
+"""
+
+
+# The organization's precomputed segment, re-ranked with the current recency and its threat categories;
+# precomputed is false for a segment the last refresh did not cover (the story columns are then NULL too)
+FEED_QUERY = f"""
+    SELECT o.id, t.title, t.author, t.published_at, t.tags, t.url, t.summary, t.source,
+           segment.country IS NOT NULL AS precomputed
+    FROM public."Organization" o
+    LEFT JOIN public.news_feed_top_segment segment
+        ON segment.country = {SEGMENT[0]} AND segment.sector = {SEGMENT[1]}
+    {THREATS_JOIN}
+    LEFT JOIN LATERAL (
+        SELECT t.*
+        FROM public.news_feed_top t
+        WHERE t.country = {SEGMENT[0]} AND t.sector = {SEGMENT[1]}
+        ORDER BY t.segment_score + {RECENCY_WEIGHT} * {RECENCY.format(n="t")}
+                 + {THREAT_WEIGHT} * (t.risks && threats.categories)::int DESC,
+                 t.rank
+        LIMIT %(limit)s
+    ) t ON true
+    WHERE o.id = %(org_id)s
+"""
+
+
+def live_query(search=False):
+    """
+    live_query returns the statement ranking an organization's stories straight from
+    news_feed: the full-text search of q= (over the whole history, by the GIN index
+    on search_vector), or the feed of a segment that has not been precomputed yet.
+    It takes the org_id, limit and window (or query) parameters and returns the
+    story columns of FEED_QUERY.
+    """
+    country, sector = SEGMENT
+    if search:
+        relevance = f" + {SEARCH_WEIGHT} * ts_rank_cd(n.search_vector, websearch_to_tsquery('english', %(query)s))"
+        condition = "n.search_vector @@ websearch_to_tsquery('english', %(query)s)"
+    else:
+        relevance = ""
+        condition = "n.published_at >= now() - make_interval(days => %(window)s)"
+
+    return f"""
+    SELECT o.id, n.title, n.author, n.published_at, n.tags, n.url, n.summary, n.source
+    FROM public."Organization" o
+    {THREATS_JOIN}
+    LEFT JOIN LATERAL (
+        SELECT n.*
+        FROM public.news_feed n
+        WHERE n.related_location IN ('GLOBAL', {country}) AND n.related_sector IN ('GENERAL', {sector})
+            AND {condition}
+        ORDER BY {_segment_score(country, sector)} + {RECENCY_WEIGHT} * {RECENCY.format(n="n")}
+                 + {THREAT_WEIGHT} * ({RISKS} && threats.categories)::int{relevance} DESC,
+                 n.url
+        LIMIT %(limit)s
+    ) n ON true
+    WHERE o.id = %(org_id)s
+"""
+
+
+def refresh(conn, segments=None):
+    """
+    refresh recomputes the NEWS_TOP_N stories of the (country, sector) segments of
+    the organizations from the last NEWS_WINDOW_DAYS of news_feed, and records each
+    segment in news_feed_top_segment (even without stories), in a single
+    transaction so readers never see a segment half written. Refreshes hold the
+    REFRESH_LOCK advisory lock, so overlapping ones run one after the other.
+
+    :param conn: A database connection without a transaction in progress
+    :param segments: The (related_location, related_sector) of newly written stories: only the segments showing
+        one of them are recomputed (GLOBAL / GENERAL ones reach every segment). None recomputes every segment
+    :return: The number of stories written
+    """
+    if segments is None:
+        selected, parameters = ALL_SEGMENTS, {}
+    else:
+        selected = TOUCHED_SEGMENTS
+        parameters = {"locations": [location for location, _ in segments], "sectors": [sector for _, sector in segments]}
+    parameters.update(window=NEWS_WINDOW_DAYS, top_n=NEWS_TOP_N)
+
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (REFRESH_LOCK,))
+        if segments is None:
+            # Segments no organization belongs to any more are dropped as well
+            cursor.execute("DELETE FROM public.news_feed_top")
+            cursor.execute("DELETE FROM public.news_feed_top_segment")
+        else:
+            for table in ("news_feed_top", "news_feed_top_segment"):
+                cursor.execute(f"""
+                    DELETE FROM public.{table} t USING ({selected}) s
+                    WHERE t.country = s.country AND t.sector = s.sector
+                """, parameters)
+        cursor.execute(_refresh_query(selected), parameters)
+        written = cursor.rowcount
+        cursor.execute(_segments_query(selected), parameters)
+    conn.commit()
+
+    get_logger().info("news_ranking", extra={"fields": {
+        "rows": written, "touched": None if segments is None else len(segments),
+    }})
+    return written
@@ -0,0 +1,259 @@
+import os
+import re
+import tempfile
+import time
+from datetime import date, datetime
+
+from common import columnar
+from common.logger import get_logger
+
+# Periods created ahead of the current one, so inserts never fall into the DEFAULT partition
+PARTITION_PRECREATE = int(os.environ.get("PARTITION_PRECREATE", "2"))
+
+# Expired partitions are written as Parquet to this bucket before being dropped
+PARTITION_ARCHIVE_BUCKET = os.environ.get("PARTITION_ARCHIVE_BUCKET")
+PARTITION_ARCHIVE_PREFIX = os.environ.get("PARTITION_ARCHIVE_PREFIX", "partitions")
+
+# Local directory standing in for the bucket (development, and checking an archive run before enabling it)
+PARTITION_ARCHIVE_DIR = os.environ.get("PARTITION_ARCHIVE_DIR")
+
+# Rows per fetch and per Parquet row group while archiving
+ARCHIVE_BATCH_ROWS = int(os.environ.get("PARTITION_ARCHIVE_BATCH_ROWS", "50000"))
+
+# Partitioned tables (migrations/007_partition_history_tables.sql): partition column, interval and periods kept
+# (0 keeps all)
+POLICIES = {
+    "historical_risk_score": {
+        "column": "year",
+        "interval": "year",
+        "retention": int(os.environ.get("HISTORICAL_RISK_SCORE_RETENTION_YEARS", "10")),
+    },
+    "common_attack_data": {
+        "column": "year",
+        "interval": "year",
+        "retention": int(os.environ.get("COMMON_ATTACK_DATA_RETENTION_YEARS", "25")),
+    },
+    "news_feed": {
+        "column": "published_at",
+        "interval": "month",
+        "retention": int(os.environ.get("NEWS_FEED_RETENTION_MONTHS", "24")),
+    },
+}
+
+_PARTITION_RE = re.compile(r"_(?:y(\d{4})|m(\d{4})(\d{2}))$")
+
+
+def period_of(interval, day):
+    """
+    period_of numbers the partition period containing a day: the year, or the
+    month counted as year * 12 + month - 1.
+    """
+    return day.year if interval == "year" else day.year * 12 + day.month - 1
+
+
+def partition_name(table, interval, period):
+    if interval == "year":
+        return f"{table}_y{period:04d}"
+    return f"{table}_m{period // 12:04d}{period % 12 + 1:02d}"
+
+
+def partition_bounds(interval, period):
+    """
+    partition_bounds returns the FOR VALUES FROM (...) TO (...) literals of a period.
+
+    Example:
+        partition_bounds("month", 2024 * 12 + 11) -> ("'2024-12-01'", "'2025-01-01'")
+    """
+    if interval == "year":
+        return str(period), str(period + 1)
+    first = date(period // 12, period % 12 + 1, 1)
+    following = date((period + 1) // 12, (period + 1) % 12 + 1, 1)
+    return f"'{first.isoformat()}'", f"'{following.isoformat()}'"
+
+
+def list_partitions(cursor, table):
+    """
+    list_partitions returns the maintained partitions of a table as {period: name}
+    (the DEFAULT partition and partitions named otherwise are left alone).
+
+    :return: The partitions, or None when the table is not partitioned
+    """
+    cursor.execute("""
+        SELECT c.relname
+        FROM pg_class p
+        JOIN pg_namespace n ON n.oid = p.relnamespace
+        LEFT JOIN pg_inherits i ON i.inhparent = p.oid
+        LEFT JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE n.nspname = 'public' AND p.relname = %s AND p.relkind = 'p'
+    """, (table,))
+    records = cursor.fetchall()
+    if not records:
+        return None
+
+    partitions = {}
+    for (name,) in records:
+        match = _PARTITION_RE.search(name or "")
+        if not match or not name.startswith(table):
+            continue
+        if match.group(1):
+            partitions[int(match.group(1))] = name
+        else:
+            partitions[int(match.group(2)) * 12 + int(match.group(3)) - 1] = name
+    return partitions
+
+
+def default_partition(cursor, table):
+    """
+    default_partition returns the name of the table's DEFAULT partition, or None.
+    """
+    cursor.execute("""
+        SELECT d.relname
+        FROM pg_partitioned_table t
+        JOIN pg_class d ON d.oid = t.partdefid
+        WHERE t.partrelid = format('public.%%I', %s)::regclass
+    """, (table,))
+    record = cursor.fetchone()
+    return record[0] if record else None
+
+
+def create_partition(conn, table, column, name, lower, upper):
+    """
+    create_partition attaches a new partition in one transaction. Rows of the
+    range that already landed in the DEFAULT partition (e.g. written before the
+    partition was due) are moved out first, since PostgreSQL refuses to create a
+    partition whose range the DEFAULT partition holds rows of, and inserted back
+    through the parent once the partition exists.
+
+    :return: The rows moved out of the DEFAULT partition
+    """
+    with conn.cursor() as cursor:
+        default = default_partition(cursor, table)
+        moved = 0
+        if default:
+            cursor.execute(f"""
+                CREATE TEMPORARY TABLE partition_move ON COMMIT DROP AS
+                WITH moved AS (
+                    DELETE FROM public."{default}" WHERE {column} >= {lower} AND {column} < {upper} RETURNING *
+                )
+                SELECT * FROM moved
+            """)
+            moved = max(cursor.rowcount, 0)
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS public."{name}" PARTITION OF public."{table}" '
+            f"FOR VALUES FROM ({lower}) TO ({upper})"
+        )
+        if default:
+            cursor.execute(f'INSERT INTO public."{table}" SELECT * FROM partition_move')
+    conn.commit()
+    return moved
+
+
+def archive_partition(conn, table, name, archive_dir=None):
+    """
+    archive_partition copies one partition to Parquet: a file under archive_dir when
+    given (or PARTITION_ARCHIVE_DIR), else an object in PARTITION_ARCHIVE_BUCKET.
+
+    :return: (location, rows)
+    """
+    archive_dir = archive_dir or PARTITION_ARCHIVE_DIR
+    key = f"{PARTITION_ARCHIVE_PREFIX}/{table}/{name}.parquet"
+
+    with conn.cursor(name=f"archive_{name}") as cursor:
+        cursor.itersize = ARCHIVE_BATCH_ROWS
+        cursor.execute(f'SELECT * FROM public."{name}"')
+
+        if archive_dir:
+            path = os.path.join(archive_dir, key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            rows = columnar.write_parquet(cursor, path, ARCHIVE_BATCH_ROWS)
+            location = path
+        else:
+            # boto3 is only imported when archives are actually shipped to S3; upload_file
+            # switches to a multipart upload for large files
+            import boto3
+
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, f"{name}.parquet")
+                rows = columnar.write_parquet(cursor, path, ARCHIVE_BATCH_ROWS)
+                boto3.client("s3").upload_file(path, PARTITION_ARCHIVE_BUCKET, key)
+            location = f"s3://{PARTITION_ARCHIVE_BUCKET}/{key}"
+    conn.rollback()
+    return location, rows
+
+
+def maintain(conn, table, policy, today, dry_run=False, archive_dir=None):
+    """
+    maintain creates the current and next PARTITION_PRECREATE partitions of a table
+    (moving the rows of their ranges out of the DEFAULT partition) and retires the
+    partitions older than its retention. A retired partition is
+    archived and dropped when an archive destination is configured, and otherwise
+    only detached (it stays as a plain table, out of every query on the parent).
+
+    :param policy: The POLICIES entry of the table
+    :param today: The date the periods are counted from
+    :return: {"created": [...], "moved": {partition: rows}, "archived": [...], "detached": [...]},
+        or None when the table is not partitioned
+    """
+    interval, retention = policy["interval"], policy["retention"]
+    current = period_of(interval, today)
+    archive = bool(archive_dir or PARTITION_ARCHIVE_DIR or PARTITION_ARCHIVE_BUCKET)
+    result = {"created": [], "moved": {}, "archived": [], "detached": []}
+
+    with conn.cursor() as cursor:
+        partitions = list_partitions(cursor, table)
+    conn.rollback()
+    if partitions is None:
+        get_logger().warning("partitions", extra={"fields": {"table": table, "error": "not partitioned"}})
+        return None
+
+    for period in range(current, current + PARTITION_PRECREATE + 1):
+        if period in partitions:
+            continue
+        name = partition_name(table, interval, period)
+        lower, upper = partition_bounds(interval, period)
+        if not dry_run:
+            moved = create_partition(conn, table, policy["column"], name, lower, upper)
+            if moved:
+                result["moved"][name] = moved
+        result["created"].append(name)
+
+    expired = sorted(period for period in partitions if retention and period <= current - retention)
+    for period in expired:
+        name = partitions[period]
+        if dry_run:
+            result["archived" if archive else "detached"].append({"partition": name})
+            continue
+
+        # The copy is taken while the partition is still attached, so a failed archive changes nothing
+        entry = {"partition": name}
+        if archive:
+            entry["location"], entry["rows"] = archive_partition(conn, table, name, archive_dir)
+        with conn.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE public."{table}" DETACH PARTITION public."{name}"')
+            if archive:
+                cursor.execute(f'DROP TABLE public."{name}"')
+        conn.commit()
+        result["archived" if archive else "detached"].append(entry)
+
+    return result
+
+
+def run(conn, today=None, dry_run=False, archive_dir=None, tables=None):
+    """
+    run maintains the partitions of every table in POLICIES (or of the given tables).
+
+    :param conn: A database connection without a transaction in progress
+    :param dry_run: Only report the partitions that would be created and retired
+    :param archive_dir: Archive to this local directory instead of PARTITION_ARCHIVE_BUCKET
+    :return: A summary dict
+    """
+    today = today or datetime.utcnow().date()
+    started = time.perf_counter()
+
+    summary = {"dry_run": dry_run, "tables": {}}
+    for table in tables or POLICIES:
+        summary["tables"][table] = maintain(conn, table, POLICIES[table], today, dry_run, archive_dir)
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+
+    get_logger().info("partitions", extra={"fields": summary})
+    return summary
@@ -0,0 +1,146 @@
+import bisect
+import os
+
+from common import bulk_writer
+from common.logger import get_logger
+
+# Quantiles stored per distribution: p0, p1, ..., p100
+QUANTILE_POINTS = 101
+
+# Peer groups smaller than this are not stored. This does not anonymize the group: p0 and p100 are its lowest
+# and highest figures, and any quantile falling on a whole rank is one member's exact figure
+PEER_MIN_ORGS = int(os.environ.get("PEER_MIN_ORGS", "5"))
+
+# Region of the sector-wide distribution used when an org's region has too few peers
+ALL_REGIONS = "ALL"
+
+
+def distribution_join(category="%s"):
+    """
+    distribution_join returns the LEFT JOIN LATERAL clause selecting an organization's
+    peer distribution: its own region when available, else the whole sector. The
+    outer query must expose the organization as "o"; the clause takes a metric
+    parameter and, by default, a category parameter.
+
+    :param category: SQL expression of the category (a placeholder or a column, e.g. "s.category")
+    """
+    return f"""
+    LEFT JOIN LATERAL (
+        SELECT p.quantiles FROM public.peer_score_distribution p
+        WHERE p.metric = %s AND p.category = {category} AND p.industry = o.industry
+            AND p.region IN (o.region, 'ALL')
+        ORDER BY p.year DESC, p.month DESC, p.region = 'ALL'
+        LIMIT 1
+    ) peer ON true
+"""
+
+
+def percentile_rank(quantiles, value):
+    """
+    percentile_rank places a value within a stored distribution by binary search
+    over its quantiles and linear interpolation between the two neighbours.
+
+    :param quantiles: The QUANTILE_POINTS ascending quantiles of the peer group
+    :param value: The organization's figure
+    :return: The share of peers (0 - 100) at or below the value, or None without a distribution
+    """
+    if not quantiles or value is None:
+        return None
+
+    value = float(value)
+    if value < quantiles[0]:
+        return 0.0
+    if value >= quantiles[-1]:
+        return 100.0
+
+    upper = bisect.bisect_right(quantiles, value)
+    low, high = quantiles[upper - 1], quantiles[upper]
+    position = upper - 1 + (value - low) / (high - low)
+    return round(position * 100 / (len(quantiles) - 1), 1)
+
+
+def build_sketches(keys, values):
+    """
+    build_sketches computes the quantiles of each peer group.
+
+    :param keys: The (industry, region, category) of every value
+    :param values: The figures (one per organization and category)
+    :return: {(industry, region, category): (sample_count, quantiles)} for groups of at least PEER_MIN_ORGS
+    """
+    import numpy as np
+
+    if not keys:
+        return {}
+
+    index = {}
+    codes = np.fromiter((index.setdefault(key, len(index)) for key in keys), dtype=np.int64, count=len(keys))
+    groups = list(index)
+    values = np.asarray(values, dtype=float)
+
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    boundaries = np.flatnonzero(np.diff(sorted_codes)) + 1
+    grid = np.linspace(0, 1, QUANTILE_POINTS)
+
+    sketches = {}
+    for members, code in zip(np.split(values[order], boundaries), sorted_codes[np.r_[0, boundaries]]):
+        if members.size >= PEER_MIN_ORGS:
+            sketches[groups[code]] = (int(members.size), np.quantile(members, grid).tolist())
+    return sketches
+
+
+def _with_sector(rows):
+    # Every figure counts towards its region and towards the sector as a whole
+    keys, values = [], []
+    for industry, region, category, value in rows:
+        keys.append((industry, region or ALL_REGIONS, category))
+        values.append(value)
+        if region and region != ALL_REGIONS:
+            keys.append((industry, ALL_REGIONS, category))
+            values.append(value)
+    return keys, values
+
+
+def refresh(conn, year, month):
+    """
+    refresh rebuilds the month's peer distributions of the risk scores
+    (historical_risk_score) and breach costs (organization_common_threat_summary)
+    and upserts them into peer_score_distribution.
+
+    :param conn: A database connection without a transaction in progress
+    :return: The bulk writer summary
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT o.industry, o.region, h.category, h.score
+            FROM public.historical_risk_score h
+            JOIN public."Organization" o ON o.id = h.organization_id
+            WHERE h.year = %s AND h.month = %s AND o.industry IS NOT NULL AND h.score IS NOT NULL
+        """, (year, month))
+        score_sketches = build_sketches(*_with_sector(cursor.fetchall()))
+
+        cursor.execute("""
+            SELECT o.industry, o.region, UPPER(t.common_threat), t.breach_cost
+            FROM public.organization_common_threat_summary t
+            JOIN public."Organization" o ON o.id = t.organization_id
+            WHERE o.industry IS NOT NULL AND t.breach_cost IS NOT NULL
+        """)
+        cost_sketches = build_sketches(*_with_sector(cursor.fetchall()))
+    conn.rollback()
+
+    rows = [
+        (metric, industry, region, category, year, month, count, quantiles)
+        for metric, sketches in (("risk_score", score_sketches), ("breach_cost", cost_sketches))
+        for (industry, region, category), (count, quantiles) in sketches.items()
+    ]
+
+    summary = bulk_writer.upsert(
+        conn, "public.peer_score_distribution",
+        ["metric", "industry", "region", "category", "year", "month", "sample_count", "quantiles"],
+        ["metric", "industry", "region", "category", "year", "month"],
+        rows,
+    )
+    get_logger().info("peer_percentiles", extra={"fields": {
+        "year": year, "month": month, "risk_score_groups": len(score_sketches), "breach_cost_groups": len(cost_sketches),
+    }})
+    return summary
@@ -0,0 +1,100 @@
+import os
+import time
+
+from common.logger import get_logger
+
+# Seconds a container trusts its index before reading the version again, when a request does not
+# bring the version along with its own query (VERSION_COLUMN)
+REGULATION_INDEX_CHECK_S = int(os.environ.get("REGULATION_INDEX_CHECK_S", "60"))
+
+# Matches every country / sector
+ALL = "ALL"
+
+# Selected by the handlers' own query so that checking the index costs no extra statement
+VERSION_COLUMN = "(SELECT version FROM public.table_version WHERE table_name = 'security_regulations')"
+
+# id, regulation, penalty, sector, comments, attack_type, country, region
+REGULATIONS_QUERY = """
+    SELECT id, regulation, penalty, sector, comments, attack_type, country, region
+    FROM public.security_regulations
+    ORDER BY id
+"""
+
+_ID, _REGULATION, _PENALTY, _SECTOR, _COMMENTS, _ATTACK_TYPE, _COUNTRY, _REGION = range(8)
+
+# The container's RegulationIndex and the monotonic time its version was last confirmed
+_index = None
+_checked_at = 0.0
+
+
+class RegulationIndex:
+    """
+    RegulationIndex holds security_regulations (a small, global table) keyed by
+    (country, sector, attack_type), each list in id order.
+    """
+
+    def __init__(self, records, version):
+        self.version = version
+        self.size = len(records)
+        self.by_key = {}
+        self.by_attack_type = {}
+        for record in records:
+            self.by_key.setdefault((record[_COUNTRY], record[_SECTOR], record[_ATTACK_TYPE]), []).append(record)
+            self.by_attack_type.setdefault(record[_ATTACK_TYPE], []).append(record)
+
+    def assessment(self, attack_type, country=None, sector=None, region=None, limit=None):
+        """
+        assessment returns the regulations of an attack type in a country (any when
+        None or ALL) that apply to a sector or to every sector (any when None or ALL),
+        optionally in a region, as (regulation, penalty, sector, comments) tuples.
+        """
+        if not attack_type:
+            return []
+        any_country = not country or country == ALL
+        any_sector = not sector or sector == ALL
+
+        if not any_country and not any_sector:
+            # Two key lookups: the sector's own regulations and the ones for every sector, merged by id
+            candidates = sorted(
+                self.by_key.get((country, sector, attack_type), []) + self.by_key.get((country, ALL, attack_type), [])
+            )
+        else:
+            candidates = [
+                record for record in self.by_attack_type.get(attack_type, ())
+                if (any_country or record[_COUNTRY] == country) and (any_sector or record[_SECTOR] in (sector, ALL))
+            ]
+        if region:
+            candidates = [record for record in candidates if record[_REGION] == region]
+
+        return [
+            (record[_REGULATION], record[_PENALTY], record[_SECTOR], record[_COMMENTS])
+            for record in candidates[:limit]
+        ]
+
+
+def load(conn, version=None):
+    """
+    load returns the container's RegulationIndex, reading security_regulations
+    only when its version changed. A handler passes the version selected with
+    VERSION_COLUMN in its own query; without it the version is read again at
+    most every REGULATION_INDEX_CHECK_S seconds.
+
+    :param version: The current version of security_regulations, if the caller has it
+    """
+    global _index, _checked_at
+
+    now = time.monotonic()
+    if version is None and _index is not None and now - _checked_at < REGULATION_INDEX_CHECK_S:
+        return _index
+
+    with conn.cursor() as cursor:
+        if version is None:
+            cursor.execute("SELECT " + VERSION_COLUMN)
+            version = cursor.fetchone()[0]
+        if _index is None or _index.version != version:
+            cursor.execute(REGULATIONS_QUERY)
+            _index = RegulationIndex(cursor.fetchall(), version)
+            get_logger().info("regulation_index_loaded", extra={"fields": {"version": version, "regulations": _index.size}})
+
+    _checked_at = now
+    return _index
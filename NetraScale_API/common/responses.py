@@ -0,0 +1,118 @@
+import gzip
+import json
+import os
+import uuid
+from datetime import datetime, timezone
+
+from common.context import current
+from common.logger import get_logger
+from common.metrics import phase
+
+# Responses larger than this (bytes) are spilled to S3. Lambda's 6 MB limit applies to the proxy response as the
+# runtime encodes it, where the body is a JSON string: every quote and backslash of the body is escaped and every
+# non-ASCII character becomes a \uXXXX sequence, so the response is measured in that form
+
+RESPONSE_SPILL_BYTES = int(os.environ.get("RESPONSE_SPILL_BYTES", str(5 * 1024 * 1024)))
+
+# Bucket holding spilled bodies; without it oversized bodies are returned as is (and logged)
+RESPONSE_SPILL_BUCKET = os.environ.get("RESPONSE_SPILL_BUCKET")
+RESPONSE_SPILL_PREFIX = os.environ.get("RESPONSE_SPILL_PREFIX", "responses")
+
+# Seconds a spilled body's link stays valid
+RESPONSE_SPILL_URL_TTL_S = int(os.environ.get("RESPONSE_SPILL_URL_TTL_S", "900"))
+
+# "envelope": 200 with a small JSON body carrying the link; "redirect": 303 to the link
+RESPONSE_SPILL_MODE = os.environ.get("RESPONSE_SPILL_MODE", "envelope")
+
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
+
+def spill(data):
+    """
+    spill stores a serialized body in RESPONSE_SPILL_BUCKET, gzip compressed and
+    served with Content-Encoding: gzip so that clients decompress it transparently.
+
+    :param data: The UTF-8 encoded body
+    :return: A presigned URL of the object
+    """
+    # boto3 is only imported when a response is actually spilled
+    import boto3
+
+    ctx = current()
+    key = "{prefix}/{route}/{day}/{request_id}.json".format(
+        prefix=RESPONSE_SPILL_PREFIX,
+        route=ctx.route if ctx else "local",
+        day=datetime.now(timezone.utc).strftime("%Y-%m-%d"),
+        request_id=(ctx.request_id if ctx else None) or uuid.uuid4().hex,
+    )
+    client = boto3.client("s3")
+    client.put_object(
+        Bucket=RESPONSE_SPILL_BUCKET,
+        Key=key,
+        Body=gzip.compress(data, compresslevel=6),
+        ContentType="application/json",
+        ContentEncoding="gzip",
+    )
+    return client.generate_presigned_url(
+        "get_object", Params={"Bucket": RESPONSE_SPILL_BUCKET, "Key": key}, ExpiresIn=RESPONSE_SPILL_URL_TTL_S
+    )
+
+
+def _escaped_bytes(serialized):
+    # Length of json.dumps(serialized) without building it: the output of json.dumps is ASCII without control
+    # characters, so only its quotes and backslashes grow, by one escape byte each
+    return len(serialized) + 2 + serialized.count('"') + serialized.count("\\")
+
+
+def json_response(body, status=200, headers=None, default=None, encode_body=True):
+    """
+    json_response builds an API Gateway proxy response with a serialized JSON body.
+    A response whose JSON encoding (the form Lambda's payload limit applies to)
+    exceeds RESPONSE_SPILL_BYTES has its body written to S3 instead and
+    carries the presigned link: a 200 envelope {"spilled": true, "url": ...} or,
+    with RESPONSE_SPILL_MODE=redirect, a 303 to the link.
+
+    :param body: The response body (serialized here, or already a JSON string)
+    :param headers: Headers of the response (default: Content-Type: application/json)
+    :param default: json.dumps default for values JSON cannot encode (e.g. str for datetimes)
+    :param encode_body: False to return the body (and the spill envelope) as an object rather than a JSON string,
+        for handlers whose callers already read it that way
+
+    Example:
+        return json_response({"regulations": regulations}, default=str)
+    """
+    headers = dict(JSON_HEADERS, **(headers or {}))
+    with phase("serialize"):
+        serialized = body if isinstance(body, str) else json.dumps(body, default=default)
+    envelope_bytes = len(json.dumps({'statusCode': status, 'body': None, 'headers': headers})) - len("null")
+    if encode_body:
+        response = {'statusCode': status, 'body': serialized, 'headers': headers}
+        # A caller's own string may hold anything, so only that is encoded again to be measured
+        encoded_bytes = envelope_bytes + (len(json.dumps(body)) if body is serialized else _escaped_bytes(serialized))
+    else:
+        response = {'statusCode': status, 'body': body, 'headers': headers}
+        encoded_bytes = envelope_bytes + len(serialized)
+    if encoded_bytes <= RESPONSE_SPILL_BYTES:
+        return response
+
+    if not RESPONSE_SPILL_BUCKET:
+        get_logger().warning("response_oversized", extra={"fields": {"bytes": encoded_bytes, "spill": False}})
+        return response
+
+    data = serialized.encode("utf-8")
+    with phase("spill"):
+        url = spill(data)
+    get_logger().info("response_spilled", extra={"fields": {
+        "bytes": encoded_bytes, "body_bytes": len(data), "mode": RESPONSE_SPILL_MODE,
+    }})
+
+    if RESPONSE_SPILL_MODE == "redirect":
+        return {'statusCode': 303, 'body': '', 'headers': dict(headers, Location=url)}
+    envelope = {
+        "spilled": True,
+        "url": url,
+        "expires_in": RESPONSE_SPILL_URL_TTL_S,
+        "bytes": len(data),
+        "content-encoding": "gzip",
+    }
+    return {'statusCode': status, 'body': json.dumps(envelope) if encode_body else envelope, 'headers': headers}
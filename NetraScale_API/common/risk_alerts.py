@@ -0,0 +1,116 @@
+from common.logger import get_logger
+
+# One set-based pass: the month's scores that differ from the previous month's are matched against the
+# enabled rules of their org; alerts already raised for the rule, category and month are skipped.
+# {where} narrows the pass to the (org, category) scores a scoring run actually rewrote (CHANGED_FILTER).
+EVALUATE_QUERY = """
+    WITH changed AS (
+        SELECT cur.organization_id, cur.category, cur.score, prev.score AS previous_score
+        FROM public.historical_risk_score cur
+        LEFT JOIN public.historical_risk_score prev
+            ON prev.organization_id = cur.organization_id AND prev.category = cur.category
+            AND prev.year = %(previous_year)s AND prev.month = %(previous_month)s
+        WHERE cur.year = %(year)s AND cur.month = %(month)s
+            AND cur.score IS DISTINCT FROM prev.score
+            {where}
+    )
+    INSERT INTO public.risk_alert (rule_id, organization_id, category, year, month, previous_score, score)
+    SELECT r.id, c.organization_id, c.category, %(year)s, %(month)s, c.previous_score, c.score
+    FROM changed c
+    JOIN public.risk_alert_rule r
+        ON r.organization_id = c.organization_id AND r.enabled
+        AND (r.category IS NULL OR r.category = c.category)
+    WHERE (r.rule_type = 'threshold' AND c.score >= r.threshold
+               AND (c.previous_score IS NULL OR c.previous_score < r.threshold))
+       OR (r.rule_type = 'delta' AND c.previous_score IS NOT NULL
+               AND ABS(c.score - c.previous_score) >= r.threshold)
+    ON CONFLICT (rule_id, category, year, month) DO NOTHING
+"""
+
+CHANGED_FILTER = """
+            AND (cur.organization_id, cur.category) IN (
+                SELECT * FROM unnest(%(organization_ids)s::integer[], %(categories)s::text[])
+            )
+"""
+
+CLAIM_QUERY = """
+    UPDATE public.risk_alert a SET notified_on = now()
+    FROM public.risk_alert_rule r
+    WHERE r.id = a.rule_id AND a.id IN (
+        SELECT id FROM public.risk_alert
+        WHERE notified_on IS NULL
+        ORDER BY id
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING a.id, a.organization_id, a.category, a.year, a.month, a.previous_score, a.score,
+              r.rule_type, r.threshold
+"""
+
+
+def evaluate(conn, year, month, changed=None):
+    """
+    evaluate raises the alerts of a scoring run. Only (org, category) scores that
+    changed since the previous month are compared against the rules, and with
+    changed only those the run inserted or updated, so re-running a month does
+    not re-scan the scores it left untouched.
+
+    Rules:
+        threshold - the score reached the threshold (and the previous score was below it)
+        delta     - the score moved by at least the threshold since the previous month
+
+    :param conn: A database connection without a transaction in progress
+    :param year: The year of the scores just written
+    :param month: The month of the scores just written (1 - 12)
+    :param changed: [(organization_id, category), ...] rewritten by the run; None evaluates every score of the month
+    :return: The number of new alerts
+    """
+    previous_year, previous_month = (year, month - 1) if month > 1 else (year - 1, 12)
+    parameters = {
+        "year": year,
+        "month": month,
+        "previous_year": previous_year,
+        "previous_month": previous_month,
+    }
+
+    raised = 0
+    if changed is None or changed:
+        if changed is not None:
+            parameters["organization_ids"] = [key[0] for key in changed]
+            parameters["categories"] = [key[1] for key in changed]
+        with conn.cursor() as cursor:
+            cursor.execute(EVALUATE_QUERY.format(where=CHANGED_FILTER if changed is not None else ""), parameters)
+            raised = cursor.rowcount
+        conn.commit()
+
+    get_logger().info("risk_alerts", extra={"fields": {
+        "year": year, "month": month, "evaluated": len(changed) if changed is not None else None, "alerts": raised,
+    }})
+    return raised
+
+
+def claim_pending(conn, limit=100):
+    """
+    claim_pending marks up to limit unsent alerts as notified and returns them,
+    for a notifier to fan out in one batch. Concurrent notifiers never receive
+    the same alert (SKIP LOCKED); the caller commits once the batch is delivered
+    and rolls back to release it otherwise.
+
+    :return: A list of alert dicts
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(CLAIM_QUERY, (limit,))
+        return [
+            {
+                "id": record[0],
+                "organization_id": record[1],
+                "category": record[2],
+                "year": record[3],
+                "month": record[4],
+                "previous_score": record[5],
+                "score": record[6],
+                "rule_type": record[7],
+                "threshold": record[8],
+            }
+            for record in cursor.fetchall()
+        ]
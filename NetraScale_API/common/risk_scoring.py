@@ -0,0 +1,299 @@
+import time
+from datetime import date
+
+import numpy as np
+from common import bulk_writer, peer_percentiles, risk_alerts, score_rollups, severity_cube
+from common.mitigation import MITIGATION_FACTORS
+from common.logger import get_logger
+
+# Likelihood used when an organization's probability of occurrence is undetermined (0)
+UNDETERMINED_LIKELIHOOD = 0.5
+
+# Share of the category score driven by likelihood; the remainder is driven by impact
+LIKELIHOOD_WEIGHT = 0.5
+
+# Share of the impact driven by the category's risk factor severity; the remainder by the breach cost
+SEVERITY_WEIGHT = 0.6
+
+# Maximum reduction granted when all mitigation activities of a category are completed
+COMPLETION_CREDIT = 0.3
+
+# The overall score blends the mean category score with the worst category score
+OVERALL_MEAN_WEIGHT = 0.7
+
+# Lower bounds of the Medium, High and Critical bands (same bands as get_risk_severity_summary)
+RISK_LEVEL_BOUNDS = [26, 51, 76]
+RISK_LEVELS = np.array(["Low", "Medium", "High", "Critical"])
+
+# Rows fetched per round trip when reading the per-org threat summaries
+FETCH_BATCH_SIZE = 50000
+
+
+class ScoringInputs:
+    """
+    ScoringInputs holds the per (org, category) threat summaries as parallel
+    arrays together with the per-category severity and mitigation completion.
+    """
+
+    def __init__(self, org_ids, categories, org_codes, category_codes, probability, breach_cost,
+                 risk_status, category_severity, category_completion):
+        self.org_ids = org_ids
+        self.categories = categories
+        self.org_codes = org_codes
+        self.category_codes = category_codes
+        self.probability = probability
+        self.breach_cost = breach_cost
+        self.risk_status = risk_status
+        self.category_severity = category_severity
+        self.category_completion = category_completion
+
+
+class ScoringResult:
+    """
+    ScoringResult holds the category score matrix (orgs x categories, NaN where an
+    org has no summary for the category) and the overall score per org.
+    """
+
+    def __init__(self, org_ids, categories, category_scores, overall_scores, risk_levels, high_counts):
+        self.org_ids = org_ids
+        self.categories = categories
+        self.category_scores = category_scores
+        self.overall_scores = overall_scores
+        self.risk_levels = risk_levels
+        self.high_counts = high_counts
+
+    def category_rows(self):
+        """
+        category_rows yields (org_id, category, score) for every scored pair.
+        """
+        org_index, category_index = np.nonzero(~np.isnan(self.category_scores))
+        scores = self.category_scores[org_index, category_index].astype(int)
+        for org, category, score in zip(org_index.tolist(), category_index.tolist(), scores.tolist()):
+            yield self.org_ids[org], self.categories[category], score
+
+    def overall_rows(self):
+        """
+        overall_rows yields (org_id, score, risk_level, summary) for every org.
+        """
+        counts = np.sum(~np.isnan(self.category_scores), axis=1)
+        for org_id, score, level, high, total in zip(self.org_ids, self.overall_scores.tolist(),
+                                                     self.risk_levels.tolist(), self.high_counts.tolist(),
+                                                     counts.tolist()):
+            yield org_id, score, level, f"{high} of {total} threat categories at High or Critical risk"
+
+
+def _factorize(values):
+    index = {}
+    codes = np.fromiter((index.setdefault(value, len(index)) for value in values), dtype=np.int64, count=len(values))
+    return codes, list(index)
+
+
+def _per_category(rows, categories, default):
+    values = np.full(len(categories), default, dtype=float)
+    position = {category: i for i, category in enumerate(categories)}
+    for category, value in rows:
+        if category in position and value is not None:
+            values[position[category]] = float(value)
+    return values
+
+
+def load_inputs(conn, year):
+    """
+    load_inputs reads every organization's threat summaries plus the per-category
+    risk factor severity and mitigation completion in three statements.
+
+    :param conn: A database connection (common.db.connect())
+    :param year: The risk factor year to score against
+    :return: ScoringInputs
+    """
+    org_ids, categories, probability, breach_cost, risk_status = [], [], [], [], []
+
+    # Server-side cursor so the summaries are streamed in batches rather than materialized twice
+    with conn.cursor(name="risk_scoring_threat_summaries") as cursor:
+        cursor.itersize = FETCH_BATCH_SIZE
+        cursor.execute("""
+            SELECT organization_id, UPPER(common_threat), COALESCE(probability_of_occurrence, 0),
+                   COALESCE(breach_cost, 0), COALESCE(risk_status, 0)
+            FROM public.organization_common_threat_summary
+        """)
+        while True:
+            batch = cursor.fetchmany(FETCH_BATCH_SIZE)
+            if not batch:
+                break
+            for row in batch:
+                org_ids.append(row[0])
+                categories.append(row[1])
+                probability.append(row[2])
+                breach_cost.append(row[3])
+                risk_status.append(row[4])
+
+    org_codes, unique_orgs = _factorize(org_ids)
+    category_codes, unique_categories = _factorize(categories)
+
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT UPPER(category), AVG(severity)
+            FROM public.risk_factors_per_threat
+            WHERE year = %s AND deprecated = false
+            GROUP BY UPPER(category)
+        """, (year,))
+        severity = _per_category(cursor.fetchall(), unique_categories, 0.0)
+
+        cursor.execute("""
+            SELECT UPPER(category), AVG(CASE WHEN tactic_state = 'completed' THEN 1.0 ELSE 0.0 END)
+            FROM public.general_threat_mitigation_activities
+            GROUP BY UPPER(category)
+        """)
+        completion = _per_category(cursor.fetchall(), unique_categories, 0.0)
+
+    # Severity scale is not fixed, so normalize to 0 - 1 against the most severe category
+    # (there are no categories at all before the first threat summary is written)
+    if severity.size and severity.max() > 0:
+        severity = severity / severity.max()
+
+    return ScoringInputs(
+        org_ids=unique_orgs,
+        categories=unique_categories,
+        org_codes=org_codes,
+        category_codes=category_codes,
+        probability=np.asarray(probability, dtype=float),
+        breach_cost=np.asarray(breach_cost, dtype=float),
+        risk_status=np.asarray(risk_status, dtype=np.int64),
+        category_severity=severity,
+        category_completion=completion,
+    )
+
+
+def compute_scores(inputs):
+    """
+    compute_scores scores every (org, category) pair and every org at once with
+    array operations; there is no per-org Python loop.
+
+    category score = 100 * (w * likelihood + (1 - w) * impact) * residual risk
+        likelihood    = probability_of_occurrence / 4 (undetermined -> UNDETERMINED_LIKELIHOOD)
+        impact        = blend of category severity and log breach cost relative to the category maximum
+        residual risk = MITIGATION_FACTORS[risk_status] * (1 - COMPLETION_CREDIT * category completion)
+
+    :param inputs: ScoringInputs
+    :return: ScoringResult (without any org when there are no threat summaries)
+    """
+    n_orgs = len(inputs.org_ids)
+    n_categories = len(inputs.categories)
+    cat = inputs.category_codes
+
+    if n_orgs == 0:
+        return ScoringResult([], inputs.categories, np.empty((0, n_categories)), np.empty(0, dtype=int),
+                             RISK_LEVELS[:0], np.empty(0, dtype=int))
+
+    likelihood = np.where(inputs.probability > 0, np.clip(inputs.probability, 0, 4) / 4.0, UNDETERMINED_LIKELIHOOD)
+
+    log_cost = np.log1p(np.clip(inputs.breach_cost, 0, None))
+    max_log_cost = np.zeros(n_categories)
+    np.maximum.at(max_log_cost, cat, log_cost)
+    category_max = max_log_cost[cat]
+    cost_impact = np.divide(log_cost, category_max, out=np.zeros_like(log_cost), where=category_max > 0)
+
+    impact = SEVERITY_WEIGHT * inputs.category_severity[cat] + (1 - SEVERITY_WEIGHT) * cost_impact
+    residual = MITIGATION_FACTORS[np.clip(inputs.risk_status, 0, len(MITIGATION_FACTORS) - 1)]
+    residual = residual * (1 - COMPLETION_CREDIT * inputs.category_completion[cat])
+
+    scores = np.rint(100 * (LIKELIHOOD_WEIGHT * likelihood + (1 - LIKELIHOOD_WEIGHT) * impact) * residual)
+
+    category_scores = np.full((n_orgs, n_categories), np.nan)
+    category_scores[inputs.org_codes, cat] = np.clip(scores, 0, 100)
+
+    # Every org has at least one summary row, so the NaN reductions never see an empty row
+    overall = OVERALL_MEAN_WEIGHT * np.nanmean(category_scores, axis=1) \
+        + (1 - OVERALL_MEAN_WEIGHT) * np.nanmax(category_scores, axis=1)
+    overall = np.rint(overall).astype(int)
+
+    levels = RISK_LEVELS[np.digitize(overall, RISK_LEVEL_BOUNDS)]
+    high_counts = np.sum(category_scores >= RISK_LEVEL_BOUNDS[1], axis=1)
+
+    return ScoringResult(inputs.org_ids, inputs.categories, category_scores, overall, levels, high_counts)
+
+
+def write_scores(conn, result, year, month):
+    """
+    write_scores upserts the category scores into historical_risk_score and the
+    overall scores into overall_risk_score for the given month, through the bulk
+    COPY writer (one transaction per chunk).
+
+    :param conn: A database connection without a transaction in progress
+    :param result: ScoringResult
+    :param year: The score year
+    :param month: The score month (1 - 12)
+    :return: The bulk writer summaries of both tables
+    """
+    assessment_date = date(year, month, 1)
+
+    historical = bulk_writer.upsert(
+        conn, "public.historical_risk_score",
+        ["organization_id", "category", "score", "year", "month"],
+        ["organization_id", "year", "month", "category"],
+        ((org_id, category, score, year, month) for org_id, category, score in result.category_rows()),
+        # Unchanged scores are not rewritten, and the rewritten keys drive the alert evaluation
+        changed_column="score",
+        returning=["organization_id", "category"],
+    )
+
+    overall = bulk_writer.upsert(
+        conn, "public.overall_risk_score",
+        ["organization_id", "overall_risk_score", "risk_level_indicator", "summary_statement", "date_of_last_assessment"],
+        ["organization_id", "date_of_last_assessment"],
+        ((org_id, score, level, summary, assessment_date) for org_id, score, level, summary in result.overall_rows()),
+    )
+
+    return [historical, overall]
+
+
+def run(conn, year, month, dry_run=False):
+    """
+    run loads, scores and (unless dry_run) writes the scores of every org for a month,
+    then refreshes the month's rollups, severity cube and peer distributions and
+    raises the alerts of the changed scores.
+
+    :return: A summary dict with the row counts and the time spent per step
+    """
+    logger = get_logger()
+
+    started = time.perf_counter()
+    inputs = load_inputs(conn, year)
+    loaded = time.perf_counter()
+
+    result = compute_scores(inputs)
+    computed = time.perf_counter()
+
+    # The loads ran in a read transaction; end it so the writer starts its own chunked transactions
+    conn.rollback()
+
+    writes = []
+    alerts = 0
+    if not result.org_ids:
+        logger.warning("risk_scoring", extra={"fields": {"year": year, "month": month, "error": "no threat summaries"}})
+    elif not dry_run:
+        writes = write_scores(conn, result, year, month)
+        # Only the rollups and cube cells containing this month are recomputed
+        score_rollups.refresh(conn, year, month)
+        severity_cube.refresh(conn, year, month)
+        # Peer distributions are built from the scores just written
+        writes.append(peer_percentiles.refresh(conn, year, month))
+        # Alerts only look at the (org, category) scores this run rewrote that changed since last month
+        alerts = risk_alerts.evaluate(conn, year, month, changed=writes[0].pop("returned"))
+    written = time.perf_counter()
+
+    summary = {
+        "year": year,
+        "month": month,
+        "organizations": len(result.org_ids),
+        "categories": len(result.categories),
+        "category_scores": int(np.count_nonzero(~np.isnan(result.category_scores))),
+        "load_s": round(loaded - started, 3),
+        "compute_s": round(computed - loaded, 3),
+        "write_s": round(written - computed, 3),
+        "dry_run": dry_run,
+        "alerts": alerts,
+        "rows_per_s": {write["table"]: write["rows_per_s"] for write in writes},
+    }
+    logger.info("risk_scoring", extra={"fields": summary})
+    return summary
@@ -0,0 +1,80 @@
+from datetime import date
+
+from common.logger import get_logger
+
+GRAINS = ("month", "quarter", "year")
+
+# Aggregates the scores of every grain in one pass; {where} limits it to the periods being refreshed
+ROLLUP_QUERY = """
+    INSERT INTO public.historical_risk_score_rollup
+        (organization_id, category, grain, period_start, score_avg, score_min, score_max, score_last, sample_count)
+    SELECT h.organization_id, h.category, g.grain,
+           date_trunc(g.grain, make_date(h.year, h.month, 1))::date AS period_start,
+           AVG(h.score), MIN(h.score), MAX(h.score),
+           (ARRAY_AGG(h.score ORDER BY h.year DESC, h.month DESC))[1],
+           COUNT(*)
+    FROM public.historical_risk_score h
+    CROSS JOIN (VALUES ('month'), ('quarter'), ('year')) AS g(grain)
+    WHERE h.score IS NOT NULL {where}
+    GROUP BY h.organization_id, h.category, g.grain, period_start
+    ON CONFLICT (organization_id, category, grain, period_start) DO UPDATE SET
+        score_avg = EXCLUDED.score_avg,
+        score_min = EXCLUDED.score_min,
+        score_max = EXCLUDED.score_max,
+        score_last = EXCLUDED.score_last,
+        sample_count = EXCLUDED.sample_count
+"""
+
+# Only the month, quarter and year containing the scored month are recomputed
+REFRESH_FILTER = """
+        AND h.year = %(year)s
+        AND date_trunc(g.grain, make_date(h.year, h.month, 1)) = date_trunc(g.grain, %(period)s::date)
+"""
+
+
+def refresh(conn, year, month):
+    """
+    refresh recomputes, for every organization and category, the month, quarter
+    and year rollups that contain the given month. It reads at most the twelve
+    months of that year and is run after each scoring run.
+
+    :param conn: A database connection without a transaction in progress
+    :return: The number of rollup rows written
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(ROLLUP_QUERY.format(where=REFRESH_FILTER), {"year": year, "period": date(year, month, 1)})
+        written = cursor.rowcount
+    conn.commit()
+
+    get_logger().info("score_rollups", extra={"fields": {"year": year, "month": month, "rows": written}})
+    return written
+
+
+def rebuild(conn):
+    """
+    rebuild recomputes every rollup from the full history (backfill after the
+    migration, or after scores were corrected outside the scoring job).
+
+    :return: The number of rollup rows written
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(ROLLUP_QUERY.format(where=""))
+        written = cursor.rowcount
+    conn.commit()
+
+    get_logger().info("score_rollups", extra={"fields": {"rebuild": True, "rows": written}})
+    return written
+
+
+def period_start(years_back, grain, today):
+    """
+    period_start returns the first period_start covered by a period of years_back
+    years, aligned on the grain (e.g. the start of the quarter).
+
+    :param years_back: Years of history (0 for all)
+    :return: A date, or None for the full history
+    """
+    if not years_back:
+        return None
+    start_month = 1 if grain == "year" else today.month - (today.month - 1) % (3 if grain == "quarter" else 1)
+    return date(today.year - years_back, start_month, 1)
@@ -0,0 +1,51 @@
+from common.logger import get_logger
+
+SEVERITIES = ("low", "medium", "high", "critical")
+
+# Same bands as get_risk_severity_summary always used: 0-25, 26-50, 51-75, 76-100
+CUBE_QUERY = """
+    INSERT INTO public.risk_severity_cube (organization_id, year, month, category, severity, score_count)
+    SELECT organization_id, year, month, category,
+           CASE WHEN score <= 25 THEN 'low'
+                WHEN score <= 50 THEN 'medium'
+                WHEN score <= 75 THEN 'high'
+                ELSE 'critical' END AS severity,
+           COUNT(*)
+    FROM public.historical_risk_score
+    WHERE score BETWEEN 0 AND 100 {where}
+    GROUP BY organization_id, year, month, category, severity
+"""
+
+
+def refresh(conn, year, month):
+    """
+    refresh replaces the cube cells of one month from historical_risk_score, in a
+    single transaction so readers never see the month half written.
+
+    :param conn: A database connection without a transaction in progress
+    :return: The number of cube rows written
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("DELETE FROM public.risk_severity_cube WHERE year = %s AND month = %s", (year, month))
+        cursor.execute(CUBE_QUERY.format(where="AND year = %s AND month = %s"), (year, month))
+        written = cursor.rowcount
+    conn.commit()
+
+    get_logger().info("severity_cube", extra={"fields": {"year": year, "month": month, "rows": written}})
+    return written
+
+
+def rebuild(conn):
+    """
+    rebuild recomputes the whole cube from the full score history.
+
+    :return: The number of cube rows written
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("TRUNCATE public.risk_severity_cube")
+        cursor.execute(CUBE_QUERY.format(where=""))
+        written = cursor.rowcount
+    conn.commit()
+
+    get_logger().info("severity_cube", extra={"fields": {"rebuild": True, "rows": written}})
+    return written
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import random
+import re
+from datetime import datetime, timezone
+
+from common.context import current
+from common.logger import get_logger
+
+# Statements at or above this duration (milliseconds) are recorded
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "200"))
+
+# Fraction (0.0 - 1.0) of slow statements that also get an EXPLAIN plan captured on a side connection
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(os.environ.get("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", "0"))
+
+# When set, plans are written to this S3 bucket instead of being inlined in the log line
+SLOW_QUERY_PLAN_BUCKET = os.environ.get("SLOW_QUERY_PLAN_BUCKET")
+
+_COMMENT_RE = re.compile(r"/\*.*?\*/|--[^\n]*", re.S)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_sql(query):
+    """
+    normalize_sql reduces a statement to a stable shape for grouping: comments
+    removed, inlined literals replaced with ? and whitespace collapsed.
+
+    Example:
+        >>> normalize_sql("SELECT id FROM t WHERE a = 'x'  AND b = 10")
+        'SELECT id FROM t WHERE a = ? AND b = ?'
+    """
+    if isinstance(query, bytes):
+        query = query.decode("utf-8", "replace")
+    query = _COMMENT_RE.sub(" ", str(query))
+    query = _STRING_RE.sub("?", query)
+    query = _NUMBER_RE.sub("?", query)
+    return _WHITESPACE_RE.sub(" ", query).strip().rstrip(";").strip()
+
+
+def _value_shape(value):
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def parameter_shape(vars):
+    """
+    parameter_shape describes the statement parameters by type (and length for
+    sequences) without recording any values.
+
+    Example:
+        >>> parameter_shape(("42", [1, 2, 3], None))
+        ['str', 'list[3]', 'NoneType']
+    """
+    if vars is None:
+        return None
+    if isinstance(vars, dict):
+        return {key: _value_shape(value) for key, value in vars.items()}
+    return [_value_shape(value) for value in vars]
+
+
+def is_read_only(query):
+    """
+    is_read_only decides whether EXPLAIN ANALYZE can safely re-run the statement.
+    """
+    normalized = normalize_sql(query).upper()
+    if not (normalized.startswith("SELECT") or normalized.startswith("WITH")):
+        return False
+    return not re.search(r"\b(INSERT|UPDATE|DELETE|MERGE)\b", normalized)
+
+
+def summarize_plan(plan):
+    """
+    summarize_plan lists the node types and the relations read by sequential scan
+    so that plan regressions can be spotted without reading the full plan.
+
+    :param plan: The parsed output of EXPLAIN (FORMAT JSON)
+    """
+    node_types = set()
+    seq_scans = set()
+
+    def walk(node):
+        node_types.add(node.get("Node Type"))
+        if node.get("Node Type") == "Seq Scan":
+            seq_scans.add(node.get("Relation Name"))
+        for child in node.get("Plans", []):
+            walk(child)
+
+    for entry in plan or []:
+        walk(entry.get("Plan", {}))
+
+    return {"node_types": sorted(t for t in node_types if t), "seq_scans": sorted(s for s in seq_scans if s)}
+
+
+def _store_plan(record, plan):
+    # boto3 is only imported when plans are actually shipped to S3
+    import boto3
+
+    key = "slow-queries/{route}/{day}/{fingerprint}-{request_id}.json".format(
+        route=record["route"] or "unknown",
+        day=datetime.now(timezone.utc).strftime("%Y-%m-%d"),
+        fingerprint=record["fingerprint"],
+        request_id=record["request_id"] or "local",
+    )
+    boto3.client("s3").put_object(
+        Bucket=SLOW_QUERY_PLAN_BUCKET,
+        Key=key,
+        Body=json.dumps({"record": record, "plan": plan}, default=str).encode("utf-8"),
+        ContentType="application/json",
+    )
+    return f"s3://{SLOW_QUERY_PLAN_BUCKET}/{key}"
+
+
+def _log_sink(record):
+    get_logger().warning("slow_query", extra={"fields": record})
+
+
+_sink = _log_sink
+
+
+def set_sink(sink):
+    """
+    set_sink replaces where slow query records go (default: a WARNING log line).
+    The local harness uses it to build the same report locally.
+
+    :param sink: A callable receiving each record (dict); None restores logging
+    """
+    global _sink
+    _sink = sink or _log_sink
+
+
+def capture(query, vars, duration_ms, rows, explain=None):
+    """
+    capture records a statement that ran at or above SLOW_QUERY_MS. For a sampled
+    subset the plan is captured through explain(query, vars, analyze).
+
+    :param query: The statement as executed
+    :param vars: The statement parameters (only their shape is recorded)
+    :param duration_ms: How long the statement took
+    :param rows: Rows returned or affected (cursor.rowcount)
+    :param explain: Callable returning the EXPLAIN (FORMAT JSON) output for the statement
+    """
+    ctx = current()
+    normalized = normalize_sql(query)
+
+    record = {
+        "route": ctx.route if ctx else None,
+        "request_id": ctx.request_id if ctx else None,
+        "fingerprint": hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:12],
+        "sql": normalized,
+        "parameters": parameter_shape(vars),
+        "rows": rows,
+        "duration_ms": round(duration_ms, 2),
+    }
+
+    if explain is not None and SLOW_QUERY_EXPLAIN_SAMPLE_RATE > 0 and random.random() < SLOW_QUERY_EXPLAIN_SAMPLE_RATE:
+        plan = explain(query, vars, is_read_only(query))
+        if plan is not None:
+            record["plan_summary"] = summarize_plan(plan)
+            if SLOW_QUERY_PLAN_BUCKET:
+                try:
+                    record["plan_location"] = _store_plan(record, plan)
+                except Exception as e:
+                    record["plan_error"] = f"Unable to store plan: {e}"
+            else:
+                record["plan"] = plan
+
+    _sink(record)
@@ -0,0 +1,70 @@
+import os
+import re
+from urllib.parse import quote, unquote
+
+from common.context import current
+
+# Set SQL_COMMENTER_ENABLED=false to send statements without the trailing tag comment
+SQL_COMMENTER_ENABLED = os.environ.get("SQL_COMMENTER_ENABLED", "true").lower() != "false"
+
+_TAG_RE = re.compile(r"/\*((?:\w+='[^']*',?)+)\*/\s*;?\s*$")
+_PAIR_RE = re.compile(r"(\w+)='([^']*)'")
+
+
+def build_comment(ctx):
+    """
+    build_comment renders the request details as a sqlcommenter style comment:
+    sorted key='value' pairs with URL encoded values.
+
+    Example:
+        /*cold='false',org='42',request_id='8d2c...',route='get_risk_score'*/
+    """
+    tags = {
+        "cold": "true" if ctx.cold else "false",
+        "org": ctx.org_id,
+        "request_id": ctx.request_id,
+        "route": ctx.route,
+    }
+    pairs = ",".join(
+        f"{key}='{quote(str(value), safe='')}'"
+        for key, value in sorted(tags.items())
+        if value is not None
+    )
+    return f"/*{pairs}*/"
+
+
+def tag(query, has_parameters):
+    """
+    tag appends the comment of the current request to a statement. The comment
+    goes before any trailing semicolon so it stays part of the statement text
+    that pg_stat_statements records; comments do not affect its queryid, so
+    statements still normalize to one entry. It starts a new line, so a
+    statement ending in a -- line comment does not swallow it.
+
+    :param query: The statement about to be executed
+    :param has_parameters: Whether psycopg2 will %-format the statement
+    :return: The tagged statement (unchanged when disabled, outside a request or not a str)
+    """
+    ctx = current()
+    if not SQL_COMMENTER_ENABLED or ctx is None or not isinstance(query, str):
+        return query
+
+    comment = build_comment(ctx)
+    if has_parameters:
+        # URL encoded values contain % which psycopg2 would treat as a placeholder
+        comment = comment.replace("%", "%%")
+
+    return f"{query.rstrip().rstrip(';').rstrip()}\n{comment}"
+
+
+def parse(query):
+    """
+    parse extracts the tags from a statement's trailing comment.
+
+    :param query: A statement text, e.g. the query column of pg_stat_statements
+    :return: A dict of the tags (empty when the statement is untagged)
+    """
+    match = _TAG_RE.search(query or "")
+    if not match:
+        return {}
+    return {key: unquote(value) for key, value in _PAIR_RE.findall(match.group(1))}
@@ -0,0 +1,126 @@
+import json
+import psycopg2
+from common.db import connect
+from common.invocation import invocation, record_rows
+from common.logger import get_logger
+from common.metrics import phase
+from common import exports
+
+@invocation("export_risk_history")
+def lambda_handler(event, context):
+    # An export too large to finish within the request, handed over by exports.start
+    if "export" in event:
+        return run_export(event["export"])
+
+    try:
+        org_id = event['pathParameters'].get('orgId', None)
+    except KeyError:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': 'Missing orgId parameter','event-stack':event}),
+            'headers': {
+                'Content-Type': 'application/json'
+            }
+        }
+
+    # dataset (historical_risk_score, match_score or evidence_collection) and format (csv, ndjson or parquet)
+    parameters = event.get("queryStringParameters") or {}
+    dataset = parameters.get("dataset", "historical_risk_score")
+    export_format = parameters.get("format", "csv").lower()
+    if dataset not in exports.DATASETS or export_format not in exports.FORMATS:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({
+                'error': f'dataset must be one of {", ".join(exports.DATASETS)} '
+                         f'and format one of {", ".join(exports.FORMATS)}'
+            }),
+            'headers': {
+                'Content-Type': 'application/json'
+            }
+        }
+
+    conn = None
+    try:
+        conn = connect()
+
+        with conn.cursor() as cursor:
+            # The organization check also counts the rows, to decide between a direct and an asynchronous export
+            cursor.execute(
+                "SELECT o.id, " + exports.ROW_COUNT.format(dataset=dataset)
+                + " FROM public.\"Organization\" o WHERE o.id = %s",
+                (org_id,)
+            )
+            organization = cursor.fetchone()
+            if organization is None:
+                return {
+                    "statusCode": 400,
+                    "body": f"Organization with ID {org_id} does not exist."
+                }
+
+        # The rows never reach the response: they are streamed to S3 and the body only carries the link.
+        # An export that would not finish within API Gateway's 29 s runs in an asynchronous invocation.
+        with phase("export"):
+            if organization[1] > exports.EXPORT_SYNC_ROWS and not exports.EXPORT_DIR:
+                summary = exports.start(context.function_name, org_id, dataset, export_format)
+            else:
+                summary = exports.export(conn, org_id, dataset, export_format)
+                record_rows(summary["rows"])
+
+    except psycopg2.Error as e:
+        return {
+            "statusCode": 500,
+            "body": f"Database error: {str(e)}"
+        }
+    except exports.ExportError as e:
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': str(e)}),
+            'headers': {
+                'Content-Type': 'application/json'
+            }
+        }
+    finally:
+        if conn:
+            conn.close()
+
+    with phase("serialize"):
+        serialized = json.dumps(summary)
+
+    return {
+        'statusCode': 202 if summary.get("status") == "pending" else 200,
+        'body': serialized,
+        'headers': {
+            'Content-Type': 'application/json'
+        }
+    }
+
+
+def run_export(request):
+    """
+    run_export writes an export started by exports.start under the name its link
+    points to. The caller already has the links, so the outcome is logged and
+    written to the export's status object: a failure is reported there rather
+    than raised, since a retried invocation would fail the same way.
+    """
+    org_id, name = request["orgId"], request["name"]
+    conn = None
+    try:
+        conn = connect()
+        with phase("export"):
+            summary = exports.export(conn, org_id, request["dataset"], request["format"], name)
+        record_rows(summary["rows"])
+    except (psycopg2.Error, exports.ExportError) as e:
+        get_logger().error("export_failed", extra={"fields": {
+            "organization_id": org_id, "dataset": request["dataset"], "name": name, "error": str(e),
+        }})
+        status = {"status": "failed", "error": str(e)}
+        exports.write_status(org_id, name, status)
+        return status
+    finally:
+        if conn:
+            conn.close()
+
+    exports.write_status(org_id, name, {
+        "status": "complete", "rows": summary["rows"], "bytes": summary["bytes"],
+    })
+    return summary
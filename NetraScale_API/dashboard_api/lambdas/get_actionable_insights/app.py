@@ -1,5 +1,7 @@
 import json
+from common.invocation import invocation
 
+@invocation("get_actionable_insights")
 def lambda_handler(event, context):
     # Default response for API Gateway
     response = {
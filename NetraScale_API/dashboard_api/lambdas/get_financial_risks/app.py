@@ -1,15 +1,83 @@
 import json
+import psycopg2
+from common.db import connect
+from common.invocation import invocation, record_rows
+from common.metrics import phase
+from common import financial_risk
 
+@invocation("get_financial_risks")
 def lambda_handler(event, context):
-    # Default response for API Gateway
+    try:
+        org_id = event['pathParameters'].get('orgId', None)
+    except KeyError:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': 'Missing orgId parameter','event-stack':event}),
+            'headers': {
+                'Content-Type': 'application/json'
+            }
+        }
+
+    # Optional number of simulated years (defaults to FINANCIAL_RISK_SAMPLES)
+    samples = (event.get("queryStringParameters") or {}).get("samples", None)
+    try:
+        samples = int(samples) if samples else financial_risk.FINANCIAL_RISK_SAMPLES
+        if not 1 <= samples <= financial_risk.FINANCIAL_RISK_MAX_SAMPLES:
+            raise ValueError
+    except ValueError:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': f'samples must be between 1 and {financial_risk.FINANCIAL_RISK_MAX_SAMPLES}'}),
+            'headers': {
+                'Content-Type': 'application/json'
+            }
+        }
+
+    # Warm containers answer from the per-org cache without touching the database
+    assessment = financial_risk.cached(org_id, samples)
+
+    if assessment is None:
+        conn = None
+        try:
+            conn = connect()
+            with phase("simulate"):
+                assessment = financial_risk.assess(conn, org_id, samples)
+        except psycopg2.Error as e:
+            return {
+                "statusCode": 500,
+                "body": f"Database error: {str(e)}"
+            }
+        finally:
+            if conn:
+                conn.close()
+
+    if assessment is None:
+        return {
+            "statusCode": 400,
+            "body": f"Organization with ID {org_id} does not exist."
+        }
+    record_rows(1)
+
+    with phase("serialize"):
+        serialized = json.dumps({
+            "annualized-loss-expectancy": round(assessment["ale"], 2),
+            "single-loss-expectancy": round(assessment["sle"], 2),
+            "annualized-rate-of-occurrence": round(assessment["aro"], 4),
+            "potential-impact-rating": assessment["impact_rating"],
+            "cost-of-inaction": round(assessment["cost_of_inaction"], 2),
+            "annual-loss-percentiles": {
+                f"p{percentile}": round(value, 2) for percentile, value in assessment["percentiles"].items()
+            },
+            "samples": assessment["samples"],
+            # Yearly totals drawn from their compound distribution rather than incident by incident
+            "approximated": assessment["approximated"],
+        })
+
     response = {
         "statusCode": 200,
-        "body": json.dumps({
-            "annualized-loss-expectancy": 30000,
-            "single-loss-expectancy": 10000,
-            "annualized-rate-of-occurrence": 0.5,
-            "potential-impact-rating": "High",
-            "cost-of-inaction": 10000,
-        })
+        "body": serialized,
+        'headers': {
+            'Content-Type': 'application/json'
+        }
     }
     return response
@@ -1,8 +1,11 @@
 import json
 import psycopg2
-import os
 from datetime import datetime
+from common.db import connect
+from common.invocation import invocation, record_rows
+from common import news_ranking
 
+@invocation("get_news_feed")
 def lambda_handler(event, context):
     try:  
         org_id = event['pathParameters'].get('orgId', None)
@@ -15,74 +18,54 @@ def lambda_handler(event, context):
             }
         }
 
-    
+    # Optional q= full-text search of titles and summaries (web search syntax: words, "phrases", -exclusions)
+    search = ((event.get('queryStringParameters') or {}).get('q') or '').strip()
 
     # the maximum number of results to return from the database for the invocation
     result_limit = 10
 
     cursor = None
-
-    # Retrieve the fundamentl environment variables
-    db_host = os.environ['DB_HOST']
-    db_name = os.environ['DB_NAME']
-    db_user = os.environ['DB_USER']
-    db_password = os.environ['DB_PASSWORD']
-    db_port = os.environ.get('DB_PORT', 5432)
+    conn = None
 
     try:
         # Connect to the database
-        conn = psycopg2.connect(
-            host=db_host,
-            database=db_name,
-            user=db_user,
-            password=db_password,
-            port=db_port
-        )
-
-        cursor = conn.cursor()
-
-
-        # Retrieve country and sector from database
-        query = "SELECT industry, region FROM public.\"Organization\" where id=%s;"
-        params = [org_id]
-
-        country = None
-        sector = None
+        conn = connect()
 
         with conn.cursor() as cursor:
-            cursor.execute(query, params)
-            records = cursor.fetchone()
-
-            if records:
-                sector = records[0]
-                country = records[1]
+            # The stories are ranked by recency, exact location and sector match and overlap with the org's
+            # threat categories; without q= the candidates come from the precomputed top stories of its segment
+            parameters = {"org_id": org_id, "limit": result_limit, "window": news_ranking.NEWS_WINDOW_DAYS, "query": search}
+            if search:
+                cursor.execute(news_ranking.live_query(search=True), parameters)
+            else:
+                cursor.execute(news_ranking.FEED_QUERY, parameters)
+            records = cursor.fetchall()
 
-                country = country.upper()
-                sector = sector.upper()
+            if not records:
+                return {
+                    "statusCode": 400,
+                    "body": f"Organization with ID {org_id} does not exist."
+                }
 
-            cursor.execute("""
-                SELECT title, author, published_at, tags, url, summary, source, 
-                    related_location, related_sector, related_risk
-                FROM public.news_feed 
-                WHERE 
-                        (related_location = 'GLOBAL' or related_location = %s)
-                        AND (related_sector = 'GENERAL' or related_sector = %s)
-                ORDER by related_sector,related_location 
-                limit %s;                       
-            """, (country, sector,result_limit))
+            # A segment that appeared since the last refresh is ranked straight from news_feed; one the refresh
+            # covered is served as precomputed, even when it has no story in the window
+            if not search and not records[0][8]:
+                cursor.execute(news_ranking.live_query(), parameters)
+                records = cursor.fetchall()
 
-            records = cursor.fetchall()
+            records = [record for record in records if record[1] is not None]
+            record_rows(len(records))
 
             response = {
                 "news-feed": [
                     {                    
-                        "title":record[0],
-                        "author":record[1],
-                        "published_at":record[2].isoformat() if isinstance(record[2], datetime) else record[2],
-                        "tags":record[3],
-                        "url":record[4],
-                        "summary":record[5],
-                        "source":record[6]	
+                        "title":record[1],
+                        "author":record[2],
+                        "published_at":record[3].isoformat() if isinstance(record[3], datetime) else record[3],
+                        "tags":record[4],
+                        "url":record[5],
+                        "summary":record[6],
+                        "source":record[7]
                     }
                     for record in records
                 ]
@@ -107,4 +90,4 @@ def lambda_handler(event, context):
         if cursor:
             cursor.close()
         if conn:
-            conn.close()
\ No newline at end of file
+            conn.close()
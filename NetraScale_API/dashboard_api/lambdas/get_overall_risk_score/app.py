@@ -1,8 +1,10 @@
 import json
 import psycopg2
-import os
 from datetime import datetime
+from common.db import connect
+from common.invocation import invocation, record_rows
 
+@invocation("get_overall_risk_score")
 def lambda_handler(event, context):
     try:  
         org_id = event['pathParameters'].get('orgId', None)
@@ -22,22 +24,9 @@ def lambda_handler(event, context):
 
     cursor = None
 
-    # Retrieve the fundamentl environment variables
-    db_host = os.environ['DB_HOST']
-    db_name = os.environ['DB_NAME']
-    db_user = os.environ['DB_USER']
-    db_password = os.environ['DB_PASSWORD']
-    db_port = os.environ.get('DB_PORT', 5432)
-
     try:
         # Connect to the database
-        conn = psycopg2.connect(
-            host=db_host,
-            database=db_name,
-            user=db_user,
-            password=db_password,
-            port=db_port
-        )
+        conn = connect()
 
         cursor = conn.cursor()
 
@@ -51,10 +40,9 @@ def lambda_handler(event, context):
             """, (org_id,))
 
             records = cursor.fetchall()
+            record_rows(len(records))
             response = {}
 
-            print(records)
-
             if records == None or len(records) == 0:
                 response = {
                     "overall-risk-score": [
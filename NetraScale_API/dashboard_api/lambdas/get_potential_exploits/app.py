@@ -1,5 +1,7 @@
 import json
+from common.invocation import invocation
 
+@invocation("get_potential_exploits")
 def lambda_handler(event, context):
     # Default response for API Gateway
     response = {
@@ -1,13 +1,23 @@
 import json
 import psycopg2
-import os
-import logging
+from datetime import date, datetime
+from common.logger import get_logger
+from common.db import connect
+from common.invocation import invocation, record_rows
+from common.metrics import phase
+from common import forecasting
 
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+logger = get_logger()
 
+# Months per bucket, and the number of buckets returned when "from" is omitted
+RESOLUTIONS = {"month": 1, "quarter": 3, "year": 12}
+DEFAULT_POINTS = {"month": 24, "quarter": 12, "year": 10}
+
+# Upper bound on the points of one response, whatever the requested range
+MAX_POINTS = 120
+
+@invocation("get_risk_score_trend")
 def lambda_handler(event, context):
-    logger.info("Event received: %s", json.dumps(event))
 
     # 1. Get orgId from pathParameters
     try:
@@ -20,62 +30,96 @@ def lambda_handler(event, context):
             'body': {'error': 'Missing orgId parameter', 'event-stack': event},
             'headers': {'Content-Type': 'application/json'}
         }
-    
-    # 2. DB credentials from environment
-    db_host = os.environ['DB_HOST']
-    db_name = os.environ['DB_NAME']
-    db_user = os.environ['DB_USER']
-    db_password = os.environ['DB_PASSWORD']
-    db_port = os.environ.get('DB_PORT', 5432)
+
+    parameters = event.get('queryStringParameters') or {}
+
+    # 2. Optional forecast=N: projections for the next N months, read from the nightly forecast cache
+    try:
+        forecast_months = forecasting.parse_months(parameters.get('forecast'))
+    except ValueError:
+        return {
+            'statusCode': 400,
+            'body': {'error': f'forecast must be between 1 and {forecasting.FORECAST_HORIZON}'},
+            'headers': {'Content-Type': 'application/json'}
+        }
+
+    # 3. Range and bucketing: from/to (YYYY-MM or YYYY-MM-DD, both inclusive), resolution and aggregate
+    resolution = parameters.get('resolution', 'month').lower()
+    aggregate = parameters.get('aggregate', 'avg').lower()
+    try:
+        if resolution not in RESOLUTIONS:
+            raise ValueError('resolution must be month, quarter or year')
+        if aggregate not in ('avg', 'last'):
+            raise ValueError('aggregate must be avg or last')
+        start, end = parse_range(parameters.get('from'), parameters.get('to'), resolution)
+    except ValueError as e:
+        return {
+            'statusCode': 400,
+            'body': {'error': str(e)},
+            'headers': {'Content-Type': 'application/json'}
+        }
 
     cursor = None
     conn = None
 
     try:
-        conn = psycopg2.connect(
-            host=db_host,
-            database=db_name,
-            user=db_user,
-            password=db_password,
-            port=db_port
-        )
-
-        # 3. SQL query
-        sql = """
-            SELECT
-                overall_risk_score,
-                EXTRACT(MONTH FROM date_of_last_assessment) AS month,
-                EXTRACT(YEAR FROM date_of_last_assessment) AS year
+        conn = connect()
+
+        # 4. SQL query: filtered on the (organization_id, date_of_last_assessment) index and aggregated per bucket
+        if aggregate == 'avg':
+            score_column = "AVG(overall_risk_score)"
+        else:
+            score_column = "(ARRAY_AGG(overall_risk_score ORDER BY date_of_last_assessment DESC))[1]"
+        sql = f"""
+            SELECT date_trunc(%s, date_of_last_assessment) AS bucket, {score_column}
             FROM public.overall_risk_score
-            WHERE organization_id = %s
-            ORDER BY year, month;
+            WHERE organization_id = %s AND date_of_last_assessment >= %s AND date_of_last_assessment < %s
+            GROUP BY bucket
+            ORDER BY bucket
         """
-        # 4. Execute
+        # 5. Execute
         with conn.cursor() as cursor:
-            cursor.execute(sql, (org_id,))
+            cursor.execute(sql, (resolution, org_id, start, end))
             records = cursor.fetchall()
+            record_rows(len(records))
 
-        # 5. Map month # to short names
+            forecast = None
+            if forecast_months:
+                forecast = forecasting.read_forecast(cursor, org_id, forecasting.OVERALL, forecast_months)
+
+        # 6. Map month # to short names
         months_abbr = {
             1: "Jan", 2: "Feb", 3: "Mar", 4: "Apr", 5: "May", 6: "Jun",
             7: "Jul", 8: "Aug", 9: "Sep", 10: "Oct", 11: "Nov", 12: "Dec"
         }
 
-        # 6. Format as needed
+        # 7. Format as needed
         trend = []
         for record in records:
-            score, month, year = record
-            month_abbr = months_abbr.get(int(month), str(int(month)))
-            trend.append({
-                "month": month_abbr,
-                "year": int(year),
-                "score": int(score) if score is not None else None
-            })
-
-        # 7. The response as requested
+            bucket, score = record
+            point = {
+                "year": bucket.year,
+                "score": int(round(score)) if score is not None else None
+            }
+            if resolution == "month":
+                point["month"] = months_abbr[bucket.month]
+            elif resolution == "quarter":
+                point["quarter"] = f"Q{(bucket.month - 1) // 3 + 1}"
+            trend.append(point)
+
+        # 8. The response as requested
+        body = {"trend": trend, "resolution": resolution}
+        if forecast is not None:
+            body["forecast"] = [
+                dict(point, month=months_abbr.get(point["month"], str(point["month"])))
+                for point in forecast
+            ]
+        with phase("serialize"):
+            serialized = json.dumps(body)
+
         response = {
             "statusCode": 200,
-            "body": json.dumps({"trend": trend}),
+            "body": serialized,
             "headers": {'Content-Type': 'application/json'}
         }
         return response
@@ -91,4 +135,48 @@ def lambda_handler(event, context):
         if cursor:
             cursor.close()
         if conn:
-            conn.close()
\ No newline at end of file
+            conn.close()
+
+
+def month_number(day):
+    return day.year * 12 + day.month - 1
+
+
+def first_of(number):
+    return date(number // 12, number % 12 + 1, 1)
+
+
+def parse_date(value, end=False):
+    # YYYY-MM covers the whole month; an inclusive end date is returned as the (exclusive) next day or month
+    value = value.strip()
+    try:
+        if len(value) == 7:
+            day = datetime.strptime(value, "%Y-%m").date()
+            return first_of(month_number(day) + 1) if end else day
+        day = datetime.strptime(value, "%Y-%m-%d").date()
+        return date.fromordinal(day.toordinal() + 1) if end else day
+    except ValueError:
+        raise ValueError(f"Invalid date {value!r}, expected YYYY-MM or YYYY-MM-DD") from None
+
+
+def parse_range(start, end, resolution):
+    """
+    parse_range resolves the from/to parameters into [start, end) dates. Without
+    "from" the range covers DEFAULT_POINTS buckets up to "to" (default: this month).
+    """
+    months = RESOLUTIONS[resolution]
+    end = parse_date(end, end=True) if end else first_of(month_number(datetime.utcnow().date()) + 1)
+
+    if start:
+        start = parse_date(start)
+    else:
+        # Align on the bucket boundary so that the first bucket is complete
+        last_bucket = (month_number(end) - 1) // months * months
+        start = first_of(last_bucket - (DEFAULT_POINTS[resolution] - 1) * months)
+
+    if start >= end:
+        raise ValueError("from must be before to")
+    if (month_number(end) - month_number(start)) / months > MAX_POINTS:
+        raise ValueError(f"The range covers more than {MAX_POINTS} {resolution}s; narrow it or use a coarser resolution")
+
+    return start, end
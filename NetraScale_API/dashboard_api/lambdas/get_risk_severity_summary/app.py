@@ -1,16 +1,18 @@
 import json
-import os
 import psycopg2
-import logging
 from datetime import datetime
+from common.logger import get_logger
+from common.db import connect
+from common.invocation import invocation, record_rows
+from common.metrics import phase
+from common.batch import split_list
 
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+logger = get_logger()
 
+@invocation("get_risk_severity_summary")
 def lambda_handler(event, context):
-    logger.info("Event received: %s", json.dumps(event))
     try:
-        #org_id = event['orgId']        
+        #org_id = event['orgId']
         org_id = event['pathParameters'].get('orgId', None)
     except KeyError:
         return {
@@ -21,90 +23,67 @@ def lambda_handler(event, context):
             }
         }
 
-    # TODO: Perform validate of the category here
-    #category = event["queryStringParameters"].get("category", None)
-    #category = category.upper()
+    parameters = event.get("queryStringParameters") or {}
 
+    # Establish basic variables for SQLcalls: from/to are inclusive months (YYYY-MM), defaulting to the current month
+    current_date = datetime.utcnow()
+    try:
+        start = parse_month(parameters.get("from")) or (current_date.year, current_date.month)
+        end = parse_month(parameters.get("to")) or (current_date.year, current_date.month)
+        if start > end:
+            raise ValueError("from must not be after to")
+    except ValueError as e:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': str(e)}),
+            'headers': {
+                'Content-Type': 'application/json'
+            }
+        }
 
-    # Retrieve the fundamentl environment variables
-    db_host = os.environ['DB_HOST']
-    db_name = os.environ['DB_NAME']
-    db_user = os.environ['DB_USER']
-    db_password = os.environ['DB_PASSWORD']
-    db_port = os.environ.get('DB_PORT', 5432)
+    # Optional categories=A,B,C subset (all categories by default)
+    categories = split_list(parameters.get("categories"), upper=True) or None
 
-    # Establish basic variables for SQLcalls
-    current_date = datetime.utcnow()
-    month = current_date.month
-    year = current_date.year
-    author = "system"
-    
     response = None
+    cursor = None
+    conn = None
 
-    # Store the risk score in the historical table.
     try:
         # Connect to the database
-        conn = psycopg2.connect(
-            host=db_host,
-            database=db_name,
-            user=db_user,
-            password=db_password,
-            port=db_port
-        )
+        conn = connect()
 
         cursor = conn.cursor()
 
-        # Ensure the organization exists
-        cursor.execute("SELECT id FROM public.\"Organization\" WHERE id = %s", (org_id,))
-        if not cursor.fetchone():
+        # Ensure the organization exists and sum the severity cube over the range in one query;
+        # the (organization_id, year, month, ...) primary key makes this a single index range scan
+        cursor.execute(
+            """
+            SELECT o.id, c.severity, SUM(c.score_count)
+            FROM public.\"Organization\" o
+            LEFT JOIN public.risk_severity_cube c
+                ON c.organization_id = o.id
+                AND (c.year, c.month) >= (%s, %s) AND (c.year, c.month) <= (%s, %s)
+                AND (%s::text[] IS NULL OR c.category = ANY(%s::text[]))
+            WHERE o.id = %s
+            GROUP BY o.id, c.severity
+            """,
+            (start[0], start[1], end[0], end[1], categories, categories, org_id)
+        )
+        records = cursor.fetchall()
+        if not records:
             return {
                 "statusCode": 400,
                 "body": f"Organization with ID {org_id} does not exist."
             }
+        record_rows(1)
 
-        # Check if a record already exists for this organization, month, and year
-        cursor.execute(
-            """
-            SELECT 
-                SUM(CASE WHEN score BETWEEN 0 AND 25 THEN 1 ELSE 0 END) AS Low,
-                SUM(CASE WHEN score BETWEEN 26 AND 50 THEN 1 ELSE 0 END) AS Medium,
-                SUM(CASE WHEN score BETWEEN 51 AND 75 THEN 1 ELSE 0 END) AS High,
-                SUM(CASE WHEN score BETWEEN 76 AND 100 THEN 1 ELSE 0 END) AS Critical
-            FROM 
-                historical_risk_score
-            WHERE 
-                organization_id = %s 
-                AND month = %s 
-                AND year = %s;
+        counts = {"low": 0, "medium": 0, "high": 0, "critical": 0}
+        for record in records:
+            if record[1] is not None:
+                counts[record[1]] = int(record[2])
+
+        response = counts
 
-            """,
-            (org_id, month, year)
-        )
-        records = cursor.fetchone()
-
-        response = None
-
-        if records[0] is None:
-            response = {
-                "statusCode": 200,
-                "body": json.dumps({
-                    "low": 0,
-                    "medium": 0,
-                    "high": 0,
-                    "critical": 0
-                })
-            }
-        else:
-            response = {
-                "statusCode": 200,
-                "body": json.dumps({
-                    "low": records[0],
-                    "medium": records[1],
-                    "high": records[2],
-                    "critical": records[3]
-                })
-            }
-            
     except psycopg2.Error as e:
         return {
             "statusCode": 500,
@@ -117,12 +96,25 @@ def lambda_handler(event, context):
             conn.close()
 
 
+    # The body keeps its original envelope, {"statusCode": 200, "body": "<counts as JSON>"}, built in one phase
+    with phase("serialize"):
+        serialized = json.dumps({"statusCode": 200, "body": json.dumps(response)})
+
     return {
         'statusCode': 200,
-        'body': json.dumps(response),
+        'body': serialized,
         'headers': {
             'Content-Type': 'application/json'
         }
     }
- 
 
+
+def parse_month(value):
+    # YYYY-MM -> (year, month); None when absent
+    if not value:
+        return None
+    try:
+        day = datetime.strptime(value.strip(), "%Y-%m")
+    except ValueError:
+        raise ValueError(f"Invalid month {value!r}, expected YYYY-MM") from None
+    return day.year, day.month
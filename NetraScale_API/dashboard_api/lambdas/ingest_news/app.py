@@ -0,0 +1,67 @@
+import json
+import psycopg2
+from common.db import connect
+from common.invocation import invocation, record_rows
+from common.logger import get_logger
+from common import news_ingestion
+
+
+def parse_records(records):
+    """
+    parse_records reads the articles of SQS records: every body is an article or a
+    list of articles (JSON objects).
+
+    :return: (articles, failures), failures being the batchItemFailures entries of
+        the records that could not be parsed
+    """
+    articles = []
+    failures = []
+    for record in records:
+        try:
+            body = json.loads(record["body"])
+            body = body if isinstance(body, list) else [body]
+            if not all(isinstance(article, dict) for article in body):
+                raise ValueError("an article is not a JSON object")
+        except (KeyError, TypeError, ValueError) as e:
+            get_logger().warning("ingest_news_unparsable", extra={"fields": {
+                "message_id": record.get("messageId"), "error": str(e),
+            }})
+            failures.append({"itemIdentifier": record.get("messageId")})
+            continue
+        articles.extend(body)
+    return articles, failures
+
+
+@invocation("ingest_news")
+def lambda_handler(event, context):
+    # Triggered by the news queue (SQS) with ReportBatchItemFailures: the records that cannot be parsed are
+    # reported back, so only they are retried and eventually moved to the dead letter queue. A database error
+    # is raised, so that the whole batch stays on the queue instead of being deleted as processed.
+    # A direct invocation may pass {"articles": [...]} instead.
+    event = event or {}
+    articles, failures = parse_records(event.get("Records") or [])
+    articles.extend(event.get("articles") or [])
+
+    conn = None
+    try:
+        conn = connect()
+        summary = news_ingestion.ingest(conn, articles)
+        record_rows(summary["written"])
+    except psycopg2.Error:
+        if conn:
+            conn.rollback()
+        raise
+    finally:
+        if conn:
+            conn.close()
+
+    if "Records" in event:
+        return {"batchItemFailures": failures}
+
+    return {
+        'statusCode': 200,
+        'body': json.dumps(summary),
+        'headers': {
+            'Content-Type': 'application/json'
+        }
+    }
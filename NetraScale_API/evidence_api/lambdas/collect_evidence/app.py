@@ -1,14 +1,16 @@
 import json
 import os
 import re
-import boto3
 import psycopg2
 import base64
 import logging
 from datetime import datetime
+from common.db import connect
+from common.invocation import invocation
 
 
 # Lambda Handler Function
+@invocation("collect_evidence")
 def lambda_handler(event, context):
     try:
         http_method = event["httpMethod"]
@@ -88,7 +90,7 @@ def update_flag(event):
     current_date = datetime.utcnow()
     year = current_date.year
 
-    conn = get_db_connection()
+    conn = connect()
     cursor = conn.cursor()
 
     try:
@@ -179,6 +181,8 @@ def upload_file(event):
     file_content = base64.b64decode(file_content_base64)
     s3_key = f"uploads/{org_id}/{file_name}"
 
+    # boto3 is only needed for uploads, so keep it out of the cold start of PATCH requests
+    import boto3
     s3_client = boto3.client("s3")
 
     # S3 content for storage in the database
@@ -207,7 +211,7 @@ def upload_file(event):
 
     # Store the metadata in the database
     try:        
-        conn = get_db_connection()
+        conn = connect()
         cursor = conn.cursor()
 
         # Get the evidence collection ID for the created/updated evidence
@@ -239,22 +243,6 @@ def upload_file(event):
         conn.close()
         
 
-def get_db_connection():
-
-    DB_HOST = os.getenv("DB_HOST")
-    DB_NAME = os.getenv("DB_NAME")
-    DB_USER = os.getenv("DB_USER")
-    DB_PASSWORD = os.getenv("DB_PASSWORD")
-    DB_PORT = os.getenv("DB_PORT")
-
-    return psycopg2.connect(
-        host=DB_HOST,
-        database=DB_NAME,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        port=DB_PORT
-    )
-
 # TODO: Move to common library
 def is_valid_filename(filename, allowed_extensions=None):
     """
@@ -1,7 +1,8 @@
 import json
-import os
-import psycopg2
+from common.invocation import invocation
+from common.metrics import phase
 
+@invocation("get_attack_analysis")
 def lambda_handler(event, context):
 
     try:
@@ -21,14 +22,6 @@ def lambda_handler(event, context):
     category = event['queryStringParameters'].get('category', None)
 
 
-    # Database connection parameters
-    db_host = os.environ['DB_HOST']
-    db_name = os.environ['DB_NAME']
-    db_user = os.environ['DB_USER']
-    db_password = os.environ['DB_PASSWORD']
-    db_port = os.environ.get('DB_PORT', 3306)
-
-
     adversary_definition = {
         "adversary-definition": {
             "title": "AI-Based Attack",
@@ -67,7 +60,10 @@ def lambda_handler(event, context):
         }
     }
     
+    with phase("serialize"):
+        serialized = json.dumps(adversary_definition)
+
     return {
         'statusCode': 200,
-        'body': json.dumps(adversary_definition)
+        'body': serialized
     }
\ No newline at end of file
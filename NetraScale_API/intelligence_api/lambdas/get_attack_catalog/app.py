@@ -1,7 +1,8 @@
 import json
-import os
-import psycopg2
+from common.invocation import invocation
+from common.metrics import phase
 
+@invocation("get_attack_catalog")
 def lambda_handler(event, context):
 
     try:
@@ -15,14 +16,6 @@ def lambda_handler(event, context):
             }
         }
 
-    # Database connection parameters
-    db_host = os.environ['DB_HOST']
-    db_name = os.environ['DB_NAME']
-    db_user = os.environ['DB_USER']
-    db_password = os.environ['DB_PASSWORD']
-    db_port = os.environ.get('DB_PORT', 3306)
-
-
     attack_data = {
         "attack_types": [
             {
@@ -84,7 +77,10 @@ def lambda_handler(event, context):
         ]
     }
     
+    with phase("serialize"):
+        serialized = json.dumps(attack_data)
+
     return {
         'statusCode': 200,
-        'body': json.dumps(attack_data)
+        'body': serialized
     }
\ No newline at end of file
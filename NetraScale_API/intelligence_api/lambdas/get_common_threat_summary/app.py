@@ -5,7 +5,11 @@ from decimal import Decimal
 from netrascale_utils.postgres_manager import PostgresManager
 from netrascale_utils.common_db_calls import is_valid_organization,get_organization_details
 from netrascale_utils.parameter_validation import ParameterValidation
+from common.invocation import invocation, record_rows
+from common.metrics import phase
+from common.peer_percentiles import percentile_rank
 
+@invocation("get_common_threat_summary")
 def lambda_handler(event, context):
 
     # Database connection parameters
@@ -76,17 +80,30 @@ def lambda_handler(event, context):
     try:
         db_manager = PostgresManager(db_secret_name, aws_region,aws_profile)
 
-        base_query = """SELECT id, common_threat, problem_statement, solution_statement, risk_status, probability_of_occurrence, 
-            potential_impact, breach_cost FROM public.organization_common_threat_summary where organization_id=%s"""
+        # The breach cost peer distribution of the org's sector (own region first) is joined per threat
+        base_query = """SELECT t.id, t.common_threat, t.problem_statement, t.solution_statement, t.risk_status,
+            t.probability_of_occurrence, t.potential_impact, t.breach_cost, peer.quantiles
+            FROM public.organization_common_threat_summary t
+            JOIN public."Organization" o ON o.id = t.organization_id
+            LEFT JOIN LATERAL (
+                SELECT p.quantiles FROM public.peer_score_distribution p
+                WHERE p.metric = 'breach_cost' AND p.category = UPPER(t.common_threat) AND p.industry = o.industry
+                    AND p.region IN (o.region, 'ALL')
+                ORDER BY p.year DESC, p.month DESC, p.region = 'ALL'
+                LIMIT 1
+            ) peer ON true
+            where t.organization_id=%s"""
 
         results = None
 
         if category == "ALL":
             results = db_manager.execute_query(base_query, (org_id,))
         else:
-            base_query += " AND common_threat=%s"
+            base_query += " AND t.common_threat=%s"
             results = db_manager.execute_query(base_query, (org_id,category))
 
+        record_rows(len(results))
+
     except Exception as e:
         return {
             'statusCode': 500,
@@ -106,16 +123,20 @@ def lambda_handler(event, context):
                         "risk_status":MITIGATION_MAPPING.get(record[4], "unknown")  ,
                         "probability":PROBABILITY_MAPPING.get(record[5],"unknown"),
                         "potential_impact":record[6],
-                        "breach_cost":float(record[7]) if isinstance(record[7], Decimal) else record[7]	
+                        "breach_cost":float(record[7]) if isinstance(record[7], Decimal) else record[7],
+                        "breach_cost_peer_percentile":percentile_rank(record[8], record[7])
                     }
                     for record in results
                 ]
             }
         
 
+    with phase("serialize"):
+        serialized = json.dumps(response)
+
     return {
         'statusCode': 200,
-        'body': json.dumps(response),
+        'body': serialized,
         'headers': {
             'Content-Type': 'application/json'
         }
@@ -1,8 +1,11 @@
 import json
-import os
 import psycopg2
 from datetime import datetime
+from common.db import connect
+from common.invocation import invocation, record_rows
+from common.metrics import phase
 
+@invocation("get_sample_incident")
 def lambda_handler(event, context):
     try:  
         org_id = event['pathParameters'].get('orgId', None)
@@ -24,13 +27,6 @@ def lambda_handler(event, context):
     }
 
 
-    # Retrieve the fundamentl environment variables
-    db_host = os.environ['DB_HOST']
-    db_name = os.environ['DB_NAME']
-    db_user = os.environ['DB_USER']
-    db_password = os.environ['DB_PASSWORD']
-    db_port = os.environ.get('DB_PORT', 5432)
-
     # Establish basic variables for SQLcalls
     current_date = datetime.utcnow()
     year = current_date.year
@@ -38,13 +34,7 @@ def lambda_handler(event, context):
 
     try:
         # Connect to the database
-        conn = psycopg2.connect(
-            host=db_host,
-            database=db_name,
-            user=db_user,
-            password=db_password,
-            port=db_port
-        )
+        conn = connect()
 
         cursor = conn.cursor()
 
@@ -57,6 +47,7 @@ def lambda_handler(event, context):
         )
         
         rows = cursor.fetchall()
+        record_rows(len(rows))
 
         for row in rows:
             response["incidents"].append({
@@ -82,9 +73,12 @@ def lambda_handler(event, context):
 
 
     
+    with phase("serialize"):
+        serialized = json.dumps(response)
+
     return {
         'statusCode': 200,
-        'body': json.dumps(response),
+        'body': serialized,
         'headers': {
             'Content-Type': 'application/json'
         }
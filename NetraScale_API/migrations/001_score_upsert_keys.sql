@@ -0,0 +1,11 @@
+-- Unique keys required by the score writers to upsert (INSERT ... ON CONFLICT) computed scores.
+-- One score per organization, category and month; one overall assessment per organization and date.
+
+CREATE UNIQUE INDEX IF NOT EXISTS historical_risk_score_org_period_category_key
+    ON public.historical_risk_score (organization_id, year, month, category);
+
+CREATE UNIQUE INDEX IF NOT EXISTS match_score_org_period_category_key
+    ON public.match_score (organization_id, year, month, category);
+
+CREATE UNIQUE INDEX IF NOT EXISTS overall_risk_score_org_assessment_key
+    ON public.overall_risk_score (organization_id, date_of_last_assessment);
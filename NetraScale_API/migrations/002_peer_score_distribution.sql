@@ -0,0 +1,15 @@
+-- Peer distributions built by common/peer_percentiles.py: 101 quantiles (p0 .. p100) of a metric across the
+-- organizations of a sector and region (region 'ALL' covers the whole sector) per category and month.
+
+CREATE TABLE IF NOT EXISTS public.peer_score_distribution (
+    metric text NOT NULL,                -- 'risk_score' (historical_risk_score) or 'breach_cost' (threat summaries)
+    industry text NOT NULL,
+    region text NOT NULL,
+    category text NOT NULL,
+    year integer NOT NULL,
+    month integer NOT NULL,
+    sample_count integer NOT NULL,
+    quantiles double precision[] NOT NULL,
+    created_on timestamp NOT NULL DEFAULT now(),
+    PRIMARY KEY (metric, industry, region, category, year, month)
+);
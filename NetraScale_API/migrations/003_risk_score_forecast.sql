@@ -0,0 +1,15 @@
+-- Forecasts written nightly by common/forecasting.py and read by get_risk_score_trend / get_historical_risk_score.
+-- category is the historical_risk_score category, or 'OVERALL' for the overall_risk_score series.
+
+CREATE TABLE IF NOT EXISTS public.risk_score_forecast (
+    organization_id integer NOT NULL,
+    category text NOT NULL,
+    year integer NOT NULL,
+    month integer NOT NULL,
+    horizon integer NOT NULL,            -- months ahead of the series' last observed month (not of the run month)
+    forecast double precision NOT NULL,
+    lower_bound double precision NOT NULL,
+    upper_bound double precision NOT NULL,
+    generated_on timestamp NOT NULL,
+    PRIMARY KEY (organization_id, category, year, month)
+);
@@ -0,0 +1,36 @@
+-- Alert rules evaluated by common/risk_alerts.py after every scoring run, and the alerts they raise.
+
+CREATE TABLE IF NOT EXISTS public.risk_alert_rule (
+    id serial PRIMARY KEY,
+    organization_id integer NOT NULL,
+    category text,                       -- NULL applies the rule to every category
+    rule_type text NOT NULL CHECK (rule_type IN ('threshold', 'delta')),
+    threshold double precision NOT NULL, -- 'threshold': score reaches it; 'delta': month over month change of at least it
+    enabled boolean NOT NULL DEFAULT true,
+    created_on timestamp NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS risk_alert_rule_org_idx
+    ON public.risk_alert_rule (organization_id, category) WHERE enabled;
+
+CREATE TABLE IF NOT EXISTS public.risk_alert (
+    id bigserial PRIMARY KEY,
+    rule_id integer NOT NULL REFERENCES public.risk_alert_rule (id) ON DELETE CASCADE,
+    organization_id integer NOT NULL,
+    category text NOT NULL,
+    year integer NOT NULL,
+    month integer NOT NULL,
+    previous_score double precision,
+    score double precision NOT NULL,
+    created_on timestamp NOT NULL DEFAULT now(),
+    notified_on timestamp,
+    -- A rule raises at most one alert per category and month
+    UNIQUE (rule_id, category, year, month)
+);
+
+CREATE INDEX IF NOT EXISTS risk_alert_pending_idx
+    ON public.risk_alert (id) WHERE notified_on IS NULL;
+
+-- The evaluation reads one month of scores for every organization
+CREATE INDEX IF NOT EXISTS historical_risk_score_period_idx
+    ON public.historical_risk_score (year, month);
@@ -0,0 +1,15 @@
+-- Month, quarter and year rollups of historical_risk_score per (organization, category), maintained by
+-- common/score_rollups.py whenever scores are written and read by get_historical_risk_score.
+
+CREATE TABLE IF NOT EXISTS public.historical_risk_score_rollup (
+    organization_id integer NOT NULL,
+    category text NOT NULL,
+    grain text NOT NULL CHECK (grain IN ('month', 'quarter', 'year')),
+    period_start date NOT NULL,
+    score_avg double precision,
+    score_min double precision,
+    score_max double precision,
+    score_last double precision,         -- score of the latest month of the period
+    sample_count integer NOT NULL,
+    PRIMARY KEY (organization_id, category, grain, period_start)
+);
@@ -0,0 +1,12 @@
+-- Severity counts per (organization, month, category, severity) maintained by common/severity_cube.py whenever
+-- scores are written; get_risk_severity_summary sums them over any month range with one index range scan.
+
+CREATE TABLE IF NOT EXISTS public.risk_severity_cube (
+    organization_id integer NOT NULL,
+    year integer NOT NULL,
+    month integer NOT NULL,
+    category text NOT NULL,
+    severity text NOT NULL CHECK (severity IN ('low', 'medium', 'high', 'critical')),
+    score_count integer NOT NULL,
+    PRIMARY KEY (organization_id, year, month, category, severity)
+);
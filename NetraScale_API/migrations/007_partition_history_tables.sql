@@ -0,0 +1,145 @@
+-- Converts the tables that grow without bound into declarative range partitions, maintained
+-- (upcoming partitions created, expired ones archived and dropped) by common/partitions.py:
+--   historical_risk_score  yearly on year          (historical_risk_score_y2024, ...)
+--   common_attack_data     yearly on year          (common_attack_data_y2024, ...)
+--   news_feed              monthly on published_at (news_feed_m202406, ...)
+-- Each table gets a DEFAULT partition for rows outside every range (e.g. a NULL partition key).
+-- The existing rows are copied, so run it in a maintenance window; a table that is already
+-- partitioned is left as is.
+-- Columns, defaults, NOT NULL and CHECK constraints come over with LIKE ... INCLUDING ALL. Indexes
+-- cannot (a unique key of a partitioned table must contain the partition key), so the primary key,
+-- unique keys and secondary indexes of the old table are read from the catalog and recreated
+-- after the copy, with the partition column appended to every key that lacks it. Foreign keys
+-- are recreated as well.
+
+CREATE FUNCTION pg_temp.partition_by_range(p_table text, p_column text, p_interval text) RETURNS void
+LANGUAGE plpgsql AS $$
+DECLARE
+    old_table text := p_table || '_unpartitioned';
+    first_bound date;
+    last_bound date;
+    bound date;
+    serial record;
+    key record;
+    key_columns text;
+    recreate text[] := '{}';
+    statement text;
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = format('public.%I', p_table)::regclass) = 'p' THEN
+        RETURN;
+    END IF;
+
+    -- Keys and indexes of the old table, rebuilt on the partitioned table once the old one is gone
+    -- (index names are unique per schema)
+    FOR key IN
+        SELECT i.indexrelid, c.conname, c.contype, i.indisunique, i.indexprs IS NOT NULL AS has_expressions,
+               pg_get_expr(i.indpred, i.indrelid) AS predicate, ic.relname AS index_name,
+               (SELECT array_agg(a.attname ORDER BY k.ord)
+                FROM unnest(i.indkey::int2[]) WITH ORDINALITY k(attnum, ord)
+                JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+                WHERE k.ord <= i.indnkeyatts) AS columns
+        FROM pg_index i
+        JOIN pg_class ic ON ic.oid = i.indexrelid
+        LEFT JOIN pg_constraint c ON c.conindid = i.indexrelid AND c.conrelid = i.indrelid
+        WHERE i.indrelid = format('public.%I', p_table)::regclass
+    LOOP
+        IF key.indisunique AND NOT key.has_expressions THEN
+            key_columns := (SELECT string_agg(quote_ident(col), ', ') FROM unnest(key.columns) col);
+            IF NOT p_column = ANY(key.columns) THEN
+                key_columns := key_columns || ', ' || quote_ident(p_column);
+            END IF;
+            IF key.contype = 'p' THEN
+                recreate := recreate || format('ALTER TABLE public.%I ADD CONSTRAINT %I PRIMARY KEY (%s)',
+                                               p_table, key.conname, key_columns);
+            ELSIF key.contype = 'u' THEN
+                recreate := recreate || format('ALTER TABLE public.%I ADD CONSTRAINT %I UNIQUE (%s)',
+                                               p_table, key.conname, key_columns);
+            ELSE
+                recreate := recreate || format('CREATE UNIQUE INDEX %I ON public.%I (%s)%s', key.index_name,
+                                               p_table, key_columns, COALESCE(' WHERE ' || key.predicate, ''));
+            END IF;
+        ELSE
+            -- Secondary indexes (and unique expression indexes, which cannot take the partition key)
+            -- keep their definition, minus uniqueness where it cannot be enforced per partition
+            -- (read before the rename, so the definition already names the partitioned table)
+            recreate := recreate || regexp_replace(pg_get_indexdef(key.indexrelid), '^CREATE UNIQUE INDEX',
+                                                   'CREATE INDEX');
+        END IF;
+    END LOOP;
+
+    FOR key IN
+        SELECT conname, pg_get_constraintdef(oid) AS definition
+        FROM pg_constraint
+        WHERE conrelid = format('public.%I', p_table)::regclass AND contype = 'f'
+    LOOP
+        recreate := recreate || format('ALTER TABLE public.%I ADD CONSTRAINT %I %s', p_table, key.conname,
+                                       key.definition);
+    END LOOP;
+
+    EXECUTE format('ALTER TABLE public.%I RENAME TO %I', p_table, old_table);
+    EXECUTE format('CREATE TABLE public.%I (LIKE public.%I INCLUDING ALL EXCLUDING INDEXES) PARTITION BY RANGE (%I)',
+                   p_table, old_table, p_column);
+    EXECUTE format('CREATE TABLE public.%I PARTITION OF public.%I DEFAULT', p_table || '_default', p_table);
+
+    -- One partition per period from the oldest row up to the next period
+    IF p_interval = 'year' THEN
+        EXECUTE format('SELECT make_date(MIN(%1$I)::int, 1, 1), make_date(MAX(%1$I)::int, 1, 1) FROM public.%2$I',
+                       p_column, old_table) INTO first_bound, last_bound;
+    ELSE
+        EXECUTE format('SELECT date_trunc(''month'', MIN(%1$I))::date, date_trunc(''month'', MAX(%1$I))::date FROM public.%2$I',
+                       p_column, old_table) INTO first_bound, last_bound;
+    END IF;
+    bound := COALESCE(first_bound, date_trunc(p_interval, now())::date);
+    last_bound := GREATEST(last_bound, (date_trunc(p_interval, now()) + ('1 ' || p_interval)::interval)::date);
+
+    WHILE bound <= last_bound LOOP
+        IF p_interval = 'year' THEN
+            EXECUTE format('CREATE TABLE public.%I PARTITION OF public.%I FOR VALUES FROM (%s) TO (%s)',
+                           p_table || '_y' || to_char(bound, 'YYYY'), p_table,
+                           extract(year FROM bound)::int, extract(year FROM bound)::int + 1);
+        ELSE
+            EXECUTE format('CREATE TABLE public.%I PARTITION OF public.%I FOR VALUES FROM (%L) TO (%L)',
+                           p_table || '_m' || to_char(bound, 'YYYYMM'), p_table,
+                           bound, (bound + interval '1 month')::date);
+        END IF;
+        bound := (bound + ('1 ' || p_interval)::interval)::date;
+    END LOOP;
+
+    EXECUTE format('INSERT INTO public.%I SELECT * FROM public.%I', p_table, old_table);
+
+    -- serial columns keep their sequence, which would otherwise be dropped with the old table
+    FOR serial IN
+        SELECT a.attname, pg_get_serial_sequence(format('public.%I', old_table), a.attname) AS sequence_name
+        FROM pg_attribute a
+        WHERE a.attrelid = format('public.%I', old_table)::regclass AND a.attnum > 0 AND NOT a.attisdropped
+    LOOP
+        IF serial.sequence_name IS NOT NULL THEN
+            EXECUTE format('ALTER SEQUENCE %s OWNED BY public.%I.%I', serial.sequence_name, p_table, serial.attname);
+        END IF;
+    END LOOP;
+
+    EXECUTE format('DROP TABLE public.%I', old_table);
+
+    FOREACH statement IN ARRAY recreate LOOP
+        EXECUTE statement;
+    END LOOP;
+END
+$$;
+
+SELECT pg_temp.partition_by_range('historical_risk_score', 'year', 'year');
+SELECT pg_temp.partition_by_range('common_attack_data', 'year', 'year');
+SELECT pg_temp.partition_by_range('news_feed', 'published_at', 'month');
+
+-- The keys the queries rely on, in case the old tables did not have them; a unique key of a
+-- partitioned table has to include its partition key, which year already is
+CREATE UNIQUE INDEX IF NOT EXISTS historical_risk_score_org_period_category_key
+    ON public.historical_risk_score (organization_id, year, month, category);
+
+CREATE INDEX IF NOT EXISTS historical_risk_score_period_idx
+    ON public.historical_risk_score (year, month);
+
+-- get_threat_attacks reads one category, newest years first
+CREATE INDEX IF NOT EXISTS common_attack_data_category_year_idx
+    ON public.common_attack_data (category, year);
+
+DROP FUNCTION pg_temp.partition_by_range(text, text, text);
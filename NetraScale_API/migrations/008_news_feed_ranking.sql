@@ -0,0 +1,28 @@
+-- Full-text search over news_feed (get_news_feed?q=) and the per-segment top stories maintained by
+-- common/news_ranking.py, so the default feed is one primary key range read.
+
+ALTER TABLE public.news_feed ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', COALESCE(title, '')), 'A') ||
+        setweight(to_tsvector('english', COALESCE(summary, '')), 'B')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS news_feed_search_idx
+    ON public.news_feed USING gin (search_vector);
+
+-- The refresh and the uncached feed read the recent stories of a location and sector
+CREATE INDEX IF NOT EXISTS news_feed_segment_idx
+    ON public.news_feed (related_location, related_sector, published_at);
+
+-- Top stories per (country, sector) of the organizations; the columns shown in the feed keep news_feed's types
+CREATE TABLE IF NOT EXISTS public.news_feed_top AS
+    SELECT ''::text AS country, ''::text AS sector, 0 AS rank,
+           n.title, n.author, n.published_at, n.tags, n.url, n.summary, n.source,
+           ARRAY[]::text[] AS risks,             -- upper-cased related_risk and tags, matched to threat categories
+           0::double precision AS segment_score, -- exact location and sector match, the time independent part of the score
+           now()::timestamp AS refreshed_on
+    FROM public.news_feed n
+    WITH NO DATA;
+
+CREATE UNIQUE INDEX IF NOT EXISTS news_feed_top_segment_rank_key
+    ON public.news_feed_top (country, sector, rank);
@@ -0,0 +1,24 @@
+-- Keys written by the news ingestion (common/news_ingestion.py):
+--   url_hash  md5 of the normalized URL (trimmed, lower case, without fragment or trailing slash)
+--   simhash   64 bit SimHash of the summary, compared with recent stories to drop near duplicates
+-- Existing rows get their url_hash here; their simhash stays NULL, so they only take part in the URL check.
+
+ALTER TABLE public.news_feed ADD COLUMN IF NOT EXISTS url_hash text;
+ALTER TABLE public.news_feed ADD COLUMN IF NOT EXISTS simhash bigint;
+
+UPDATE public.news_feed
+SET url_hash = md5(rtrim(regexp_replace(lower(btrim(url)), '#.*$', ''), '/'))
+WHERE url_hash IS NULL AND url IS NOT NULL;
+
+-- Stories loaded twice before this migration are kept once, so that the unique index can be built
+DELETE FROM public.news_feed a
+USING public.news_feed b
+WHERE a.url_hash = b.url_hash AND a.published_at = b.published_at AND a.tableoid = b.tableoid AND a.ctid < b.ctid;
+
+-- Conflict target of the loader's upsert; a unique key of the partitioned table must include published_at
+CREATE UNIQUE INDEX IF NOT EXISTS news_feed_url_key
+    ON public.news_feed (url_hash, published_at);
+
+-- URLs already loaded in any month (a story re-sent later updates its row instead of being duplicated)
+CREATE INDEX IF NOT EXISTS news_feed_url_hash_idx
+    ON public.news_feed (url_hash);
@@ -0,0 +1,55 @@
+-- Keys of the feed loader (common/attack_data_loader.py) for common_attack_data and security_incident:
+--   record_key  md5 of the record's identity (category, target / title, source URL), unique per year
+--   row_hash    md5 of the loaded values; a re-sent record that did not change is not rewritten
+-- and the per-feed watermark of the last loaded change. The backfilled keys normalize whitespace like the loader's
+-- _text: runs of whitespace become one space, the ends are trimmed and an empty value counts as missing.
+
+ALTER TABLE public.common_attack_data ADD COLUMN IF NOT EXISTS record_key text;
+ALTER TABLE public.common_attack_data ADD COLUMN IF NOT EXISTS row_hash text;
+ALTER TABLE public.common_attack_data ADD COLUMN IF NOT EXISTS loaded_on timestamp;
+
+UPDATE public.common_attack_data
+SET record_key = md5(concat_ws('|',
+    upper(NULLIF(btrim(regexp_replace(category, '\s+', ' ', 'g')), '')),
+    lower(NULLIF(btrim(regexp_replace(target, '\s+', ' ', 'g')), '')),
+    lower(NULLIF(btrim(regexp_replace(source_article_url, '\s+', ' ', 'g')), ''))
+))
+WHERE record_key IS NULL;
+
+-- Records loaded twice by the manual scripts are kept once
+DELETE FROM public.common_attack_data a
+USING public.common_attack_data b
+WHERE a.record_key = b.record_key AND a.year = b.year AND a.tableoid = b.tableoid AND a.ctid < b.ctid;
+
+-- year is the partition key, so it is part of every unique key of the table
+CREATE UNIQUE INDEX IF NOT EXISTS common_attack_data_record_key
+    ON public.common_attack_data (record_key, year);
+
+ALTER TABLE public.security_incident ADD COLUMN IF NOT EXISTS record_key text;
+ALTER TABLE public.security_incident ADD COLUMN IF NOT EXISTS row_hash text;
+ALTER TABLE public.security_incident ADD COLUMN IF NOT EXISTS loaded_on timestamp;
+
+UPDATE public.security_incident
+SET record_key = md5(concat_ws('|',
+    upper(NULLIF(btrim(regexp_replace(category, '\s+', ' ', 'g')), '')),
+    lower(NULLIF(btrim(regexp_replace(title, '\s+', ' ', 'g')), ''))
+))
+WHERE record_key IS NULL;
+
+DELETE FROM public.security_incident a
+USING public.security_incident b
+WHERE a.record_key = b.record_key AND a.year = b.year AND a.ctid < b.ctid;
+
+CREATE UNIQUE INDEX IF NOT EXISTS security_incident_record_key
+    ON public.security_incident (record_key, year);
+
+-- get_sample_incident reads one category and year
+CREATE INDEX IF NOT EXISTS security_incident_category_year_idx
+    ON public.security_incident (category, year);
+
+CREATE TABLE IF NOT EXISTS public.load_watermark (
+    feed text PRIMARY KEY,             -- dataset and feed name, e.g. common_attack_data:ransomware_tracker
+    watermark timestamp NOT NULL,      -- latest record updated_at loaded
+    rows_changed integer NOT NULL DEFAULT 0,
+    loaded_on timestamp NOT NULL DEFAULT now()
+);
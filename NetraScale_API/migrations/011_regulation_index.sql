@@ -0,0 +1,28 @@
+-- Version counters of reference tables cached in memory by the functions (common/regulation_index.py): every
+-- statement changing a table bumps its version, and a container reloads its copy when the version it sees differs.
+
+CREATE TABLE IF NOT EXISTS public.table_version (
+    table_name text PRIMARY KEY,
+    version bigint NOT NULL DEFAULT 1,
+    changed_at timestamp NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION public.bump_table_version() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO public.table_version (table_name) VALUES (TG_TABLE_NAME)
+    ON CONFLICT (table_name) DO UPDATE SET version = table_version.version + 1, changed_at = now();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS security_regulations_version ON public.security_regulations;
+CREATE TRIGGER security_regulations_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.security_regulations
+    FOR EACH STATEMENT EXECUTE FUNCTION public.bump_table_version();
+
+INSERT INTO public.table_version (table_name) VALUES ('security_regulations')
+ON CONFLICT (table_name) DO NOTHING;
+
+-- The per-request part of get_regulation_stats / get_regulatory_assessment: an organization's regulation states
+CREATE INDEX IF NOT EXISTS organization_regulation_state_org_idx
+    ON public.organization_regulation_state (organization_id, regulation_id);
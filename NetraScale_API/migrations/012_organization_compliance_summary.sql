@@ -0,0 +1,133 @@
+-- get_regulation_stats per organization, kept current by triggers: the regulations of the organization's
+-- (region, industry) with its completion of each, so the endpoint reads one row by primary key.
+
+CREATE TABLE IF NOT EXISTS public.organization_compliance_summary (
+    organization_id integer PRIMARY KEY,
+    country text,
+    sector text,
+    regulation_count integer NOT NULL DEFAULT 0,
+    complete_count integer NOT NULL DEFAULT 0,
+    -- [{"name": regulation, "compliance": percent_complete or null}, ...] in regulation id order
+    in_progress jsonb NOT NULL DEFAULT '[]',
+    updated_at timestamp NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION public.refresh_compliance_summary(org_ids integer[]) RETURNS void AS $$
+BEGIN
+    -- Serializes concurrent refreshes of an organization; the recompute below runs with a snapshot taken
+    -- after the lock, so it sees the state changes committed by the transaction that held it
+    PERFORM 1 FROM public.organization_compliance_summary
+    WHERE organization_id = ANY(org_ids)
+    ORDER BY organization_id
+    FOR UPDATE;
+
+    DELETE FROM public.organization_compliance_summary s
+    WHERE s.organization_id = ANY(org_ids)
+      AND NOT EXISTS (SELECT 1 FROM public."Organization" o WHERE o.id = s.organization_id);
+
+    -- One regulation per name (the first by id), as get_regulation_stats reports them
+    INSERT INTO public.organization_compliance_summary AS summary
+        (organization_id, country, sector, regulation_count, complete_count, in_progress, updated_at)
+    SELECT
+        o.id,
+        upper(o.region),
+        upper(o.industry),
+        count(r.id),
+        count(r.id) FILTER (WHERE r.percent_complete = 100),
+        COALESCE(
+            jsonb_agg(jsonb_build_object('name', r.regulation, 'compliance', r.percent_complete) ORDER BY r.id)
+                FILTER (WHERE r.id IS NOT NULL),
+            '[]'
+        ),
+        now()
+    FROM public."Organization" o
+    LEFT JOIN LATERAL (
+        SELECT DISTINCT ON (sr.regulation) sr.id, sr.regulation, ors.percent_complete
+        FROM public.security_regulations sr
+        LEFT JOIN public.organization_regulation_state ors
+            ON ors.regulation_id = sr.id AND ors.organization_id = o.id
+        WHERE sr.country = upper(o.region) AND sr.sector = upper(o.industry)
+        ORDER BY sr.regulation, sr.id
+    ) r ON true
+    WHERE o.id = ANY(org_ids)
+    GROUP BY o.id
+    ON CONFLICT (organization_id) DO UPDATE SET
+        country = EXCLUDED.country,
+        sector = EXCLUDED.sector,
+        regulation_count = EXCLUDED.regulation_count,
+        complete_count = EXCLUDED.complete_count,
+        in_progress = EXCLUDED.in_progress,
+        updated_at = EXCLUDED.updated_at;
+END;
+$$ LANGUAGE plpgsql;
+
+-- organization_regulation_state: the organizations of the changed rows, once per statement
+CREATE OR REPLACE FUNCTION public.compliance_summary_on_state_change() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM public.refresh_compliance_summary(ARRAY(SELECT DISTINCT organization_id FROM new_states));
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM public.refresh_compliance_summary(ARRAY(
+            SELECT organization_id FROM new_states UNION SELECT organization_id FROM old_states
+        ));
+    ELSE
+        PERFORM public.refresh_compliance_summary(ARRAY(SELECT DISTINCT organization_id FROM old_states));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- security_regulations (or a truncated state table): every organization
+CREATE OR REPLACE FUNCTION public.compliance_summary_on_catalog_change() RETURNS trigger AS $$
+BEGIN
+    PERFORM public.refresh_compliance_summary(ARRAY(SELECT id FROM public."Organization"));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Organization: a new organization, or one whose region / industry changed
+CREATE OR REPLACE FUNCTION public.compliance_summary_on_organization_change() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM public.refresh_compliance_summary(ARRAY[OLD.id]);
+    ELSE
+        PERFORM public.refresh_compliance_summary(ARRAY[NEW.id]);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS compliance_summary_insert ON public.organization_regulation_state;
+CREATE TRIGGER compliance_summary_insert
+    AFTER INSERT ON public.organization_regulation_state
+    REFERENCING NEW TABLE AS new_states
+    FOR EACH STATEMENT EXECUTE FUNCTION public.compliance_summary_on_state_change();
+
+DROP TRIGGER IF EXISTS compliance_summary_update ON public.organization_regulation_state;
+CREATE TRIGGER compliance_summary_update
+    AFTER UPDATE ON public.organization_regulation_state
+    REFERENCING OLD TABLE AS old_states NEW TABLE AS new_states
+    FOR EACH STATEMENT EXECUTE FUNCTION public.compliance_summary_on_state_change();
+
+DROP TRIGGER IF EXISTS compliance_summary_delete ON public.organization_regulation_state;
+CREATE TRIGGER compliance_summary_delete
+    AFTER DELETE ON public.organization_regulation_state
+    REFERENCING OLD TABLE AS old_states
+    FOR EACH STATEMENT EXECUTE FUNCTION public.compliance_summary_on_state_change();
+
+DROP TRIGGER IF EXISTS compliance_summary_truncate ON public.organization_regulation_state;
+CREATE TRIGGER compliance_summary_truncate
+    AFTER TRUNCATE ON public.organization_regulation_state
+    FOR EACH STATEMENT EXECUTE FUNCTION public.compliance_summary_on_catalog_change();
+
+DROP TRIGGER IF EXISTS compliance_summary_catalog ON public.security_regulations;
+CREATE TRIGGER compliance_summary_catalog
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.security_regulations
+    FOR EACH STATEMENT EXECUTE FUNCTION public.compliance_summary_on_catalog_change();
+
+DROP TRIGGER IF EXISTS compliance_summary_organization ON public."Organization";
+CREATE TRIGGER compliance_summary_organization
+    AFTER INSERT OR DELETE OR UPDATE OF industry, region ON public."Organization"
+    FOR EACH ROW EXECUTE FUNCTION public.compliance_summary_on_organization_change();
+
+SELECT public.refresh_compliance_summary(ARRAY(SELECT id FROM public."Organization"));
@@ -0,0 +1,11 @@
+-- Segments ranked by the last refresh of news_feed_top (common/news_ranking.py), including those without any
+-- story in the window, so get_news_feed can tell a segment that is precomputed but empty from one that is not
+-- precomputed yet.
+
+CREATE TABLE IF NOT EXISTS public.news_feed_top_segment (
+    country text NOT NULL,
+    sector text NOT NULL,
+    stories integer NOT NULL,             -- rows of the segment in news_feed_top
+    refreshed_on timestamp NOT NULL,
+    PRIMARY KEY (country, sector)
+);
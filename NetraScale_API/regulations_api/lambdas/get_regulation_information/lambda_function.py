@@ -1,13 +1,12 @@
-import json
-import os
-import logging
-import psycopg2
-from psycopg2.extras import RealDictCursor  # For returning results as dictionaries
+from common.logger import get_logger
+from common.db import connect
+from common.invocation import invocation, record_rows
+from common.responses import json_response
 
 # Set up logging
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+logger = get_logger()
 
+@invocation("get_regulation_information")
 def lambda_handler(event, context):
     # Get the origin from the request headers
     origin = event.get('headers', {}).get('Origin', event.get('headers', {}).get('origin', ''))
@@ -22,10 +21,6 @@ def lambda_handler(event, context):
     # Check if the request origin is allowed
     cors_origin = origin if origin in allowed_origins else allowed_origins[0]
 
-    logger.info("================== EVENT START ==================")
-    logger.info(json.dumps(event, indent=2))
-    logger.info("================== EVENT END ==================")
-    
     # Get query parameters
     query_params = event.get('queryStringParameters', {}) or {}
     sector = query_params.get('sector')
@@ -37,15 +32,8 @@ def lambda_handler(event, context):
     # Only proceed with query if parameters are valid
     if not (sector == 'no_value' and region == 'no_value'):
         try:
-            # Database connection parameters
-            conn = psycopg2.connect(
-                host=os.environ['DB_HOST'],
-                database=os.environ['DB_NAME'],
-                user=os.environ['DB_USER'],
-                password=os.environ['DB_PASSWORD'],
-                port=os.environ.get('DB_PORT', 5432),
-                cursor_factory=RealDictCursor  # Return results as dictionaries
-            )
+            # Return results as dictionaries
+            conn = connect(dict_rows=True)
 
             # Build the query dynamically
             query = """
@@ -65,13 +53,13 @@ def lambda_handler(event, context):
                 query += """ AND sector ILIKE %s"""
                 params.append(f'%{sector}%')
 
-            logger.info(f"Executing query: {query}")
-            logger.info(f"With parameters: {params}")
+            logger.debug("Executing regulation query with %d filter(s)", len(params))
 
             # Execute query
             with conn.cursor() as cur:
                 cur.execute(query, params)
                 regulations = cur.fetchall()
+                record_rows(len(regulations))
                 
                 # Convert results to list of dictionaries
                 regulations = [dict(row) for row in regulations]
@@ -95,19 +83,14 @@ def lambda_handler(event, context):
         }
     }
 
-    response = {
-        'statusCode': 200,
-        'headers': {
+    # Unfiltered requests return every regulation; bodies over the Lambda payload limit are served from S3
+    return json_response(
+        body,
+        headers={
             'Access-Control-Allow-Origin': cors_origin,
             'Access-Control-Allow-Headers': 'Content-Type,X-Api-Key,Authorization',
             'Access-Control-Allow-Methods': 'GET',
             'Access-Control-Allow-Credentials': 'true'
         },
-        'body': json.dumps(body, default=str)  # default=str handles datetime objects
-    }
-
-    logger.info("================== RESPONSE START ==================")
-    logger.info(json.dumps(response, indent=2, default=str))
-    logger.info("================== RESPONSE END ==================")
-
-    return response
\ No newline at end of file
+        default=str,  # default=str handles datetime objects
+    )
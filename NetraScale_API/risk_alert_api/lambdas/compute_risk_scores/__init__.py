@@ -0,0 +1 @@
+# intentionally left blank
\ No newline at end of file
@@ -0,0 +1,53 @@
+import json
+import psycopg2
+from datetime import datetime
+from common.db import connect
+from common.invocation import invocation, record_rows
+from common import risk_scoring
+
+@invocation("compute_risk_scores")
+def lambda_handler(event, context):
+    # Invoked on a schedule (EventBridge); year, month and dry_run may be set on the event to re-score a period
+    event = event or {}
+    current_date = datetime.utcnow()
+    try:
+        year = int(event.get("year", current_date.year))
+        month = int(event.get("month", current_date.month))
+        if not 1 <= month <= 12:
+            raise ValueError("month must be between 1 and 12")
+    except (TypeError, ValueError) as e:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': f'Invalid period: {e}'}),
+            'headers': {
+                'Content-Type': 'application/json'
+            }
+        }
+    dry_run = bool(event.get("dry_run", False))
+
+    conn = None
+    try:
+        conn = connect()
+        summary = risk_scoring.run(conn, year, month, dry_run=dry_run)
+        record_rows(summary["category_scores"])
+    except psycopg2.Error as e:
+        if conn:
+            conn.rollback()
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': f'Database error: {str(e)}'}),
+            'headers': {
+                'Content-Type': 'application/json'
+            }
+        }
+    finally:
+        if conn:
+            conn.close()
+
+    return {
+        'statusCode': 200,
+        'body': json.dumps(summary),
+        'headers': {
+            'Content-Type': 'application/json'
+        }
+    }
@@ -0,0 +1,35 @@
+import json
+import psycopg2
+from common.db import connect
+from common.invocation import invocation, record_rows
+from common import forecasting
+
+@invocation("forecast_risk_scores")
+def lambda_handler(event, context):
+    # Invoked nightly (EventBridge); refits every series and replaces the cached forecasts
+    conn = None
+    try:
+        conn = connect()
+        summary = forecasting.run(conn)
+        record_rows(summary["forecast_series"])
+    except psycopg2.Error as e:
+        if conn:
+            conn.rollback()
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': f'Database error: {str(e)}'}),
+            'headers': {
+                'Content-Type': 'application/json'
+            }
+        }
+    finally:
+        if conn:
+            conn.close()
+
+    return {
+        'statusCode': 200,
+        'body': json.dumps(summary),
+        'headers': {
+            'Content-Type': 'application/json'
+        }
+    }
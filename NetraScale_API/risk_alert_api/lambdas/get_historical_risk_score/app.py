@@ -1,9 +1,13 @@
-import os
 import psycopg2
-from datetime import datetime, timedelta
+from datetime import datetime
 import calendar
 import json
+from common.db import connect
+from common.invocation import invocation, record_rows
+from common.responses import json_response
+from common import forecasting, score_rollups
 
+@invocation("get_historical_risk_score")
 def lambda_handler(event, context):
     try:  
         org_id = event['pathParameters'].get('orgId', None)
@@ -21,28 +25,51 @@ def lambda_handler(event, context):
     category = category.upper()
     
     period = event["queryStringParameters"].get("period", None) # 1,3, or 0 (all)
-        
+    grain = (event["queryStringParameters"].get("grain", None) or "month").lower()
+
+    # period arrives as a string; it must be converted before it can select the date range
+    try:
+        period = int(period) if period not in (None, "") else 0
+        if period not in (0, 1, 3):
+            raise ValueError
+    except ValueError:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': 'period must be 1, 3 or 0 (all)'}),
+            'headers': {
+                'Content-Type': 'application/json'
+            }
+        }
+
+    if grain not in score_rollups.GRAINS:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': 'grain must be month, quarter or year'}),
+            'headers': {
+                'Content-Type': 'application/json'
+            }
+        }
+
     grouping = event["queryStringParameters"].get("grouping", None)
 
     if grouping is not None:
         grouping = grouping.upper()
 
-    # Database connection parameters
-    db_host = os.environ['DB_HOST']
-    db_name = os.environ['DB_NAME']
-    db_user = os.environ['DB_USER']
-    db_password = os.environ['DB_PASSWORD']
-    db_port = os.environ.get('DB_PORT', 5432)
+    # Optional forecast=N: projections of the category for the next N months, read from the nightly forecast cache
+    try:
+        forecast_months = forecasting.parse_months(event["queryStringParameters"].get("forecast", None))
+    except ValueError:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': f'forecast must be between 1 and {forecasting.FORECAST_HORIZON}'}),
+            'headers': {
+                'Content-Type': 'application/json'
+            }
+        }
 
     try:
         # Connect to the database
-        conn = psycopg2.connect(
-            host=db_host,
-            database=db_name,
-            user=db_user,
-            password=db_password,
-            port=db_port
-        )
+        conn = connect()
         cursor = conn.cursor()
 
         # Base SQL query
@@ -62,32 +89,29 @@ def lambda_handler(event, context):
             month = current_date.month
             year = current_date.year
 
-            print(month)
-
             cursor.execute(sql_query , (org_id,month,year))
 
         else:
+            # Read the rollup of the requested grain (one row per month, quarter or year) instead of raw scores
             sql_query = """
-                SELECT month, year, score,category
-                FROM public."historical_risk_score"
-                WHERE organization_id = %s and category = %s
+                SELECT EXTRACT(MONTH FROM period_start)::int, EXTRACT(YEAR FROM period_start)::int,
+                    ROUND(score_avg)::int, category
+                FROM public.historical_risk_score_rollup
+                WHERE organization_id = %s and category = %s and grain = %s
             """
+            parameters = [org_id, category, grain]
 
             # Add date range condition based on period
-            if period == 1:
-                start_date = datetime.utcnow() - timedelta(days=365)  # 1 year
-                sql_query += " AND created_on >= %s " 
-                cursor.execute(sql_query, (org_id,category, start_date))
-            elif period == 3:
-                start_date = datetime.utcnow() - timedelta(days=3 * 365)  # 3 years
-                sql_query += " AND created_on >= %s " 
-                cursor.execute(sql_query, (org_id,category, start_date))
-            else:
-                # No date filter if period is 0
-                cursor.execute(sql_query , (org_id,category))
+            start_date = score_rollups.period_start(period, grain, datetime.utcnow())
+            if start_date:
+                sql_query += " AND period_start >= %s "
+                parameters.append(start_date)
+
+            cursor.execute(sql_query + " ORDER BY period_start", parameters)
 
         # Fetch results
         records = cursor.fetchall()
+        record_rows(len(records))
 
         # Convert results to JSON format
         response = {
@@ -102,13 +126,22 @@ def lambda_handler(event, context):
             ]
         }
 
-        return {
-            "statusCode": 200,
-            "body": response,
-            'headers': {
-                'Content-Type': 'application/json'
-            }
-        }
+        # Quarter and year points are labelled by their period rather than by the month they start in
+        if grouping != "YES" and grain != "month":
+            for point, record in zip(response["historical-risk-scores"], records):
+                del point["month"]
+                if grain == "quarter":
+                    point["quarter"] = f"Q{(record[0] - 1) // 3 + 1}"
+
+        if forecast_months and grouping != "YES":
+            response["forecast"] = [
+                dict(point, month=calendar.month_abbr[point["month"]], category=category)
+                for point in forecasting.read_forecast(cursor, org_id, category, forecast_months)
+            ]
+
+        # Full histories of many categories can outgrow the Lambda payload limit; those are served from S3.
+        # The body stays an object, as this function has always returned it
+        return json_response(response, encode_body=False)
 
     except psycopg2.Error as e:
         return {
@@ -1,7 +1,9 @@
 import json
-import os
 import psycopg2
+from common.db import connect
+from common.invocation import invocation, record_rows
 
+@invocation("get_mitigation_actions")
 def lambda_handler(event, context):
     try:  
         org_id = event['pathParameters'].get('orgId', None)
@@ -26,22 +28,9 @@ def lambda_handler(event, context):
 
     cursor = None
 
-    # Retrieve the fundamentl environment variables
-    db_host = os.environ['DB_HOST']
-    db_name = os.environ['DB_NAME']
-    db_user = os.environ['DB_USER']
-    db_password = os.environ['DB_PASSWORD']
-    db_port = os.environ.get('DB_PORT', 5432)
-
     try:
         # Connect to the database
-        conn = psycopg2.connect(
-            host=db_host,
-            database=db_name,
-            user=db_user,
-            password=db_password,
-            port=db_port
-        )
+        conn = connect()
 
         cursor = conn.cursor()
 
@@ -76,6 +65,7 @@ def lambda_handler(event, context):
         
 
         records = cursor.fetchall()
+        record_rows(len(records))
 
         response = {
             "mitigation-strategy": "---",
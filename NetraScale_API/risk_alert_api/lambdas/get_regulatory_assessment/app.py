@@ -1,7 +1,11 @@
 import json
-import os
 import psycopg2
+from common.db import connect
+from common.invocation import invocation, record_rows
+from common.metrics import phase
+from common import regulation_index
 
+@invocation("get_regulatory_assessment")
 def lambda_handler(event, context):
     try:  
         org_id = event['pathParameters'].get('orgId', None)
@@ -54,36 +58,22 @@ def lambda_handler(event, context):
         }
     }
 
-    # Database connection parameters
-    db_host = os.environ['DB_HOST']
-    db_name = os.environ['DB_NAME']
-    db_user = os.environ['DB_USER']
-    db_password = os.environ['DB_PASSWORD']
-    db_port = os.environ.get('DB_PORT', 3306)
-
     conn = None  # Initialize conn before the try block
 
     # Connect to PostgreSQL database
     try:
-        conn = psycopg2.connect(
-            host=db_host,
-            database=db_name,
-            user=db_user,
-            password=db_password,
-            port=db_port
-        )
+        conn = connect()
 
         # While we will "never" have these many regulations, this creates the generic cap for the query
         row_limit = 500
-
-    
+        version = None
 
         if focus == "RISKALERTS":
             # set the limit for risk alert results
             row_limit = 5
 
-            # Retrieve country and sector from database
-            query = "SELECT industry, region FROM public.\"Organization\" where id=%s;"
+            # Retrieve country and sector from database, with the version of the regulation index
+            query = "SELECT industry, region, " + regulation_index.VERSION_COLUMN + " FROM public.\"Organization\" where id=%s;"
             params = [org_id]
 
             with conn.cursor() as cursor:
@@ -93,34 +83,14 @@ def lambda_handler(event, context):
                 if records:
                     sector = records[0]
                     country = records[1]
+                    version = records[2]
 
                     country = country.upper()
                     sector = sector.upper()
 
-        # Build the basic query to obtain regulations
-        query = "SELECT regulation,penalty,sector,comments FROM security_regulations WHERE attack_type = %s  "
-        params = [category]
-
-        
-        # Add optional filters
-        if country and country != "ALL":
-            query += " AND country = %s"
-            params.append(country)
-        if sector and sector != "ALL":
-            query += " AND (sector = %s OR sector = 'ALL')"
-            params.append(sector)
-        if region:
-            query += " AND region = %s"
-            params.append(region)
-
-        # Add the row limit to the query
-        query += " LIMIT %s;"
-        params.append(row_limit)
-
-        # Execute the query
-        with conn.cursor() as cursor:
-            cursor.execute(query, params)
-            records = cursor.fetchall()
+        # Filter the regulations in memory; security_regulations is only read when it changed
+        records = regulation_index.load(conn, version).assessment(category, country, sector, region, row_limit)
+        record_rows(len(records))
 
         # Populate the JSON response based on the query results
         for result in records:
@@ -138,14 +108,15 @@ def lambda_handler(event, context):
         }
     finally:    
         if conn:
-            cursor.close()
-            conn.close()        
-        
-        return {
-            'statusCode': 200,
-            'body': json.dumps(response),
-            'headers': {
-                'Content-Type': 'application/json'
-            }
-        }
+            conn.close()
 
+    with phase("serialize"):
+        serialized = json.dumps(response)
+
+    return {
+        'statusCode': 200,
+        'body': serialized,
+        'headers': {
+            'Content-Type': 'application/json'
+        }
+    }
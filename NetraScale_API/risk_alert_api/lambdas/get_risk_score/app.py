@@ -1,8 +1,13 @@
 import json
-import os
 import psycopg2
 from datetime import datetime
+from common.db import connect
+from common.invocation import invocation, record_rows
+from common.metrics import phase
+from common.batch import batch_request, group_by_org
+from common.peer_percentiles import distribution_join, percentile_rank
 
+@invocation("get_risk_score")
 def lambda_handler(event, context):
     try:
         #org_id = event['orgId']        
@@ -16,18 +21,25 @@ def lambda_handler(event, context):
             }
         }
 
+    # categories=A,B,C answers every category of the org in one query
+    try:
+        batch = batch_request(event)
+    except ValueError as e:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': str(e)}),
+            'headers': {
+                'Content-Type': 'application/json'
+            }
+        }
+    if batch:
+        return batch_scores(*batch)
+
     # TODO: Perform validate of the category here
     category = event["queryStringParameters"].get("category", None)
     category = category.upper()
 
 
-    # Retrieve the fundamentl environment variables
-    db_host = os.environ['DB_HOST']
-    db_name = os.environ['DB_NAME']
-    db_user = os.environ['DB_USER']
-    db_password = os.environ['DB_PASSWORD']
-    db_port = os.environ.get('DB_PORT', 5432)
-
     # Establish basic variables for SQLcalls
     current_date = datetime.utcnow()
     month = current_date.month
@@ -35,40 +47,38 @@ def lambda_handler(event, context):
     author = "system"
     
     risk_score = None
+    peer_percentile = None
 
     # Store the risk score in the historical table.
     try:
         # Connect to the database
-        conn = psycopg2.connect(
-            host=db_host,
-            database=db_name,
-            user=db_user,
-            password=db_password,
-            port=db_port
-        )
+        conn = connect()
 
         cursor = conn.cursor()
 
-        # Ensure the organization exists
-        cursor.execute("SELECT id FROM public.\"Organization\" WHERE id = %s", (org_id,))
-        if not cursor.fetchone():
-            return {
-                "statusCode": 400,
-                "body": f"Organization with ID {org_id} does not exist."
-            }
-
-        # Check if a record already exists for this organization, month, and year
+        # Ensure the organization exists and fetch the score for this month and year, with the
+        # peer distribution of its sector, in one query
         cursor.execute(
             """
-            SELECT id,score FROM historical_risk_score
-            WHERE organization_id = %s AND month = %s AND year = %s AND category = %s
+            SELECT o.id, s.score, peer.quantiles FROM public.\"Organization\" o
+            LEFT JOIN historical_risk_score s
+                ON s.organization_id = o.id AND s.month = %s AND s.year = %s AND s.category = %s
+            """ + distribution_join() + """
+            WHERE o.id = %s
             """,
-            (org_id, month, year,category)
+            (month, year, category, "risk_score", category, org_id)
         )
         existing_record = cursor.fetchone()
+        if not existing_record:
+            return {
+                "statusCode": 400,
+                "body": f"Organization with ID {org_id} does not exist."
+            }
+        record_rows(1 if existing_record[1] is not None else 0)
 
         if existing_record:
            risk_score = existing_record[1]
+           peer_percentile = percentile_rank(existing_record[2], risk_score)
         
             
     except psycopg2.Error as e:
@@ -85,12 +95,71 @@ def lambda_handler(event, context):
 
     # Return the risk score to the client
     response = {
-        "risk-score": risk_score
+        "risk-score": risk_score,
+        # Share of organizations in the same sector (and region) with a score at or below this one
+        "peer-percentile": peer_percentile
     }
     
+    with phase("serialize"):
+        serialized = json.dumps(response)
+
+    return {
+        'statusCode': 200,
+        'body': serialized,
+        'headers': {
+            'Content-Type': 'application/json'
+        }
+    }
+
+
+def batch_scores(org_ids, categories):
+    current_date = datetime.utcnow()
+    cursor = None
+    conn = None
+    try:
+        conn = connect()
+        cursor = conn.cursor()
+
+        # Every organization is checked once; organizations without a score this month come back with a NULL category
+        cursor.execute(
+            """
+            SELECT o.id, s.category, s.score, peer.quantiles FROM public.\"Organization\" o
+            LEFT JOIN historical_risk_score s
+                ON s.organization_id = o.id AND s.month = %s AND s.year = %s AND s.category = ANY(%s)
+            """ + distribution_join("s.category") + """
+            WHERE o.id IN %s
+            """,
+            (current_date.month, current_date.year, categories, "risk_score", tuple(org_ids))
+        )
+        records = cursor.fetchall()
+    except psycopg2.Error as e:
+        return {
+            "statusCode": 500,
+            "body": f"Database error: {str(e)}"
+        }
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+    scores, missing = group_by_org(records, org_ids, categories, lambda record: {
+        "risk-score": record[2] if record else None,
+        "peer-percentile": percentile_rank(record[3], record[2]) if record else None,
+    })
+    if missing:
+        return {
+            "statusCode": 400,
+            "body": f"Organizations with IDs {', '.join(map(str, missing))} do not exist."
+        }
+    record_rows(sum(1 for record in records if record[1] is not None))
+
+    with phase("serialize"):
+        serialized = json.dumps({"risk-scores": scores})
+
     return {
         'statusCode': 200,
-        'body': json.dumps(response),
+        'body': serialized,
         'headers': {
             'Content-Type': 'application/json'
         }
@@ -1,7 +1,10 @@
 import json
 import psycopg2
-import os
+from common.db import connect
+from common.invocation import invocation, record_rows
+from common.metrics import phase
 
+@invocation("get_threat_attacks")
 def lambda_handler(event, context):
     try:  
         org_id = event['pathParameters'].get('orgId', None)
@@ -32,36 +35,49 @@ def lambda_handler(event, context):
 
     # the maximum number of results to return from the database for the invocation
     result_limit = event["queryStringParameters"].get("limit", 5)
+    try:
+        result_limit = int(result_limit)
+        if result_limit < 1:
+            raise ValueError
+    except (TypeError, ValueError):
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': 'limit must be a positive integer'}),
+            'headers': {
+                'Content-Type': 'application/json'
+            }
+        }
+
+    # "similar" ranks the victims by similarity to the organization instead of by size
+    mode = event["queryStringParameters"].get("mode", "largest")
+    if mode not in ("largest", "similar"):
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': 'mode must be "largest" or "similar"'}),
+            'headers': {
+                'Content-Type': 'application/json'
+            }
+        }
 
     cursor = None
     conn = None
-    # Retrieve the fundamentl environment variables
-    db_host = os.environ['DB_HOST']
-    db_name = os.environ['DB_NAME']
-    db_user = os.environ['DB_USER']
-    db_password = os.environ['DB_PASSWORD']
-    db_port = os.environ.get('DB_PORT', 5432)
-
     try:
         # Connect to the database
-        conn = psycopg2.connect(
-            host=db_host,
-            database=db_name,
-            user=db_user,
-            password=db_password,
-            port=db_port
-        )
+        conn = connect()
 
         cursor = conn.cursor()
 
+        if mode == "similar":
+            return similar_attacks(conn, cursor, org_id, category, result_limit, event["queryStringParameters"])
 
         # Fetch min(year) and max(year) for the category to build period
-        cursor.execute("""
-            SELECT MIN(year), MAX(year)
-            FROM common_attack_data
-            WHERE category = %s
-        """, (category,))
-        min_year, max_year = cursor.fetchone()
+        with phase("query_period"):
+            cursor.execute("""
+                SELECT MIN(year), MAX(year)
+                FROM common_attack_data
+                WHERE category = %s
+            """, (category,))
+            min_year, max_year = cursor.fetchone()
         if not min_year or not max_year:
             # No records found for this category
             return {
@@ -72,39 +88,41 @@ def lambda_handler(event, context):
         period = f"{min_year} - {max_year}"
 
 
-        cursor.execute("""
-            SELECT year,target,industry,number_employees,market_cap,
-                       location,ransom_cost,ransom_paid,source_article_url,
-                       revenue,employees_range_min,employees_range_max
-            FROM common_attack_data                       
-            WHERE
-                category = %s 
-            ORDER BY 
-                market_cap DESC NULLS LAST,
-                revenue DESC NULLS LAST,
-                year DESC
-            LIMIT %s;
-        """, (category, result_limit))
-
-        records = cursor.fetchall()
-
-
-        response = {
-            "period":period,
-            "threat-attacks": [
-                {
-                    "index":idx+1,
-                    "year":record[0],
-                    "target":record[1],
-                    "industry":record[2],
-                    "location":record[5],
-                    "revenue":record[9],
-                    "marketCap":record[4],
-                    "link":record[8]	
-                }
-                for idx, record in enumerate(records)
-            ]
-        }
+        with phase("query_attacks"):
+            cursor.execute("""
+                SELECT year,target,industry,number_employees,market_cap,
+                           location,ransom_cost,ransom_paid,source_article_url,
+                           revenue,employees_range_min,employees_range_max
+                FROM common_attack_data                       
+                WHERE
+                    category = %s 
+                ORDER BY 
+                    market_cap DESC NULLS LAST,
+                    revenue DESC NULLS LAST,
+                    year DESC
+                LIMIT %s;
+            """, (category, result_limit))
+
+            records = cursor.fetchall()
+        record_rows(len(records))
+
+        with phase("map_rows"):
+            response = {
+                "period":period,
+                "threat-attacks": [
+                    {
+                        "index":idx+1,
+                        "year":record[0],
+                        "target":record[1],
+                        "industry":record[2],
+                        "location":record[5],
+                        "revenue":record[9],
+                        "marketCap":record[4],
+                        "link":record[8]	
+                    }
+                    for idx, record in enumerate(records)
+                ]
+            }
 
 
         return {
@@ -129,4 +147,61 @@ def lambda_handler(event, context):
 
 
     
- 
\ No newline at end of file
+ 
+
+def similar_attacks(conn, cursor, org_id, category, result_limit, parameters):
+    # Imported here so that the default mode does not pay for loading numpy on a cold start
+    from common import attack_similarity
+
+    # The org's industry and region come from its profile; revenue, employees and location may be supplied
+    with phase("query_profile"):
+        cursor.execute("""
+            SELECT industry, region FROM public."Organization" WHERE id = %s
+        """, (org_id,))
+        profile = cursor.fetchone()
+    if not profile:
+        return {
+            "statusCode": 400,
+            "body": f"Organization with ID {org_id} does not exist."
+        }
+
+    # The category's feature matrix is loaded once per container (see common/attack_similarity.py)
+    with phase("load_matrix"):
+        matrix = attack_similarity.load(conn, category)
+
+    with phase("rank"):
+        matches = matrix.nearest(
+            result_limit,
+            revenue=parameters.get("revenue"),
+            employees=parameters.get("employees"),
+            industry=profile[0],
+            location=parameters.get("location") or profile[1]
+        )
+    record_rows(len(matches))
+
+    min_year, max_year = matrix.period
+    response = {
+        "period": f"{min_year} - {max_year}" if min_year else None,
+        "threat-attacks": [
+            {
+                "index":idx+1,
+                "year":record[0],
+                "target":record[1],
+                "industry":record[2],
+                "location":record[5],
+                "revenue":record[9],
+                "marketCap":record[4],
+                "link":record[8],
+                "similarity":round(1 / (1 + distance), 3)
+            }
+            for idx, (record, distance) in enumerate(matches)
+        ]
+    }
+
+    return {
+        "statusCode": 200,
+        "body": response,
+        'headers': {
+            'Content-Type': 'application/json'
+        }
+    }
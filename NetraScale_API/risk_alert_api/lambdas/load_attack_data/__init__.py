@@ -0,0 +1 @@
+# intentionally left blank
@@ -0,0 +1,120 @@
+import json
+import os
+import tempfile
+from urllib.parse import unquote_plus
+
+import psycopg2
+from common.db import connect
+from common.invocation import invocation, record_rows
+from common import attack_data_loader
+
+
+class DownloadError(Exception):
+    """
+    DownloadError is raised when a feed file cannot be fetched from S3; the
+    botocore error is chained as its cause.
+    """
+
+
+def _download(records, directory):
+    # Objects are laid out as <dataset>/<feed>/<file>; boto3 is only imported for S3 triggered loads
+    import boto3
+    from botocore.exceptions import BotoCoreError, ClientError
+
+    client = boto3.client("s3")
+    loads = {}
+    for record in records:
+        bucket = record["s3"]["bucket"]["name"]
+        key = unquote_plus(record["s3"]["object"]["key"])
+        dataset, feed, name = key.split("/", 2)
+        path = os.path.join(directory, f"{len(loads)}-{os.path.basename(name)}")
+        try:
+            client.download_file(bucket, key, path)
+        except (BotoCoreError, ClientError) as e:
+            raise DownloadError(f"Feed file s3://{bucket}/{key} could not be downloaded: {e}") from e
+        loads.setdefault((dataset, feed), []).append(path)
+    return loads
+
+
+@invocation("load_attack_data")
+def lambda_handler(event, context):
+    # Triggered by feed files landing in the attack data bucket (S3), or invoked directly with
+    # {"dataset": ..., "paths": [...], "feed": ..., "full": false}
+    event = event or {}
+    records = event.get("Records") or []
+    try:
+        keys = [unquote_plus(record["s3"]["object"]["key"]).split("/", 2) for record in records]
+        if any(len(key) < 3 for key in keys):
+            raise ValueError("feed files are expected at <dataset>/<feed>/<file>")
+        datasets = {key[0] for key in keys} or {event["dataset"]}
+    except (KeyError, TypeError, ValueError) as e:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': f'Invalid load request: {e}'}),
+            'headers': {
+                'Content-Type': 'application/json'
+            }
+        }
+    unknown = sorted(datasets - set(attack_data_loader.DATASETS))
+    if unknown:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': f'Unknown dataset: {", ".join(unknown)}'}),
+            'headers': {
+                'Content-Type': 'application/json'
+            }
+        }
+
+    conn = None
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            if records:
+                loads = _download(records, directory)
+            else:
+                loads = {(event["dataset"], event.get("feed")): list(event.get("paths") or [])}
+            conn = connect()
+            summary = [
+                attack_data_loader.load(conn, dataset, paths, feed=feed, full=bool(event.get("full")))
+                for (dataset, feed), paths in loads.items()
+            ]
+            record_rows(sum(result["changed"] for result in summary))
+        except psycopg2.Error as e:
+            if conn:
+                conn.rollback()
+            return {
+                'statusCode': 500,
+                'body': json.dumps({'error': f'Database error: {str(e)}'}),
+                'headers': {
+                    'Content-Type': 'application/json'
+                }
+            }
+        except attack_data_loader.FeedError as e:
+            # The chunks written before the unreadable file stay loaded; the watermark does not move
+            if conn:
+                conn.rollback()
+            return {
+                'statusCode': 400,
+                'body': json.dumps({'error': str(e)}),
+                'headers': {
+                    'Content-Type': 'application/json'
+                }
+            }
+        except DownloadError as e:
+            return {
+                'statusCode': 500,
+                'body': json.dumps({'error': str(e)}),
+                'headers': {
+                    'Content-Type': 'application/json'
+                }
+            }
+        finally:
+            if conn:
+                conn.close()
+
+    return {
+        'statusCode': 200,
+        'body': json.dumps({"loads": summary}),
+        'headers': {
+            'Content-Type': 'application/json'
+        }
+    }
@@ -0,0 +1,50 @@
+import json
+import psycopg2
+from common.db import connect
+from common.invocation import invocation, record_rows
+from common import partitions
+
+@invocation("maintain_partitions")
+def lambda_handler(event, context):
+    # Invoked daily (EventBridge); creates upcoming partitions and archives the expired ones
+    event = event or {}
+    tables = event.get("tables")
+    unknown = [table for table in tables or [] if table not in partitions.POLICIES]
+    if unknown:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': f'Not a partitioned table: {", ".join(unknown)}'}),
+            'headers': {
+                'Content-Type': 'application/json'
+            }
+        }
+
+    conn = None
+    try:
+        conn = connect()
+        summary = partitions.run(conn, dry_run=bool(event.get("dry_run")), tables=tables)
+        record_rows(sum(
+            len(result["created"]) + len(result["archived"]) + len(result["detached"])
+            for result in summary["tables"].values() if result
+        ))
+    except psycopg2.Error as e:
+        if conn:
+            conn.rollback()
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': f'Database error: {str(e)}'}),
+            'headers': {
+                'Content-Type': 'application/json'
+            }
+        }
+    finally:
+        if conn:
+            conn.close()
+
+    return {
+        'statusCode': 200,
+        'body': json.dumps(summary),
+        'headers': {
+            'Content-Type': 'application/json'
+        }
+    }
@@ -1,34 +1,27 @@
 import json
-import os
 import psycopg2
-import logging
+from common.logger import get_logger
+from common.db import connect
+from common.invocation import invocation, record_rows
+from common.metrics import phase
 
 # Configure logger
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+logger = get_logger()
 
+@invocation("update_mitigation_actions_status")
 def lambda_handler(event, context):
-    # Log the entire event for debugging
-    logger.info(f"Received event: {json.dumps(event)}")
-    
     try:
         # Get org_id from path parameters
         # org_id = event['pathParameters'].get('orgId', None)
         # logger.info(f"Organization ID: {org_id}")
         
-        # Log request headers
-        if 'headers' in event:
-            logger.info(f"Request headers: {json.dumps(event['headers'])}")
-        
         # Parse request body
         body = json.loads(event['body'])
-        logger.info(f"Request body: {json.dumps(body)}")
         
         action_ids = body.get('ids', [])
         new_status = body.get('status')
         
-        logger.info(f"Action IDs to update: {action_ids}")
-        logger.info(f"New status to set: {new_status}")
+        logger.debug("Updating actions %s to status %s", action_ids, new_status)
         
         # Validate required parameters
         if not action_ids or not new_status:
@@ -61,43 +54,30 @@ def lambda_handler(event, context):
                 }
             }
             
-        # Database connection
-        db_host = os.environ['DB_HOST']
-        db_name = os.environ['DB_NAME']
-        db_user = os.environ['DB_USER']
-        db_password = os.environ['DB_PASSWORD']
-        db_port = os.environ.get('DB_PORT', 5432)
-        
-        logger.info(f"Connecting to database: {db_host}/{db_name}")
         
         conn = None
         cursor = None
         
         try:
             # Connect to the database
-            conn = psycopg2.connect(
-                host=db_host,
-                database=db_name,
-                user=db_user,
-                password=db_password,
-                port=db_port
-            )
+            conn = connect()
             
             cursor = conn.cursor()
             
-            # Update multiple action statuses
+            # Update all of the action statuses with a single statement
+            cursor.execute("""
+                UPDATE general_threat_mitigation_activities
+                SET tactic_state = %s
+                WHERE id IN %s
+                RETURNING id, problem_domain, mitigation_action, priority, category, tactic_state
+            """, (new_status, tuple(action_ids)))
+
+            updated_records = {str(record[0]): record for record in cursor.fetchall()}
+
+            # Report the actions in the order they were requested
             updated_actions = []
             for action_id in action_ids:
-                logger.info(f"Updating action ID: {action_id} to status: {new_status}")
-                
-                cursor.execute("""
-                    UPDATE general_threat_mitigation_activities
-                    SET tactic_state = %s
-                    WHERE id = %s
-                    RETURNING id, problem_domain, mitigation_action, priority, category, tactic_state
-                """, (new_status, action_id))
-                
-                updated_record = cursor.fetchone()
+                updated_record = updated_records.pop(str(action_id), None)
                 if updated_record:
                     action_data = {
                         'id': updated_record[0],
@@ -108,12 +88,11 @@ def lambda_handler(event, context):
                         'state': updated_record[5]
                     }
                     updated_actions.append(action_data)
-                    logger.info(f"Successfully updated action: {json.dumps(action_data)}")
                 else:
                     logger.warning(f"Action ID {action_id} not found in database")
             
             conn.commit()
-            logger.info(f"Database transaction committed. Updated {len(updated_actions)} actions.")
+            record_rows(len(updated_actions))
             
             # Format the response
             response = {
@@ -122,11 +101,12 @@ def lambda_handler(event, context):
                 'actions': updated_actions
             }
             
-            logger.info(f"Sending response: {json.dumps(response)}")
-            
+            with phase("serialize"):
+                serialized = json.dumps(response)
+
             return {
                 'statusCode': 200,
-                'body': json.dumps(response),
+                'body': serialized,
                 'headers': {
                     'Content-Type': 'application/json',
                     'Access-Control-Allow-Origin': '*',
@@ -155,7 +135,6 @@ def lambda_handler(event, context):
                 cursor.close()
             if conn:
                 conn.close()
-            logger.info("Database connection closed")
                 
     except Exception as e:
         error_msg = f"Server error: {str(e)}"
@@ -0,0 +1,51 @@
+"""
+compute_risk_scores runs the batch risk scoring job (common/risk_scoring.py)
+from the command line, against the database configured by the DB_* variables.
+The same job runs on a schedule as the compute_risk_scores Lambda.
+
+Example:
+    $ cd NetraScale_API
+    $ python scripts/compute_risk_scores.py                           # current month
+    $ python scripts/compute_risk_scores.py --year 2024 --month 6 --dry-run
+    $ python scripts/compute_risk_scores.py --rebuild-rollups             # backfill the rollups and severity cube
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from common import risk_scoring, score_rollups, severity_cube
+from common.db import connect
+
+
+def main(argv=None):
+    today = datetime.utcnow()
+    parser = argparse.ArgumentParser(description="Score every organization and upsert the results")
+    parser.add_argument("--year", type=int, default=today.year, help="Score year (default: current year)")
+    parser.add_argument("--month", type=int, choices=range(1, 13), default=today.month,
+                        help="Score month (default: current month)")
+    parser.add_argument("--dry-run", action="store_true", help="Compute the scores without writing them")
+    parser.add_argument("--rebuild-rollups", action="store_true",
+                        help="Only rebuild the rollups and the severity cube from the full score history")
+    args = parser.parse_args(argv)
+
+    conn = connect()
+    try:
+        if args.rebuild_rollups:
+            summary = {"rollup_rows": score_rollups.rebuild(conn), "severity_cube_rows": severity_cube.rebuild(conn)}
+        else:
+            summary = risk_scoring.run(conn, args.year, args.month, dry_run=args.dry_run)
+    finally:
+        conn.close()
+
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
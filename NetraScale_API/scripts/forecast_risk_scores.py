@@ -0,0 +1,38 @@
+"""
+forecast_risk_scores runs the nightly forecasting job (common/forecasting.py)
+from the command line, against the database configured by the DB_* variables.
+The same job runs on a schedule as the forecast_risk_scores Lambda.
+
+Example:
+    $ cd NetraScale_API
+    $ python scripts/forecast_risk_scores.py
+"""
+import argparse
+import json
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from common import forecasting
+from common.db import connect
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Forecast every risk score series and cache the projections")
+    parser.parse_args(argv)
+
+    conn = connect()
+    try:
+        summary = forecasting.run(conn)
+    finally:
+        conn.close()
+
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""
+ingest_news loads news articles (common/news_ingestion.py) from files, against
+the database configured by the DB_* variables. A file holds a JSON list of
+articles or one article per line (NDJSON); a directory stands in for the news
+queue and has every *.json / *.jsonl / *.ndjson file in it loaded, oldest first.
+
+Example:
+    $ cd NetraScale_API
+    $ python scripts/ingest_news.py feeds/2024-06-01.jsonl
+    $ python scripts/ingest_news.py spool/ --no-refresh
+"""
+import argparse
+import json
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from common import news_ingestion
+from common.db import connect
+
+EXTENSIONS = (".json", ".jsonl", ".ndjson")
+
+
+def list_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            entries = [os.path.join(path, name) for name in os.listdir(path) if name.endswith(EXTENSIONS)]
+            yield from sorted(entries, key=os.path.getmtime)
+        else:
+            yield path
+
+
+def read_articles(files):
+    # Streams the articles, so a large file is never held in memory as a whole
+    for path in files:
+        with open(path, encoding="utf-8") as handle:
+            if path.endswith(".json"):
+                yield from json.load(handle)
+            else:
+                for line in handle:
+                    if line.strip():
+                        yield json.loads(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load news articles into news_feed, dropping duplicates")
+    parser.add_argument("paths", nargs="+", help="Article files, or directories of them")
+    parser.add_argument("--no-refresh", action="store_true", help="Do not refresh the feed's top stories")
+    args = parser.parse_args(argv)
+
+    conn = connect()
+    try:
+        summary = news_ingestion.ingest(conn, read_articles(list_files(args.paths)), refresh=not args.no_refresh)
+    finally:
+        conn.close()
+
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+load_attack_data loads attack or incident feed files (common/attack_data_loader.py)
+into common_attack_data / security_incident, against the database configured by
+the DB_* variables. Only records changed since the feed's watermark are read,
+unless --full is given; a directory has every *.csv / *.json / *.jsonl file in
+it loaded, oldest first.
+
+Example:
+    $ cd NetraScale_API
+    $ python scripts/load_attack_data.py common_attack_data feeds/ransomware_tracker/ --feed ransomware_tracker
+    $ python scripts/load_attack_data.py security_incident incidents.csv --full
+"""
+import argparse
+import json
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from common import attack_data_loader
+from common.db import connect
+
+EXTENSIONS = (".csv", ".json", ".jsonl", ".ndjson")
+
+
+def list_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            entries = [os.path.join(path, name) for name in os.listdir(path) if name.endswith(EXTENSIONS)]
+            yield from sorted(entries, key=os.path.getmtime)
+        else:
+            yield path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load attack / incident feed files incrementally")
+    parser.add_argument("dataset", choices=sorted(attack_data_loader.DATASETS))
+    parser.add_argument("paths", nargs="+", help="Feed files, or directories of them")
+    parser.add_argument("--feed", help="Name of the feed, which keeps its own watermark (default: the dataset)")
+    parser.add_argument("--full", action="store_true", help="Ignore the watermark and load every record")
+    args = parser.parse_args(argv)
+
+    conn = connect()
+    try:
+        summary = attack_data_loader.load(conn, args.dataset, list(list_files(args.paths)), feed=args.feed, full=args.full)
+    except attack_data_loader.FeedError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        conn.close()
+
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+"""
+local_harness invokes a Lambda handler locally (against the database configured
+through the DB_* environment variables) and reports the same per-phase timings
+that are published to CloudWatch as Embedded Metric Format.
+
+Example:
+    $ cd NetraScale_API
+    $ python scripts/local_harness.py risk_alert_api/get_threat_attacks \\
+        --path orgId=42 --query category=RANSOMWARE --iterations 20
+"""
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import sys
+import uuid
+
+# NetraScale_API/ is the root of the deployment package, so "common" must be importable from it
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from common import metrics, slow_queries
+
+# Maximum statements per invocation for each function, checked with --check-budget
+QUERY_BUDGETS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "query_budgets.json")
+
+
+class LocalContext:
+    """
+    A minimal stand-in for the Lambda context object.
+    """
+
+    def __init__(self, function_name):
+        self.function_name = function_name
+        self.aws_request_id = str(uuid.uuid4())
+
+
+def find_handler_file(function_dir):
+    """
+    find_handler_file mirrors the deployment workflow: app.py first, otherwise
+    the first Python file defining lambda_handler.
+    """
+    app_file = os.path.join(function_dir, "app.py")
+    if os.path.isfile(app_file):
+        return app_file
+
+    for name in sorted(os.listdir(function_dir)):
+        path = os.path.join(function_dir, name)
+        if name.endswith(".py") and name != "__init__.py":
+            with open(path) as source:
+                if "def lambda_handler" in source.read():
+                    return path
+
+    raise FileNotFoundError(f"No handler file found in {function_dir}")
+
+
+def function_dir(function):
+    """
+    function_dir resolves "<api_category>/<function_name>" to the lambda directory.
+    """
+    api_category, function_name = function.split("/", 1)
+    return os.path.join(PROJECT_ROOT, api_category, "lambdas", function_name)
+
+
+def load_handler(function):
+    """
+    load_handler imports the handler module of "<api_category>/<function_name>"
+    under a unique module name (every function uses app.py).
+    """
+    handler_file = find_handler_file(function_dir(function))
+    module_name = "harness_" + function.replace("/", "_")
+
+    spec = importlib.util.spec_from_file_location(module_name, handler_file)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+
+    return module.lambda_handler
+
+
+def parse_pairs(pairs):
+    values = {}
+    for pair in pairs or []:
+        key, _, value = pair.partition("=")
+        values[key] = value
+    return values
+
+
+def build_event(args):
+    if args.event:
+        with open(args.event) as event_file:
+            return json.load(event_file)
+
+    return {
+        "httpMethod": args.method,
+        "pathParameters": parse_pairs(args.path),
+        "queryStringParameters": parse_pairs(args.query),
+        "headers": {},
+        "body": args.body,
+    }
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(documents):
+    """
+    summarize aggregates the collected metric documents into p50/p95/max per
+    metric, separately for cold and warm invocations.
+    """
+    report = {}
+    for document in documents:
+        start = document["Start"]
+        for definition in document["_aws"]["CloudWatchMetrics"][0]["Metrics"]:
+            name = definition["Name"]
+            report.setdefault(start, {}).setdefault(name, []).append(document[name])
+
+    return {
+        start: {
+            name: {
+                "count": len(values),
+                "p50": round(statistics.median(values), 3),
+                "p95": round(percentile(values, 95), 3),
+                "max": round(max(values), 3),
+            }
+            for name, values in phases.items()
+        }
+        for start, phases in report.items()
+    }
+
+
+def summarize_slow_queries(records):
+    """
+    summarize_slow_queries groups the slow query records by statement fingerprint,
+    matching what is logged (or shipped to S3) from Lambda.
+    """
+    report = {}
+    for record in records:
+        entry = report.setdefault(record["fingerprint"], {
+            "sql": record["sql"],
+            "parameters": record["parameters"],
+            "count": 0,
+            "max_ms": 0,
+            "rows": record["rows"],
+        })
+        entry["count"] += 1
+        entry["max_ms"] = max(entry["max_ms"], record["duration_ms"])
+        if "plan_summary" in record:
+            entry["plan_summary"] = record["plan_summary"]
+
+    return sorted(report.values(), key=lambda entry: entry["max_ms"], reverse=True)
+
+
+def load_budget(function):
+    """
+    load_budget returns the query budget of "<api_category>/<function_name>" from
+    query_budgets.json, or None when the function has no budget.
+    """
+    with open(QUERY_BUDGETS_FILE) as budgets_file:
+        budgets = json.load(budgets_file)
+    return budgets.get(function.split("/", 1)[1])
+
+
+def check_budget(documents, budget):
+    """
+    check_budget returns the invocations whose statement count exceeded budget.
+    """
+    return [
+        {"request_id": document["RequestId"], "queries": document["queries"], "budget": budget}
+        for document in documents
+        if document["queries"] > budget
+    ]
+
+
+def run(function, event, iterations):
+    """
+    run invokes the handler iterations times and returns the responses, the
+    metric documents and the slow query records that were emitted for them.
+    """
+    documents = []
+    slow = []
+    metrics.set_sink(documents.append)
+    slow_queries.set_sink(slow.append)
+
+    try:
+        handler = load_handler(function)
+        function_name = function.split("/", 1)[1]
+        responses = [handler(json.loads(json.dumps(event)), LocalContext(function_name)) for _ in range(iterations)]
+    finally:
+        metrics.set_sink(None)
+        slow_queries.set_sink(None)
+
+    return responses, documents, slow
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Invoke a NetraScale Lambda handler locally and report phase timings")
+    parser.add_argument("function", help="<api_category>/<function_name>, e.g. risk_alert_api/get_risk_score")
+    parser.add_argument("--event", help="Path to a JSON event file (overrides --path/--query/--body)")
+    parser.add_argument("--path", action="append", metavar="KEY=VALUE", help="Path parameter (repeatable)")
+    parser.add_argument("--query", action="append", metavar="KEY=VALUE", help="Query string parameter (repeatable)")
+    parser.add_argument("--body", help="Raw request body")
+    parser.add_argument("--method", default="GET", help="HTTP method placed in the event")
+    parser.add_argument("--iterations", type=int, default=10, help="Number of invocations (the first one is cold)")
+    parser.add_argument("--show-response", action="store_true", help="Print the last response")
+    parser.add_argument("--slow-query-ms", type=float, help="Slow query threshold (defaults to SLOW_QUERY_MS)")
+    parser.add_argument("--explain-sample-rate", type=float,
+                        help="Fraction of slow queries to EXPLAIN (defaults to SLOW_QUERY_EXPLAIN_SAMPLE_RATE)")
+    parser.add_argument("--check-budget", action="store_true",
+                        help="Fail when an invocation runs more statements than its budget in query_budgets.json")
+    parser.add_argument("--max-queries", type=int, help="Fail when an invocation runs more statements than this")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.slow_query_ms is not None:
+        slow_queries.SLOW_QUERY_MS = args.slow_query_ms
+    if args.explain_sample_rate is not None:
+        slow_queries.SLOW_QUERY_EXPLAIN_SAMPLE_RATE = args.explain_sample_rate
+
+    responses, documents, slow = run(args.function, build_event(args), args.iterations)
+
+    if args.show_response:
+        print(json.dumps(responses[-1], indent=2, default=str))
+
+    budget = args.max_queries
+    if budget is None and args.check_budget:
+        budget = load_budget(args.function)
+        if budget is None:
+            print(f"No query budget defined for {args.function} in {QUERY_BUDGETS_FILE}", file=sys.stderr)
+            return 2
+
+    violations = check_budget(documents, budget) if budget is not None else []
+
+    print(json.dumps({
+        "function": args.function,
+        "phases": summarize(documents),
+        "slow_queries": summarize_slow_queries(slow),
+        "query_budget": {"budget": budget, "violations": violations},
+    }, indent=2, default=str))
+
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""
+maintain_partitions runs the partition maintenance job (common/partitions.py)
+from the command line, against the database configured by the DB_* variables.
+The same job runs daily as the maintain_partitions Lambda.
+
+--archive-dir writes the expired partitions to a local directory instead of
+PARTITION_ARCHIVE_BUCKET, to check an archive run before enabling it.
+
+Example:
+    $ cd NetraScale_API
+    $ python scripts/maintain_partitions.py --dry-run
+    $ python scripts/maintain_partitions.py --table news_feed --archive-dir /tmp/archive
+"""
+import argparse
+import json
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from common import partitions
+from common.db import connect
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Create upcoming partitions and archive the expired ones")
+    parser.add_argument("--table", action="append", choices=sorted(partitions.POLICIES),
+                        help="Only maintain this table (repeatable; default: every partitioned table)")
+    parser.add_argument("--dry-run", action="store_true", help="Report the changes without making them")
+    parser.add_argument("--archive-dir", help="Archive to this local directory instead of S3")
+    args = parser.parse_args(argv)
+
+    conn = connect()
+    try:
+        summary = partitions.run(conn, dry_run=args.dry_run, archive_dir=args.archive_dir, tables=args.table)
+    finally:
+        conn.close()
+
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
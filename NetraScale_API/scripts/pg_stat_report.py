@@ -0,0 +1,131 @@
+"""
+pg_stat_report attributes database time recorded in pg_stat_statements to the
+Lambda handler that issued it, using the route tag that common.db appends to
+every statement (see common/sql_comments.py).
+
+pg_stat_statements keeps the text of the first statement seen for each queryid,
+so a statement shared verbatim by two handlers is attributed to one of them.
+
+Example:
+    $ cd NetraScale_API
+    $ python scripts/pg_stat_report.py                      # reads pg_stat_statements via DB_* variables
+    $ python scripts/pg_stat_report.py --csv pg_stat.csv    # reads an export (queryid,calls,total_exec_time,rows,query)
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from common import sql_comments
+
+# total_exec_time was named total_time before PostgreSQL 13
+STATEMENTS_QUERY = """
+    SELECT queryid, calls, {total_column}, rows, query
+    FROM pg_stat_statements
+    WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+"""
+
+
+def read_database():
+    from common.db import connect
+
+    conn = connect()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SHOW server_version_num")
+            total_column = "total_exec_time" if int(cursor.fetchone()[0]) >= 130000 else "total_time"
+            cursor.execute(STATEMENTS_QUERY.format(total_column=total_column))
+            return [
+                {"queryid": row[0], "calls": row[1], "total_ms": float(row[2]), "rows": row[3], "query": row[4]}
+                for row in cursor.fetchall()
+            ]
+    finally:
+        conn.close()
+
+
+def read_csv(path):
+    with open(path, newline="") as export:
+        return [
+            {
+                "queryid": row["queryid"],
+                "calls": int(row["calls"]),
+                "total_ms": float(row.get("total_exec_time") or row.get("total_time") or 0),
+                "rows": int(row.get("rows") or 0),
+                "query": row["query"],
+            }
+            for row in csv.DictReader(export)
+        ]
+
+
+def attribute(statements, top):
+    """
+    attribute groups the statements by route and returns the routes ordered by
+    total database time, with their most expensive statements.
+    """
+    grand_total = sum(statement["total_ms"] for statement in statements) or 1.0
+    routes = {}
+
+    for statement in statements:
+        route = sql_comments.parse(statement["query"]).get("route", "(untagged)")
+        entry = routes.setdefault(route, {"route": route, "calls": 0, "total_ms": 0.0, "rows": 0, "statements": []})
+        entry["calls"] += statement["calls"]
+        entry["total_ms"] += statement["total_ms"]
+        entry["rows"] += statement["rows"]
+        entry["statements"].append(statement)
+
+    report = []
+    for entry in sorted(routes.values(), key=lambda e: e["total_ms"], reverse=True):
+        heaviest = sorted(entry["statements"], key=lambda s: s["total_ms"], reverse=True)[:top]
+        report.append({
+            "route": entry["route"],
+            "calls": entry["calls"],
+            "total_ms": round(entry["total_ms"], 2),
+            "share_percent": round(entry["total_ms"] / grand_total * 100, 2),
+            "mean_ms": round(entry["total_ms"] / entry["calls"], 3) if entry["calls"] else None,
+            "rows": entry["rows"],
+            "top_statements": [
+                {
+                    "queryid": s["queryid"],
+                    "calls": s["calls"],
+                    "total_ms": round(s["total_ms"], 2),
+                    "query": " ".join(s["query"].split())[:200],
+                }
+                for s in heaviest
+            ],
+        })
+
+    return report
+
+
+def print_report(report):
+    print(f"{'route':<40} {'calls':>10} {'total ms':>14} {'share %':>8} {'mean ms':>10}")
+    for entry in report:
+        print(f"{entry['route']:<40} {entry['calls']:>10} {entry['total_ms']:>14.2f} "
+              f"{entry['share_percent']:>8.2f} {entry['mean_ms'] or 0:>10.3f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Attribute pg_stat_statements load to NetraScale handlers")
+    parser.add_argument("--csv", help="Read an exported pg_stat_statements CSV instead of the database")
+    parser.add_argument("--top", type=int, default=3, help="Most expensive statements listed per route (--json)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    statements = read_csv(args.csv) if args.csv else read_database()
+    report = attribute(statements, args.top)
+
+    if args.json:
+        print(json.dumps(report, indent=2, default=str))
+    else:
+        print_report(report)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
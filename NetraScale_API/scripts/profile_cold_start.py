@@ -0,0 +1,179 @@
+"""
+profile_cold_start imports each Lambda handler module in a fresh interpreter
+(with -X importtime) and reports the module-init cost and the heaviest imports
+per function. With a budget it exits non-zero when a handler's cold init is
+over budget, so it can gate the benchmark run.
+
+Example:
+    $ cd NetraScale_API
+    $ python scripts/profile_cold_start.py --budget-ms 300
+    $ python scripts/profile_cold_start.py risk_alert_api/get_risk_score --top 10 --json
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from local_harness import PROJECT_ROOT, find_handler_file, function_dir
+
+# Written to stderr by the child right before the handler import so interpreter start-up imports are excluded
+IMPORT_MARKER = "--- handler import ---"
+
+CHILD_SCRIPT = """
+import importlib.util, json, sys, time
+sys.path.insert(0, {root!r})
+sys.stderr.write({marker!r} + "\\n")
+sys.stderr.flush()
+started = time.perf_counter()
+spec = importlib.util.spec_from_file_location("handler_under_test", {handler!r})
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+print(json.dumps({{"init_ms": (time.perf_counter() - started) * 1000}}))
+"""
+
+
+def discover_functions():
+    """
+    discover_functions lists every "<api_category>/<function_name>" with a handler.
+    """
+    functions = []
+    for path in sorted(glob.glob(os.path.join(PROJECT_ROOT, "*", "lambdas", "*"))):
+        if not os.path.isdir(path):
+            continue
+        try:
+            find_handler_file(path)
+        except FileNotFoundError:
+            continue
+        parts = os.path.relpath(path, PROJECT_ROOT).split(os.sep)
+        functions.append(f"{parts[0]}/{parts[2]}")
+    return functions
+
+
+def parse_importtime(stderr):
+    """
+    parse_importtime extracts (module, self_us, cumulative_us, depth) entries
+    written by -X importtime after the handler import marker.
+    """
+    entries = []
+    lines = stderr.splitlines()
+    if IMPORT_MARKER in lines:
+        lines = lines[lines.index(IMPORT_MARKER) + 1:]
+
+    for line in lines:
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        except ValueError:
+            continue
+        stripped = name.lstrip(" ")
+        depth = (len(name) - len(stripped) - 1) // 2
+        entries.append({
+            "module": stripped.strip(),
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+            "depth": depth,
+        })
+
+    return entries
+
+
+def profile_once(handler_file):
+    """
+    profile_once runs one fresh interpreter and returns (init_ms, entries, error).
+    """
+    script = CHILD_SCRIPT.format(root=PROJECT_ROOT, marker=IMPORT_MARKER, handler=handler_file)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(handler_file),
+    )
+
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed"
+        return None, [], error
+
+    init_ms = json.loads(result.stdout.strip().splitlines()[-1])["init_ms"]
+    return init_ms, parse_importtime(result.stderr), None
+
+
+def profile_function(function, runs, top):
+    """
+    profile_function profiles a handler over several fresh interpreters and keeps
+    the median module-init time and the heaviest top-level imports of the last run.
+    """
+    handler_file = find_handler_file(function_dir(function))
+
+    init_times = []
+    entries = []
+    for _ in range(runs):
+        init_ms, entries, error = profile_once(handler_file)
+        if error:
+            return {"function": function, "error": error}
+        init_times.append(init_ms)
+
+    # Depth 0 entries are imported directly by the handler (or are the first to pull a package in)
+    heaviest = sorted((e for e in entries if e["depth"] == 0), key=lambda e: e["cumulative_us"], reverse=True)
+
+    return {
+        "function": function,
+        "init_ms": round(statistics.median(init_times), 2),
+        "import_ms": round(sum(e["self_us"] for e in entries) / 1000, 2),
+        "modules_imported": len(entries),
+        "heaviest_imports": [
+            {"module": e["module"], "cumulative_ms": round(e["cumulative_us"] / 1000, 2)}
+            for e in heaviest[:top]
+        ],
+    }
+
+
+def print_report(results, budget_ms):
+    for result in results:
+        if "error" in result:
+            print(f"{result['function']}: ERROR {result['error']}")
+            continue
+
+        over = budget_ms is not None and result["init_ms"] > budget_ms
+        flag = "  OVER BUDGET" if over else ""
+        print(f"{result['function']}: init {result['init_ms']} ms, "
+              f"{result['modules_imported']} modules{flag}")
+        for entry in result["heaviest_imports"]:
+            print(f"    {entry['cumulative_ms']:>9.2f} ms  {entry['module']}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Profile cold import/init cost of each Lambda handler")
+    parser.add_argument("functions", nargs="*", help="<api_category>/<function_name> (default: all functions)")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per function (median is reported)")
+    parser.add_argument("--top", type=int, default=5, help="Number of heaviest imports to report per function")
+    parser.add_argument("--budget-ms", type=float, help="Fail when a handler's cold init exceeds this many ms")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    functions = args.functions or discover_functions()
+    results = [profile_function(function, args.runs, args.top) for function in functions]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results, args.budget_ms)
+
+    if any("error" in result for result in results):
+        return 2
+
+    if args.budget_ms is not None and any(result["init_ms"] > args.budget_ms for result in results):
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+"""
+rank_news_feed recomputes the precomputed top stories of every organization
+segment (common/news_ranking.py), against the database configured by the DB_*
+variables. News ingestion only refreshes the segments of the stories it
+wrote; this also drops the stories that have left the window elsewhere.
+
+Example:
+    $ cd NetraScale_API
+    $ python scripts/rank_news_feed.py
+"""
+import argparse
+import json
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from common import news_ranking
+from common.db import connect
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recompute the top news stories of every organization segment")
+    parser.parse_args(argv)
+
+    conn = connect()
+    try:
+        written = news_ranking.refresh(conn)
+    finally:
+        conn.close()
+
+    print(json.dumps({"stories": written}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
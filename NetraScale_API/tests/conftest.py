@@ -0,0 +1,150 @@
+import os
+import re
+import sys
+
+import pytest
+
+# NetraScale_API/ is the root of the deployment package, so "common" must be importable from it
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (PROJECT_ROOT, os.path.join(PROJECT_ROOT, "scripts")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from common import db, metrics, slow_queries
+
+
+class Column:
+    def __init__(self, name, type_code=None):
+        self.name = name
+        self.type_code = type_code
+
+
+class FakeCursor:
+    """
+    A psycopg2 cursor stand-in answering every statement with the rows of the
+    first FakeDatabase response whose pattern matches it (no rows otherwise).
+    """
+
+    def __init__(self, database, name=None):
+        self.database = database
+        self.name = name
+        self.itersize = 2000
+        self.rows = []
+        self.rowcount = -1
+        self.description = None
+
+    def execute(self, query, vars=None):
+        self.database.statements.append((query, vars))
+        self.rows = list(self.database.respond(query))
+        self.rowcount = len(self.rows)
+        if self.rows and not isinstance(self.rows[0], dict):
+            self.description = [Column(f"column_{index}") for index in range(len(self.rows[0]))]
+
+    def executemany(self, query, vars_list):
+        for vars in vars_list:
+            self.execute(query, vars)
+
+    def copy_expert(self, sql, file, size=8192):
+        self.database.statements.append((sql, file.read()))
+        self.rows = []
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def fetchmany(self, size=None):
+        size = size or self.itersize
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def __iter__(self):
+        while self.rows:
+            yield self.rows.pop(0)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FakeConnection:
+    """
+    A psycopg2 connection stand-in; COMMIT and ROLLBACK are counted as round trips
+    like common.db.InstrumentedConnection does.
+    """
+
+    def __init__(self, database, cursor_class):
+        self.database = database
+        self.cursor_class = cursor_class
+        self.autocommit = False
+        self.closed = False
+
+    def cursor(self, name=None, cursor_factory=None):
+        return self.cursor_class(self.database, name=name)
+
+    def commit(self):
+        db._count(0, 1)
+        self.database.commits += 1
+
+    def rollback(self):
+        db._count(0, 1)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeDatabase:
+    """
+    The rows returned for the statements matching each regular expression, in
+    order of precedence, and the statements that were run.
+    """
+
+    def __init__(self):
+        self.responses = []
+        self.statements = []
+        self.commits = 0
+
+    def respond_to(self, pattern, rows):
+        self.responses.append((re.compile(pattern, re.S), rows))
+
+    def respond(self, query):
+        for pattern, rows in self.responses:
+            if pattern.search(query):
+                return rows
+        return []
+
+
+class InstrumentedFakeCursor(db._InstrumentedCursorMixin, FakeCursor):
+    pass
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """
+    fake_db routes common.db.connect() to a FakeDatabase through the same
+    instrumented cursor as production, so statements are tagged and counted.
+    """
+    database = FakeDatabase()
+    monkeypatch.setattr(db, "_open", lambda cursor_factory=None, connection_factory=None: FakeConnection(
+        database, InstrumentedFakeCursor
+    ))
+    monkeypatch.setattr(slow_queries, "SLOW_QUERY_MS", float("inf"))
+    return database
+
+
+@pytest.fixture
+def metric_documents():
+    """
+    metric_documents collects the metric documents emitted by the handlers.
+    """
+    documents = []
+    metrics.set_sink(documents.append)
+    yield documents
+    metrics.set_sink(None)
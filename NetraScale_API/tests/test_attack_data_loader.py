@@ -0,0 +1,97 @@
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+from common import attack_data_loader, db
+from common.attack_data_loader import Vocabulary, employees_range, parse_bool, parse_number
+
+
+@pytest.mark.parametrize("value,expected", [
+    ("$1,200,000", 1200000.0), ("4.5B", 4.5e9), ("2m", 2e6), ("$ 3K", 3000.0), ("-1.5", -1.5),
+    (7, 7), (None, None), ("  ", None),
+])
+def test_parse_number_reads_feed_amounts(value, expected):
+    assert parse_number(value) == expected
+
+
+@pytest.mark.parametrize("value", ["about 5", "1.2.3x", "$"])
+def test_parse_number_rejects_text(value):
+    with pytest.raises(ValueError):
+        parse_number(value)
+
+
+def test_parse_bool_reads_yes_no_values():
+    assert [parse_bool(value) for value in ("Paid", " no ", True, "", None)] == [True, False, True, None, None]
+    with pytest.raises(ValueError):
+        parse_bool("maybe")
+
+
+@pytest.mark.parametrize("value,expected", [
+    ("1,001-5,000", (1001, 5000)), ("5000 to 1001", (1001, 5000)), ("1K–5K", (1000, 5000)),
+    ("10k+", (10000, None)), ("250", (250, 250)), (None, (None, None)), ("lots", (None, None)),
+])
+def test_employees_range(value, expected):
+    assert employees_range(value) == expected
+
+
+def test_vocabulary_uses_the_organizations_spellings():
+    vocabulary = Vocabulary(industries=["Financial Services", None], locations=["United Kingdom"])
+
+    assert vocabulary.industry("  financial   services ") == "Financial Services"
+    assert vocabulary.industry("Retail") == "Retail" and vocabulary.industry(" ") is None
+    assert vocabulary.location("U.K.") == "United Kingdom" and vocabulary.location("united kingdom") == "United Kingdom"
+    assert vocabulary.location("USA") == "United States"
+
+
+def test_normalize_attack_keys_the_record_like_the_migration():
+    row = attack_data_loader.normalize_attack({
+        "target": "  Acme \t Corp ", "category": "ransomware", "year": "2023", "market_cap": "$3B",
+        "ransom_paid": "yes", "source_url": " https://Example.com/A ", "number_employees": "1,001-5,000",
+    }, Vocabulary())
+
+    assert row[0] == attack_data_loader._key("RANSOMWARE", "acme corp", "https://example.com/a")
+    assert row[1:4] == ["RANSOMWARE", 2023, "Acme Corp"]
+    assert row[6:9] == [1001, 5000, 3e9] and row[12] is True
+
+
+@pytest.mark.parametrize("record", [{"category": "x", "year": 2023}, {"target": "t", "year": 2023},
+                                    {"target": "t", "category": "x", "year": 1800}])
+def test_normalize_attack_rejects_unusable_records(record):
+    with pytest.raises(ValueError):
+        attack_data_loader.normalize_attack(record, Vocabulary())
+
+
+def write_feed(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_text(content)
+    return str(path)
+
+
+def test_load_counts_unparsable_records_and_keeps_the_watermark_on_record_times(fake_db, tmp_path):
+    fake_db.respond_to(r'SELECT watermark', [(datetime(2024, 1, 1),)])
+    lines = [
+        {"target": "Acme", "category": "ransomware", "year": 2023, "updated_at": "2024-03-01T00:00:00Z"},
+        {"target": "Old", "category": "ransomware", "year": 2023, "updated_at": "2023-06-01"},
+        {"target": "Undated", "category": "phishing", "year": 2023},
+    ]
+    path = write_feed(tmp_path, "feed.ndjson", "\n".join(
+        [json.dumps(line) for line in lines] + ["{not json", "[1, 2]", json.dumps({"category": "x"})]
+    ))
+    # A recent file modification time (a fresh download) must not move the watermark
+    os.utime(path, (2e9, 2e9))
+
+    summary = attack_data_loader.load(db.connect(), "common_attack_data", [path])
+
+    assert (summary["read"], summary["unchanged_since_watermark"], summary["invalid"], summary["written"]) == (6, 1, 3, 2)
+    assert summary["watermark"] == "2024-03-01T00:00:00"
+    assert {"record is not an object", "missing target"} <= set(summary["errors"])
+
+
+@pytest.mark.parametrize("name,content", [("feed.json", "{broken"), ("feed.json", '{"a": 1}'), ("missing.csv", None)])
+def test_load_reports_unreadable_files(fake_db, tmp_path, name, content):
+    path = write_feed(tmp_path, name, content) if content is not None else str(tmp_path / name)
+
+    with pytest.raises(attack_data_loader.FeedError):
+        attack_data_loader.load(db.connect(), "security_incident", [path])
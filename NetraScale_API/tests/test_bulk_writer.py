@@ -0,0 +1,38 @@
+from datetime import date
+
+import pytest
+
+from common import bulk_writer, db
+
+
+@pytest.mark.parametrize("value,encoded", [
+    (None, "\\N"),
+    (True, "t"),
+    (False, "f"),
+    (42, "42"),
+    (date(2024, 6, 1), "2024-06-01"),
+    ("tab\there", "tab\\there"),
+    ("line\nbreak\r", "line\\nbreak\\r"),
+    ("back\\slash", "back\\\\slash"),
+    ([1.5, None, 2], "{1.5,NULL,2}"),
+    (["a b", 'say "hi"', None], '{"a b","say \\\\"hi\\\\"",NULL}'),
+    (["back\\slash", "tab\t"], '{"back\\\\\\\\slash","tab\\t"}'),
+    ([], "{}"),
+])
+def test_encode_escapes_copy_text_format(value, encoded):
+    assert bulk_writer._encode(value) == encoded
+
+
+def test_copy_buffer_is_one_tab_separated_line_per_row():
+    buffer = bulk_writer._copy_buffer([(1, "a\tb", None), (2, ["x"], True)])
+
+    assert buffer.getvalue() == '1\ta\\tb\t\\N\n2\t{"x"}\tt\n'
+
+
+def test_staging_table_depends_on_the_column_list(fake_db):
+    conn = db.connect()
+    bulk_writer.upsert(conn, "public.news_feed", ["url_hash", "title"], ["url_hash"], [("h", "t")])
+    bulk_writer.upsert(conn, "public.news_feed", ["url_hash", "title", "summary"], ["url_hash"], [("h", "t", "s")])
+
+    copies = [query.split()[1] for query, _ in fake_db.statements if query.startswith("COPY")]
+    assert len(set(copies)) == 2 and all(name.startswith("bulk_stage_news_feed_") for name in copies)
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from common import financial_risk
+from common.mitigation import MITIGATION_FACTORS, RECOMMENDED_MITIGATION
+
+RATES = np.array([0.3, 0.6])
+MU = np.array([10.0, 11.0])
+SIGMA = np.array([1.0, 0.5])
+# Expected annual loss: rate * E[log-normal] per category
+EXPECTED_ALE = float(RATES @ np.exp(MU + SIGMA ** 2 / 2))
+
+
+def run(residual=(1.0, 1.0), samples=200000, seed=7):
+    return financial_risk.simulate(RATES, MU, SIGMA, np.array(residual), samples, seed)
+
+
+def test_simulation_is_reproducible_for_a_seed():
+    assert run() == run()
+    assert run()["ale"] != run(seed=8)["ale"]
+
+
+def test_simulation_matches_the_expected_annual_loss():
+    result = run()
+
+    assert not result["approximated"] and result["samples"] == 200000
+    assert result["ale"] == pytest.approx(EXPECTED_ALE, rel=0.02)
+    assert result["aro"] == pytest.approx(0.9)
+    assert result["sle"] == pytest.approx(EXPECTED_ALE / 0.9, rel=0.02)
+    percentiles = [result["percentiles"][p] for p in financial_risk.PERCENTILES]
+    assert percentiles == sorted(percentiles)
+    # 41% of years (e^-0.9) have no incident, so the median sits well below the mean
+    assert 0 < result["percentiles"][50] < result["ale"]
+
+
+def test_cost_of_inaction_is_the_loss_avoided_by_the_recommended_approach():
+    recommended = MITIGATION_FACTORS[RECOMMENDED_MITIGATION]
+
+    assert run(residual=(recommended, recommended))["cost_of_inaction"] == 0.0
+    unmitigated = run(residual=(1.0, 1.0))
+    assert unmitigated["cost_of_inaction"] == pytest.approx(unmitigated["ale"] * (1 - recommended))
+
+
+def test_profiles_over_the_event_budget_run_every_year(monkeypatch):
+    exact = run(samples=100000)
+    monkeypatch.setattr(financial_risk, "FINANCIAL_RISK_MAX_EVENTS", 1000)
+
+    approximated = run(samples=100000)
+
+    assert approximated["approximated"] and approximated["samples"] == 100000
+    assert approximated["ale"] == pytest.approx(exact["ale"], rel=0.03)
+    assert approximated["sle"] == pytest.approx(EXPECTED_ALE / 0.9)
+    assert approximated["percentiles"][99] == pytest.approx(exact["percentiles"][99], rel=0.1)
+    assert approximated["cost_of_inaction"] == pytest.approx(
+        approximated["ale"] * (1 - MITIGATION_FACTORS[RECOMMENDED_MITIGATION])
+    )
+
+
+def test_loss_parameters_fit_industry_and_category():
+    # ln costs 9, 10, 11 for the industry and 12 elsewhere
+    statistics = {"RANSOMWARE": {"Finance": (3, 30.0, 302.0), "Retail": (1, 12.0, 144.0)}}
+
+    (industry_count, industry_mu, industry_sigma, count, mu, sigma), = financial_risk.loss_parameters(
+        statistics, "Finance"
+    ).values()
+
+    assert (industry_count, industry_mu, industry_sigma) == (3, 10.0, pytest.approx(1.0))
+    assert (count, mu, sigma) == (4, 10.5, pytest.approx(np.std([9, 10, 11, 12], ddof=1)))
+    assert financial_risk.loss_parameters(statistics, "Energy")["RANSOMWARE"][:3] == (0, None, None)
@@ -0,0 +1,33 @@
+from datetime import datetime
+
+import numpy as np
+
+from common import db, forecasting
+
+
+def test_band_widens_with_the_months_since_the_last_observation():
+    series = np.full((2, 36), np.nan)
+    series[:, :10] = 48 + np.sin(np.arange(10))
+
+    _, lower, upper = forecasting.forecast_series(series, horizon=6, gaps=[0, 3])
+
+    # Three unobserved months ahead: the second series' band is the first's, shifted by three steps
+    assert np.allclose((upper - lower)[1, :3], (upper - lower)[0, 3:])
+
+
+def test_run_skips_series_older_than_the_horizon(fake_db):
+    today = datetime(2024, 12, 15)
+    current = today.year * 12 + today.month - 1
+    fake_db.respond_to(r'historical_risk_score', [
+        *[(1, "RANSOMWARE", current - 24 + offset, 50.0 + offset) for offset in range(24)],
+        *[(2, "RANSOMWARE", current - 26 - offset, 48.0) for offset in range(10)],
+    ])
+
+    summary = forecasting.run(db.connect(), today=today)
+
+    assert (summary["forecast_series"], summary["stale_series"]) == (1, 1)
+    copied = "".join(data for query, data in fake_db.statements if query.startswith("COPY"))
+    rows = [line.split("\t") for line in copied.splitlines()]
+    assert {row[0] for row in rows} == {"1"}
+    # Last observed a month before the run month, so the first forecast month is two months ahead of it
+    assert [int(row[4]) for row in rows] == list(range(2, 14))
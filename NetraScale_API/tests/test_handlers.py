@@ -0,0 +1,202 @@
+"""
+Request validation and error responses of the handlers: a malformed or forbidden
+parameter is answered before any statement reaches the database, and a failing
+dependency with an error response.
+"""
+import json
+import sys
+import types
+
+import pytest
+
+from common import exports, news_ingestion
+from local_harness import LocalContext, load_handler
+
+
+@pytest.mark.parametrize("limit", ["abc", "0", "-3"])
+def test_threat_attacks_rejects_bad_limit(fake_db, limit):
+    handler = load_handler("risk_alert_api/get_threat_attacks")
+    event = {
+        "pathParameters": {"orgId": "1"},
+        "queryStringParameters": {"category": "ransomware", "mode": "similar", "limit": limit},
+    }
+
+    assert handler(event, LocalContext("get_threat_attacks"))["statusCode"] == 400
+    assert fake_db.statements == []
+
+
+@pytest.mark.parametrize("function", ["get_match_score", "get_risk_score"])
+@pytest.mark.parametrize("path_org_id,parameters", [
+    ("1", {"categories": "ransomware", "orgIds": "1"}),
+    ("1", {"orgIds": "2"}),
+    ("1,2", {"categories": "ransomware"}),
+    ("abc", {"categories": "ransomware"}),
+    ("1", {"categories": " , "}),
+])
+def test_batch_scores_refuse_other_and_malformed_organizations(fake_db, function, path_org_id, parameters):
+    handler = load_handler(f"risk_alert_api/{function}")
+    event = {"pathParameters": {"orgId": path_org_id}, "queryStringParameters": parameters}
+
+    assert handler(event, LocalContext(function))["statusCode"] == 400
+    assert fake_db.statements == []
+
+
+@pytest.mark.parametrize("function", ["get_match_score", "get_risk_score"])
+def test_batch_scores_normalize_organization_ids(fake_db, function):
+    fake_db.respond_to(r'FROM public\."Organization"', [(1, "RANSOMWARE", 42, None)])
+    handler = load_handler(f"risk_alert_api/{function}")
+    event = {"pathParameters": {"orgId": "01"}, "queryStringParameters": {"categories": "ransomware"}}
+
+    response = handler(event, LocalContext(function))
+
+    assert response["statusCode"] == 200, response
+    assert list(json.loads(response["body"]).popitem()[1]) == ["1"]
+    assert fake_db.statements[0][1][-1] == (1,)
+
+
+class ClientError(Exception):
+    pass
+
+
+@pytest.fixture
+def aws(monkeypatch):
+    """
+    aws replaces boto3 and botocore with recorders of the S3 and Lambda calls;
+    aws.fail names an S3 operation that raises a ClientError.
+    """
+    calls = types.SimpleNamespace(log=[], fail=None)
+
+    def call(operation, response):
+        def method(**kwargs):
+            calls.log.append((operation, kwargs))
+            if operation == calls.fail:
+                raise ClientError(f"An error occurred (AccessDenied) when calling the {operation} operation")
+            return response
+        return method
+
+    client = types.SimpleNamespace(
+        create_multipart_upload=call("CreateMultipartUpload", {"UploadId": "upload"}),
+        upload_part=call("UploadPart", {"ETag": '"etag"'}),
+        complete_multipart_upload=call("CompleteMultipartUpload", {}),
+        abort_multipart_upload=call("AbortMultipartUpload", {}),
+        put_object=call("PutObject", {}),
+        download_file=lambda bucket, key, path: call("DownloadFile", None)(Bucket=bucket, Key=key, Filename=path),
+        generate_presigned_url=lambda *args, **kwargs: "https://exports.example.com/link",
+        invoke=call("Invoke", {"StatusCode": 202}),
+    )
+    monkeypatch.setitem(sys.modules, "boto3", types.SimpleNamespace(client=lambda service: client))
+    monkeypatch.setitem(sys.modules, "botocore", types.ModuleType("botocore"))
+    monkeypatch.setitem(sys.modules, "botocore.exceptions", types.SimpleNamespace(
+        ClientError=ClientError, BotoCoreError=type("BotoCoreError", (Exception,), {})
+    ))
+    monkeypatch.setattr(exports, "EXPORT_DIR", None)
+    return calls
+
+
+def export_event():
+    return {"pathParameters": {"orgId": "1"}, "queryStringParameters": {"dataset": "match_score", "format": "csv"}}
+
+
+def test_export_reports_an_s3_error(fake_db, aws):
+    aws.fail = "UploadPart"
+    fake_db.respond_to(r'FROM public\."Organization"', [(1, 3)])
+    fake_db.respond_to(r'FROM public\.match_score', [(1, 2024, 6, "RANSOMWARE", 40)] * 3)
+    handler = load_handler("dashboard_api/export_risk_history")
+
+    response = handler(export_event(), LocalContext("export_risk_history"))
+
+    assert response["statusCode"] == 500
+    assert "UploadPart" in json.loads(response["body"])["error"]
+    assert [operation for operation, _ in aws.log][-1] == "AbortMultipartUpload"
+
+
+def test_large_export_runs_asynchronously(fake_db, aws, monkeypatch):
+    monkeypatch.setattr(exports, "EXPORT_SYNC_ROWS", 2)
+    fake_db.respond_to(r'FROM public\."Organization"', [(1, 3)])
+    handler = load_handler("dashboard_api/export_risk_history")
+
+    response = handler(export_event(), LocalContext("export_risk_history"))
+
+    assert response["statusCode"] == 202
+    body = json.loads(response["body"])
+    assert body["status"] == "pending" and body["status_url"]
+    (operation, invoke), = aws.log
+    assert (operation, invoke["FunctionName"], invoke["InvocationType"]) == ("Invoke", "export_risk_history", "Event")
+    assert len(fake_db.statements) == 1
+
+    # The asynchronous invocation writes the file under the name of the link
+    request = json.loads(invoke["Payload"])
+    fake_db.respond_to(r'FROM public\.match_score', [(1, 2024, 6, "RANSOMWARE", 40)] * 3)
+    summary = handler(request, LocalContext("export_risk_history"))
+    assert summary["rows"] == 3
+    assert aws.log[1][1]["Key"].endswith("/1/" + request["export"]["name"])
+    operation, status = aws.log[-1]
+    assert (operation, status["Key"]) == ("PutObject", "exports/1/" + request["export"]["name"] + ".status.json")
+    assert json.loads(status["Body"]) == {"status": "complete", "rows": 3, "bytes": summary["bytes"]}
+
+
+def test_failed_asynchronous_export_writes_its_status(fake_db, aws):
+    aws.fail = "UploadPart"
+    fake_db.respond_to(r'FROM public\.match_score', [(1, 2024, 6, "RANSOMWARE", 40)] * 3)
+    handler = load_handler("dashboard_api/export_risk_history")
+    request = {"export": {"orgId": "1", "dataset": "match_score", "format": "csv", "name": "match_score.csv"}}
+
+    result = handler(request, LocalContext("export_risk_history"))
+
+    assert result["status"] == "failed" and "UploadPart" in result["error"]
+    operation, status = aws.log[-1]
+    assert (operation, status["Key"]) == ("PutObject", "exports/1/match_score.csv.status.json")
+    assert json.loads(status["Body"]) == result
+
+
+def sqs_event(*bodies):
+    return {"Records": [{"messageId": f"m{index}", "body": body} for index, body in enumerate(bodies)]}
+
+
+def test_ingest_news_reports_only_the_unparsable_records(fake_db):
+    handler = load_handler("dashboard_api/ingest_news")
+    article = {"title": "Ransomware hits a hospital", "url": "https://example.com/story", "summary": "Outage"}
+
+    response = handler(sqs_event(json.dumps(article), "{not json", "[1, 2]"), LocalContext("ingest_news"))
+
+    assert response == {"batchItemFailures": [{"itemIdentifier": "m1"}, {"itemIdentifier": "m2"}]}
+    assert any(query.startswith("COPY") and "example.com/story" in data for query, data in fake_db.statements)
+
+
+def test_ingest_news_keeps_the_batch_on_a_database_error(fake_db, monkeypatch):
+    import psycopg2
+
+    def fail(conn, articles):
+        raise psycopg2.OperationalError("connection lost")
+
+    monkeypatch.setattr(news_ingestion, "ingest", fail)
+    handler = load_handler("dashboard_api/ingest_news")
+
+    with pytest.raises(psycopg2.OperationalError):
+        handler(sqs_event(json.dumps({"title": "Story", "url": "https://example.com/story"})), LocalContext("ingest_news"))
+
+
+@pytest.mark.parametrize("precomputed,statements", [(True, 1), (False, 2)])
+def test_news_feed_falls_back_only_for_segments_not_precomputed(fake_db, precomputed, statements):
+    fake_db.respond_to(r'news_feed_top', [(1, None, None, None, None, None, None, None, precomputed)])
+    fake_db.respond_to(r'FROM public\.news_feed n', [])
+    handler = load_handler("dashboard_api/get_news_feed")
+
+    response = handler({"pathParameters": {"orgId": "1"}}, LocalContext("get_news_feed"))
+
+    assert response["statusCode"] == 200 and response["body"] == {"news-feed": []}
+    assert len(fake_db.statements) == statements
+
+
+def test_load_attack_data_reports_feed_and_download_errors(fake_db, aws, tmp_path):
+    handler = load_handler("risk_alert_api/load_attack_data")
+    broken = tmp_path / "feed.json"
+    broken.write_text("{broken")
+
+    response = handler({"dataset": "security_incident", "paths": [str(broken)]}, LocalContext("load_attack_data"))
+    assert response["statusCode"] == 400 and "feed.json" in json.loads(response["body"])["error"]
+
+    aws.fail = "DownloadFile"
+    event = {"Records": [{"s3": {"bucket": {"name": "feeds"}, "object": {"key": "security_incident/cisa/a.csv"}}}]}
+    response = handler(event, LocalContext("load_attack_data"))
+    assert response["statusCode"] == 500 and "s3://feeds/security_incident/cisa/a.csv" in response["body"]
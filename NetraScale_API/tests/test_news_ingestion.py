@@ -0,0 +1,121 @@
+import random
+
+import pytest
+
+from common import db, news_ingestion, news_ranking
+from common.news_ingestion import FingerprintIndex
+
+
+def reference_simhash(text):
+    # The textbook definition, one word at a time
+    tokens = news_ingestion._TOKEN_RE.findall(text.lower())
+    if not tokens:
+        return None
+    ones = [sum(news_ingestion._token_hash(token) >> bit & 1 for token in tokens) for bit in range(64)]
+    return sum(1 << bit for bit in range(64) if ones[bit] * 2 > len(tokens))
+
+
+def test_simhashes_match_the_definition():
+    texts = [
+        "Ransomware gang hits regional hospital network",
+        "",
+        None,
+        "Ransomware gang hits regional hospital network, patients diverted",
+        "Phishing campaign targets payroll staff at several banks",
+        "42",
+    ]
+
+    assert news_ingestion.simhashes(texts) == [reference_simhash(text or "") for text in texts]
+    assert news_ingestion.simhashes(["", None]) == [None, None]
+
+
+def test_simhashes_keep_near_texts_close():
+    base = " ".join(f"word{index}" for index in range(200))
+    near, far = news_ingestion.simhashes([base, base + " word7"]), news_ingestion.simhashes([base, "unrelated text"])
+
+    assert bin(near[0] ^ near[1]).count("1") <= news_ingestion.SIMHASH_MAX_DISTANCE
+    assert bin(far[0] ^ far[1]).count("1") > news_ingestion.SIMHASH_MAX_DISTANCE
+
+
+@pytest.mark.parametrize("flipped", [0, 1, 2, 3, 4])
+def test_fingerprint_index_finds_fingerprints_within_the_distance(flipped):
+    rng = random.Random(flipped)
+    index = FingerprintIndex()
+    fingerprint = rng.getrandbits(64)
+    index.add(fingerprint)
+    # Flips spread over the bands, including the wider last one
+    query = fingerprint
+    for bit in rng.sample(range(64), flipped):
+        query ^= 1 << bit
+
+    assert index.near(query) is (flipped <= news_ingestion.SIMHASH_MAX_DISTANCE)
+    assert index.size == 1
+
+
+def test_fingerprint_index_covers_the_top_bits():
+    index = FingerprintIndex()
+    index.add(0)
+
+    assert index.near(0b111 << 61)
+    assert not index.near(0b1111 << 60)
+
+
+def test_normalize_maps_segments_and_wildcards():
+    row = news_ingestion.normalize({
+        "title": "  Breach  at \nbank ", "url": " https://example.com/a/ ", "related_location": " united  kingdom",
+        "related_sector": "all sectors", "related_risk": "ransomware ", "tags": ["a", " ", "b "],
+        "published_at": "2024-06-01T12:00:00+02:00",
+    })
+
+    assert row[0] == "Breach at bank" and row[4] == "https://example.com/a/"
+    assert row[7:10] == ["UNITED KINGDOM", news_ingestion.GENERAL_SECTOR, "RANSOMWARE"]
+    assert row[3] == ["a", "b"] and str(row[2]) == "2024-06-01 10:00:00"
+    assert row[10] == news_ingestion.url_hash("https://EXAMPLE.com/a#top")
+
+
+def test_normalize_coerces_loosely_typed_fields():
+    row = news_ingestion.normalize({
+        "title": 2024, "url": 123, "related_location": 7, "tags": ["x", 5, None], "related_risk": ["ransomware", 2],
+        "author": 1.5,
+    })
+
+    assert row[:2] == ["2024", "1.5"] and row[4] == "123"
+    assert row[3] == ["x", "5"] and row[7] == "7" and row[9] == "RANSOMWARE,2"
+
+
+@pytest.mark.parametrize("article", [
+    {"title": ["t"], "url": "https://example.com"},
+    {"title": "t", "url": {"href": "https://example.com"}},
+    {"title": "t", "url": "https://example.com", "tags": [{"name": "x"}]},
+    {"title": "t", "url": "https://example.com", "related_sector": ["Finance"]},
+    {"title": " ", "url": "https://example.com"},
+])
+def test_normalize_rejects_articles_with_unusable_fields(article):
+    assert news_ingestion.normalize(article) is None
+
+
+def test_ingest_serializes_runs_and_refreshes_the_touched_segments(fake_db, monkeypatch):
+    refreshed = []
+    monkeypatch.setattr(news_ranking, "refresh", lambda conn, segments: refreshed.append(segments) or 0)
+    articles = [
+        {"title": "Bank breach", "url": "https://example.com/1", "related_location": "UK", "related_sector": "Finance"},
+        {"title": "Phishing wave", "url": "https://example.com/2", "related_location": "Global"},
+        {"title": ["bad"], "url": "https://example.com/3"},
+    ]
+
+    summary = news_ingestion.ingest(db.connect(), articles)
+
+    assert (summary["received"], summary["invalid"], summary["written"]) == (3, 1, 2)
+    assert refreshed == [[("GLOBAL", "GENERAL"), ("UK", "FINANCE")]]
+    queries = [query for query, _ in fake_db.statements]
+    assert "pg_advisory_lock" in queries[0] and "pg_advisory_unlock" in queries[-1]
+
+
+@pytest.mark.parametrize("segments,deletes", [(None, "DELETE FROM public.news_feed_top\n"), ([("UK", "FINANCE")], "USING")])
+def test_refresh_runs_under_its_lock(fake_db, segments, deletes):
+    news_ranking.refresh(db.connect(), segments)
+
+    (lock, _), (delete, parameters) = fake_db.statements[:2]
+    assert "pg_advisory_xact_lock" in lock and deletes in delete + "\n"
+    if segments:
+        assert (parameters["locations"], parameters["sectors"]) == (["UK"], ["FINANCE"])
@@ -0,0 +1,33 @@
+from datetime import date
+
+import pyarrow.parquet as pq
+
+from common import db, partitions
+
+
+def test_archive_partition_writes_parquet_to_the_archive_dir(fake_db, tmp_path):
+    fake_db.respond_to(r'FROM public\."news_feed_m202201"', [(index, f"Story {index}") for index in range(5)])
+
+    location, rows = partitions.archive_partition(db.connect(), "news_feed", "news_feed_m202201", str(tmp_path))
+
+    assert rows == 5
+    assert location == str(tmp_path / partitions.PARTITION_ARCHIVE_PREFIX / "news_feed" / "news_feed_m202201.parquet")
+    table = pq.read_table(location)
+    assert table.num_rows == 5 and table.column_names == ["column_0", "column_1"]
+
+
+def test_maintain_moves_default_rows_before_creating_a_partition(fake_db, monkeypatch):
+    monkeypatch.setattr(partitions, "PARTITION_PRECREATE", 0)
+    fake_db.respond_to(r'pg_inherits', [("news_feed_default",)])
+    fake_db.respond_to(r'pg_partitioned_table', [("news_feed_default",)])
+    fake_db.respond_to(r'CREATE TEMPORARY TABLE partition_move', [(0,)] * 3)
+
+    result = partitions.maintain(db.connect(), "news_feed", partitions.POLICIES["news_feed"], date(2024, 6, 15))
+
+    assert result["created"] == ["news_feed_m202406"] and result["moved"] == {"news_feed_m202406": 3}
+    statements = [query for query, _ in fake_db.statements]
+    move = next(i for i, query in enumerate(statements) if "partition_move" in query)
+    create = next(i for i, query in enumerate(statements) if "PARTITION OF" in query)
+    reinsert = next(i for i, query in enumerate(statements) if 'INSERT INTO public."news_feed"' in query)
+    assert move < create < reinsert
+    assert "published_at >= '2024-06-01' AND published_at < '2024-07-01'" in statements[move]
@@ -0,0 +1,48 @@
+import pytest
+
+from common import peer_percentiles
+
+
+def test_percentile_rank_interpolates_between_quantiles():
+    quantiles = [float(q) for q in range(0, 202, 2)]
+
+    assert peer_percentiles.percentile_rank(quantiles, 50) == 25.0
+    assert peer_percentiles.percentile_rank(quantiles, 51) == 25.5
+    assert peer_percentiles.percentile_rank(quantiles, -1) == 0.0
+    assert peer_percentiles.percentile_rank(quantiles, 200) == 100.0
+    assert peer_percentiles.percentile_rank(quantiles, None) is None
+    assert peer_percentiles.percentile_rank(None, 5) is None
+
+
+def test_percentile_rank_steps_over_repeated_quantiles():
+    quantiles = [0.0] * 50 + [10.0] * 51
+
+    assert peer_percentiles.percentile_rank(quantiles, 0) == 49.0
+    assert peer_percentiles.percentile_rank(quantiles, 5) == 49.5
+
+
+def test_build_sketches_skips_small_groups():
+    keys = [("Finance", "EU", "RANSOMWARE")] * 5 + [("Retail", "EU", "RANSOMWARE")] * 4
+    values = [50, 10, 30, 20, 40] + [1, 2, 3, 4]
+
+    sketches = peer_percentiles.build_sketches(keys, values)
+
+    assert list(sketches) == [("Finance", "EU", "RANSOMWARE")]
+    count, quantiles = sketches["Finance", "EU", "RANSOMWARE"]
+    assert count == 5 and len(quantiles) == peer_percentiles.QUANTILE_POINTS
+    # p0 and p100 are the extreme members, p25 falls on the second lowest, p10 between the two lowest
+    assert (quantiles[0], quantiles[25], quantiles[50], quantiles[100]) == (10.0, 20.0, 30.0, 50.0)
+    assert quantiles[10] == pytest.approx(14.0)
+    assert peer_percentiles.build_sketches([], []) == {}
+
+
+def test_figures_also_count_towards_the_sector():
+    rows = [("Finance", "EU", "PHISHING", 1.0), ("Finance", None, "PHISHING", 2.0), ("Finance", "ALL", "PHISHING", 3.0)]
+
+    keys, values = peer_percentiles._with_sector(rows)
+
+    assert keys == [
+        ("Finance", "EU", "PHISHING"), ("Finance", "ALL", "PHISHING"),
+        ("Finance", "ALL", "PHISHING"), ("Finance", "ALL", "PHISHING"),
+    ]
+    assert values == [1.0, 1.0, 2.0, 3.0]
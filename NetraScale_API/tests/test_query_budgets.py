@@ -0,0 +1,207 @@
+"""
+Every function listed in scripts/query_budgets.json is invoked against a fake
+connection, cold and then warm, and must not run more statements than its
+budget. A new N+1 pattern (a statement per row, per category, per org) fails here.
+"""
+import base64
+import glob
+import json
+import os
+import sys
+import types
+from datetime import datetime
+
+import pytest
+
+from conftest import PROJECT_ROOT
+from local_harness import QUERY_BUDGETS_FILE, LocalContext, load_handler
+
+with open(QUERY_BUDGETS_FILE) as budgets_file:
+    BUDGETS = json.load(budgets_file)
+
+ATTACK = (2024, "Acme", "Finance", "1001-5000", 3e9, "United Kingdom", 50000.0, True, "https://example.com/acme",
+          2e9, 1001, 5000)
+
+# (function, event, [(statement pattern, rows), ...]); the patterns are tried in order
+CASES = [
+    ("collect_evidence", {
+        "httpMethod": "POST",
+        "pathParameters": {"orgId": "1"},
+        "body": json.dumps({
+            "evidence_id": 3, "third_party": "", "evidence_state": 1, "status": 0, "from_third_party": False,
+            "file_name": "report.pdf", "file_content": base64.b64encode(b"%PDF").decode(),
+        }),
+    }, [
+        (r'FROM public\."Organization"', [(1,)]),
+        (r'evidence_requirements', [(3, "POLICY")]),
+        (r'FROM public\."evidence_collection"', [(9,)]),
+    ]),
+    ("export_risk_history", {
+        "pathParameters": {"orgId": "1"}, "queryStringParameters": {"dataset": "historical_risk_score", "format": "csv"},
+    }, [
+        (r'FROM public\."Organization"', [(1, 12)]),
+        (r'FROM public\.historical_risk_score', [(1, 2024, month, "RANSOMWARE", 50) for month in range(1, 13)]),
+    ]),
+    ("get_financial_risks", {
+        "pathParameters": {"orgId": "1"}, "queryStringParameters": {"samples": "1000"},
+    }, [
+        (r'organization_common_threat_summary', [("Finance", "RANSOMWARE", 3, 0.0, 1), ("Finance", "PHISHING", 2, 5000.0, 2)]),
+        (r'common_attack_data', [("RANSOMWARE", "Finance", 5, 50.0, 505.0), ("RANSOMWARE", "Retail", 35, 367.5, 3900.0)]),
+    ]),
+    ("get_historical_risk_score", {
+        "pathParameters": {"orgId": "1"}, "queryStringParameters": {"category": "ransomware", "forecast": "3"},
+    }, [
+        (r'historical_risk_score_rollup', [(month, 2024, 50, "RANSOMWARE") for month in range(1, 13)]),
+        (r'risk_score_forecast', [(2025, month, 50.0, 45.0, 55.0) for month in range(1, 4)]),
+    ]),
+    ("get_match_score", {
+        "pathParameters": {"orgId": "1"}, "queryStringParameters": {"category": "ransomware"},
+    }, [
+        (r'match_score', [(1, 42)]),
+    ]),
+    ("get_match_score", {
+        "pathParameters": {"orgId": "1"}, "queryStringParameters": {"categories": "ransomware,phishing,malware"},
+    }, [
+        (r'match_score', [(1, "RANSOMWARE", 42), (1, "PHISHING", 17)]),
+    ]),
+    ("get_mitigation_actions", {
+        "pathParameters": {"orgId": "1"}, "queryStringParameters": {"category": "ransomware"},
+    }, [
+        (r'general_threat_mitigation_activities', [("Backup", "Keep offline backups", 5, "RANSOMWARE", "not_started")]),
+    ]),
+    ("get_news_feed", {
+        "pathParameters": {"orgId": "1"}, "queryStringParameters": {},
+    }, [
+        # A segment without precomputed stories falls back to ranking news_feed
+        (r'news_feed_top', [(1, None, None, None, None, None, None, None, False)]),
+        (r'FROM public\.news_feed n', [
+            (1, f"Story {index}", "Author", datetime(2024, 6, index + 1), ["ransomware"], f"https://example.com/{index}",
+             "Summary", "Source")
+            for index in range(10)
+        ]),
+    ]),
+    ("get_overall_risk_score", {
+        "pathParameters": {"orgId": "1"}, "queryStringParameters": {},
+    }, [
+        (r'overall_risk_score', [(72, "High", "Summary", datetime(2024, 6, 1))]),
+    ]),
+    ("get_regulation_information", {
+        "headers": {"Origin": "http://localhost:3000"}, "queryStringParameters": {"sector": "Finance", "region": "UK"},
+    }, [
+        (r'RansomwareRegulationsWorldwidePenalty', [{"regulation": "NIS2", "penalty": "Fine", "location": "UK"}]),
+    ]),
+    ("get_regulation_stats", {
+        "pathParameters": {"orgId": "1"},
+    }, [
+        (r'organization_compliance_summary', [("UK", "FINANCE", 2, 1, [
+            {"name": "NIS2", "compliance": 100}, {"name": "GDPR", "compliance": None},
+        ])]),
+    ]),
+    ("get_regulatory_assessment", {
+        "pathParameters": {"orgId": "1"}, "queryStringParameters": {"category": "ransomware"},
+    }, [
+        (r'FROM public\."Organization"', [("Finance", "UK", 1)]),
+        (r'FROM public\.security_regulations', [
+            (1, "GDPR", "Fine", "ALL", "", "RANSOMWARE", "UK", "EU"),
+            (2, "NIS2", "Fine", "FINANCE", "", "RANSOMWARE", "UK", "EU"),
+        ]),
+    ]),
+    ("get_regulatory_assessment", {
+        "pathParameters": {"orgId": "1"}, "queryStringParameters": {"category": "ransomware", "focus": "GENERAL"},
+    }, [
+        (r'FROM public\.security_regulations', [(1, "GDPR", "Fine", "ALL", "", "RANSOMWARE", "UK", "EU")]),
+        (r'table_version', [(1,)]),
+    ]),
+    ("get_risk_factor_breakdown", {
+        "pathParameters": {"orgId": "1"}, "queryStringParameters": {"category": "ransomware"},
+    }, [
+        (r'risk_factors_per_threat', [("RANSOMWARE", "Backup", "No offline backups", 4)]),
+    ]),
+    ("get_risk_score", {
+        "pathParameters": {"orgId": "1"}, "queryStringParameters": {"category": "ransomware"},
+    }, [
+        (r'historical_risk_score', [(1, 60, [10, 30, 50, 70, 90])]),
+    ]),
+    ("get_risk_score", {
+        "pathParameters": {"orgId": "1"}, "queryStringParameters": {"categories": "ransomware,phishing,malware"},
+    }, [
+        (r'historical_risk_score', [(1, "RANSOMWARE", 60, [10, 30, 50, 70, 90]), (1, "PHISHING", 20, None)]),
+    ]),
+    ("get_risk_score_trend", {
+        "pathParameters": {"orgId": "1"}, "queryStringParameters": {"forecast": "3"},
+    }, [
+        (r'risk_score_forecast', [(2025, month, 50.0, 45.0, 55.0) for month in range(1, 4)]),
+        (r'FROM public\.overall_risk_score', [(datetime(2024, month, 1), 50.0 + month) for month in range(1, 13)]),
+    ]),
+    ("get_risk_severity_summary", {
+        "pathParameters": {"orgId": "1"}, "queryStringParameters": {"from": "2024-01", "to": "2024-12"},
+    }, [
+        (r'risk_severity_cube', [(1, "high", 3), (1, "critical", 1)]),
+    ]),
+    ("get_sample_incident", {
+        "pathParameters": {"orgId": "1"}, "queryStringParameters": {"category": "ransomware"},
+    }, [
+        (r'security_incident', [("Title", "Description", "Phishing", "Outage", "Backups")] * 3),
+    ]),
+    ("get_threat_attacks", {
+        "pathParameters": {"orgId": "1"}, "queryStringParameters": {"category": "ransomware"},
+    }, [
+        (r'MIN\(year\)', [(2019, 2024)]),
+        (r'FROM common_attack_data', [ATTACK] * 5),
+    ]),
+    ("get_threat_attacks", {
+        "pathParameters": {"orgId": "1"}, "queryStringParameters": {"category": "ransomware", "mode": "similar"},
+    }, [
+        (r'FROM public\."Organization"', [("Finance", "United Kingdom")]),
+        (r'FROM common_attack_data', [ATTACK] * 20),
+    ]),
+    ("update_mitigation_actions_status", {
+        "body": json.dumps({"ids": [1, 2, 3], "status": "completed"}),
+    }, [
+        (r'UPDATE general_threat_mitigation_activities', [
+            (action_id, "Backup", "Keep offline backups", 5, "RANSOMWARE", "completed") for action_id in (1, 2, 3)
+        ]),
+    ]),
+]
+
+
+def function_path(function):
+    # "<api_category>/<function_name>" as used by scripts/local_harness.py
+    matches = glob.glob(os.path.join(PROJECT_ROOT, "*", "lambdas", function))
+    assert len(matches) == 1, f"{function} should exist in exactly one API"
+    return os.path.relpath(matches[0], PROJECT_ROOT).replace(os.sep + "lambdas" + os.sep, "/")
+
+
+@pytest.fixture(autouse=True)
+def cold_caches(monkeypatch, tmp_path):
+    # Every case starts from an empty container: no cached index, matrix or assessment
+    from common import attack_similarity, exports, financial_risk, regulation_index
+
+    monkeypatch.setattr(regulation_index, "_index", None)
+    monkeypatch.setattr(attack_similarity, "_cache", {})
+    monkeypatch.setattr(financial_risk, "_cache", {})
+    monkeypatch.setattr(financial_risk, "_loss_statistics", None)
+    monkeypatch.setattr(exports, "EXPORT_DIR", str(tmp_path))
+    monkeypatch.setenv("S3_BUCKET", "evidence")
+    monkeypatch.setitem(sys.modules, "boto3", types.SimpleNamespace(client=lambda service: types.SimpleNamespace(
+        put_object=lambda **kwargs: {"VersionId": "1", "ETag": '"etag"'}
+    )))
+
+
+def test_every_budget_is_exercised():
+    assert sorted(BUDGETS) == sorted({case[0] for case in CASES})
+
+
+@pytest.mark.parametrize("function,event,responses", CASES, ids=[case[0] for case in CASES])
+def test_query_budget(fake_db, metric_documents, function, event, responses):
+    for pattern, rows in responses:
+        fake_db.respond_to(pattern, rows)
+    handler = load_handler(function_path(function))
+
+    for _ in range(2):
+        response = handler(json.loads(json.dumps(event, default=str)), LocalContext(function))
+        assert response["statusCode"] == 200, response
+
+    queries = [document["queries"] for document in metric_documents]
+    assert len(queries) == 2
+    assert max(queries) <= BUDGETS[function], f"{function} ran {queries} statements (cold, warm), budget {BUDGETS[function]}"
@@ -0,0 +1,75 @@
+import gzip
+import json
+import sys
+import types
+
+import pytest
+
+from common import context, responses
+
+
+def test_spill_threshold_counts_the_escaped_body(monkeypatch):
+    # Escaped quotes double in size once the body is itself a JSON string in the proxy response
+    body = {"text": '"' * 400}
+    assert len(json.dumps(body)) < 1000 < len(json.dumps({"statusCode": 200, "body": json.dumps(body)}))
+    monkeypatch.setattr(responses, "RESPONSE_SPILL_BYTES", 1000)
+    monkeypatch.setattr(responses, "RESPONSE_SPILL_BUCKET", "responses")
+    monkeypatch.setattr(responses, "spill", lambda data: "https://responses.example.com/link")
+
+    response = responses.json_response(body)
+
+    assert json.loads(response["body"])["spilled"] is True
+
+
+def test_small_response_is_returned_as_is():
+    response = responses.json_response({"text": "small"})
+
+    assert response == {"statusCode": 200, "body": '{"text": "small"}', "headers": responses.JSON_HEADERS}
+
+
+@pytest.mark.parametrize("body", [
+    {"a": 'x"y\\z\n\x01', "b": ["caf\u00e9 \U0001F600"]},
+    '{"text": "caf\u00e9 \u2603 \U0001F600"}',
+    "tab\there",
+])
+def test_encoded_size_matches_the_proxy_response(body, monkeypatch):
+    logged = []
+    monkeypatch.setattr(responses, "RESPONSE_SPILL_BYTES", 0)
+    monkeypatch.setattr(responses, "get_logger", lambda: types.SimpleNamespace(
+        warning=lambda message, extra: logged.append(extra["fields"]["bytes"])
+    ))
+
+    response = responses.json_response(body, headers={"Cache-Control": "no-store"})
+
+    assert logged == [len(json.dumps(response))]
+
+
+def test_object_body_is_kept_and_spilled_as_an_object(monkeypatch):
+    monkeypatch.setattr(responses, "RESPONSE_SPILL_BYTES", 100)
+    monkeypatch.setattr(responses, "RESPONSE_SPILL_BUCKET", "responses")
+    monkeypatch.setattr(responses, "spill", lambda data: "https://responses.example.com/link")
+
+    assert responses.json_response({"a": 1}, encode_body=False)["body"] == {"a": 1}
+    assert responses.json_response({"a": "x" * 100}, encode_body=False)["body"]["spilled"] is True
+
+
+def test_spill_uploads_the_compressed_body(monkeypatch):
+    calls = []
+    client = types.SimpleNamespace(
+        put_object=lambda **kwargs: calls.append(kwargs),
+        generate_presigned_url=lambda operation, Params, ExpiresIn: f"https://s3/{Params['Key']}?ttl={ExpiresIn}",
+    )
+    monkeypatch.setitem(sys.modules, "boto3", types.SimpleNamespace(client=lambda service: client))
+    monkeypatch.setattr(responses, "RESPONSE_SPILL_BUCKET", "responses")
+    token = context.activate(context.RequestContext("get_historical_risk_score", {}, types.SimpleNamespace(
+        aws_request_id="req-1"), cold=False))
+    try:
+        url = responses.spill(b'{"big": true}')
+    finally:
+        context.deactivate(token)
+
+    (upload,) = calls
+    assert upload["Bucket"] == "responses" and upload["ContentEncoding"] == "gzip"
+    assert upload["Key"].startswith("responses/get_historical_risk_score/") and upload["Key"].endswith("/req-1.json")
+    assert gzip.decompress(upload["Body"]) == b'{"big": true}'
+    assert url == f"https://s3/{upload['Key']}?ttl={responses.RESPONSE_SPILL_URL_TTL_S}"
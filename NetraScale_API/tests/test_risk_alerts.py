@@ -0,0 +1,22 @@
+from common import db, risk_alerts
+
+
+def test_evaluate_is_limited_to_the_rewritten_scores(fake_db):
+    risk_alerts.evaluate(db.connect(), 2024, 1, changed=[(1, "RANSOMWARE"), (2, "PHISHING")])
+
+    (query, parameters), = fake_db.statements
+    assert "unnest" in query
+    assert (parameters["previous_year"], parameters["previous_month"]) == (2023, 12)
+    assert (parameters["organization_ids"], parameters["categories"]) == ([1, 2], ["RANSOMWARE", "PHISHING"])
+
+
+def test_evaluate_skips_a_run_that_rewrote_nothing(fake_db):
+    assert risk_alerts.evaluate(db.connect(), 2024, 6, changed=[]) == 0
+    assert fake_db.statements == []
+
+
+def test_evaluate_without_changed_scans_the_month(fake_db):
+    risk_alerts.evaluate(db.connect(), 2024, 6)
+
+    (query, parameters), = fake_db.statements
+    assert "unnest" not in query and "organization_ids" not in parameters
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from common import db, risk_scoring
+
+
+def inputs(rows, severity, completion=None):
+    """
+    inputs builds ScoringInputs from (org_id, category, probability, breach_cost, risk_status)
+    rows and the per-category severity (0 - 1) and completion, in category order.
+    """
+    org_codes, org_ids = risk_scoring._factorize([row[0] for row in rows])
+    category_codes, categories = risk_scoring._factorize([row[1] for row in rows])
+    return risk_scoring.ScoringInputs(
+        org_ids=org_ids,
+        categories=categories,
+        org_codes=org_codes,
+        category_codes=category_codes,
+        probability=np.array([row[2] for row in rows], dtype=float),
+        breach_cost=np.array([row[3] for row in rows], dtype=float),
+        risk_status=np.array([row[4] for row in rows], dtype=np.int64),
+        category_severity=np.asarray(severity, dtype=float),
+        category_completion=np.asarray(completion if completion is not None else [0.0] * len(categories)),
+    )
+
+
+def test_category_score_blends_likelihood_impact_and_residual_risk():
+    result = risk_scoring.compute_scores(inputs([
+        # Certain, most severe category, no breach cost, undetermined mitigation: 100 * (0.5 + 0.5 * 0.6)
+        (1, "RANSOMWARE", 4, 0, 0),
+        # Undetermined likelihood (0.5), highest breach cost of the category, avoidance (0.4)
+        (1, "PHISHING", 0, 1e6, 1),
+        (2, "PHISHING", 2, 0, 0),
+    ], severity=[1.0, 0.5], completion=[0.0, 0.5]))
+
+    scores = dict(((org, category), score) for org, category, score in result.category_rows())
+    assert scores[(1, "RANSOMWARE")] == 80
+    # impact 0.6 * 0.5 + 0.4 * 1 = 0.7; residual 0.4 * (1 - 0.3 * 0.5) = 0.34
+    assert scores[(1, "PHISHING")] == round(100 * (0.5 * 0.5 + 0.5 * 0.7) * 0.34)
+    assert scores[(2, "PHISHING")] == round(100 * (0.5 * 0.5 + 0.5 * 0.3) * 0.85)
+    assert (1, "RANSOMWARE") in scores and (2, "RANSOMWARE") not in scores
+
+
+def test_overall_score_blends_mean_and_worst_category():
+    result = risk_scoring.compute_scores(inputs([
+        (1, "RANSOMWARE", 4, 0, 0),
+        (1, "PHISHING", 1, 0, 4),
+    ], severity=[1.0, 0.0]))
+
+    worst, other = result.category_scores[0]
+    assert result.overall_scores[0] == round(0.7 * (worst + other) / 2 + 0.3 * max(worst, other))
+    (org_id, score, level, summary), = result.overall_rows()
+    assert level == risk_scoring.RISK_LEVELS[np.digitize(score, risk_scoring.RISK_LEVEL_BOUNDS)]
+    assert summary == "1 of 2 threat categories at High or Critical risk"
+
+
+@pytest.mark.parametrize("probability,breach_cost,risk_status", [(9, 1e12, 1), (-1, -5, 99)])
+def test_scores_stay_within_bounds(probability, breach_cost, risk_status):
+    result = risk_scoring.compute_scores(inputs([(1, "RANSOMWARE", probability, breach_cost, risk_status)], [1.0]))
+
+    assert 0 <= result.category_scores[0, 0] <= 100
+
+
+def test_no_threat_summaries_give_an_empty_run(fake_db):
+    summary = risk_scoring.run(db.connect(), 2024, 6)
+
+    assert (summary["organizations"], summary["category_scores"], summary["alerts"]) == (0, 0, 0)
+    # Nothing is written for an empty month
+    assert not any(query.startswith("COPY") for query, _ in fake_db.statements)
@@ -0,0 +1,34 @@
+import types
+
+import pytest
+
+from common import context, sql_comments
+
+
+@pytest.fixture
+def request_context():
+    ctx = context.RequestContext("get_risk_score", {"pathParameters": {"orgId": "42"}},
+                                 types.SimpleNamespace(aws_request_id="r-1"), cold=False)
+    token = context.activate(ctx)
+    yield ctx
+    context.deactivate(token)
+
+
+def test_tag_survives_a_trailing_line_comment(request_context):
+    tagged = sql_comments.tag("SELECT 1 -- the answer;", has_parameters=False)
+
+    # The tag is on its own line, outside the line comment
+    assert tagged.splitlines()[-1].startswith("/*")
+    assert sql_comments.parse(tagged) == {"cold": "false", "org": "42", "request_id": "r-1", "route": "get_risk_score"}
+
+
+def test_tag_escapes_placeholders_of_parameterized_statements(request_context):
+    request_context.route = "a b"
+
+    tagged = sql_comments.tag("SELECT %s;", has_parameters=True)
+
+    assert tagged == "SELECT %s\n/*cold='false',org='42',request_id='r-1',route='a%%20b'*/"
+
+
+def test_tag_outside_a_request_is_a_no_op():
+    assert sql_comments.tag("SELECT 1", has_parameters=False) == "SELECT 1"